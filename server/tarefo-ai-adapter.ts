@@ -5,9 +5,10 @@
  * servindo como uma ponte entre o código existente e a nova arquitetura baseada em agentes.
  */
 
-import { spawn } from 'child_process';
+import { spawn, ChildProcessWithoutNullStreams } from 'child_process';
 import fs from 'fs';
 import path from 'path';
+import readline from 'readline';
 import { processMessage as processMessageOpenAI } from './openai';
 
 // Interface para representar um agente no CrewAI
@@ -36,6 +37,257 @@ interface Crew {
 // Caminhos para os scripts do TarefoAI
 const TAREFO_AI_PATH = path.join(process.cwd(), 'tarefo_ai');
 const MAIN_SCRIPT = path.join(TAREFO_AI_PATH, 'main.py');
+const WORKER_SCRIPT = path.join(TAREFO_AI_PATH, 'worker.py');
+
+// Configuração do pool de workers persistentes (TAREFO_WORKER_MODE=off desativa)
+const WORKER_MODE_ENABLED = process.env.TAREFO_WORKER_MODE !== 'off';
+const WORKER_COUNT = process.env.TAREFO_WORKERS || '2';
+const WORKER_REQUEST_TIMEOUT_MS = Number(process.env.TAREFO_WORKER_TIMEOUT_MS || 300000);
+
+/**
+ * Evento intermediário de uma requisição em streaming
+ * (started, task_completed, token).
+ */
+export interface TarefoStreamEvent {
+  event: string;
+  task?: string;
+  output?: string;
+  text?: string;
+  page?: TarefoDocumentPage;
+  record?: TarefoComplianceRecord;
+}
+
+/**
+ * Página extraída por processImageStream
+ */
+export interface TarefoDocumentPage {
+  page: number;
+  pages: number;
+  text: string;
+  text_source: 'text_layer' | 'ocr';
+  extract_type: string;
+  fields?: Record<string, any>;
+}
+
+/**
+ * Resultado de um registro em checkComplianceBatch
+ */
+export interface TarefoComplianceRecord {
+  index: number;
+  ok: boolean;
+  result?: any;
+  error?: string;
+}
+
+/**
+ * Resumo de uma verificação de conformidade em lote
+ */
+export interface TarefoComplianceSummary {
+  records: number;
+  compliant: number;
+  non_compliant: number;
+  errors: number;
+  sensitive_records: number;
+  operations: Record<string, number>;
+  failed_rules: Record<string, number>;
+  sensitive_types: Record<string, number>;
+  personal_data: Record<string, number>;
+}
+
+/**
+ * O pool de workers não pôde ser iniciado ou não está acessível: a requisição
+ * não chegou ao Python e pode seguir pelo caminho legado.
+ */
+class TarefoWorkerUnavailableError extends Error {
+  constructor(message: string) {
+    super(message);
+    this.name = 'TarefoWorkerUnavailableError';
+    Object.setPrototypeOf(this, TarefoWorkerUnavailableError.prototype);
+  }
+}
+
+interface PendingRequest {
+  resolve: (value: any) => void;
+  reject: (error: Error) => void;
+  timer: NodeJS.Timeout;
+  onEvent?: (event: TarefoStreamEvent) => void;
+}
+
+/**
+ * Cliente do supervisor de workers Python (tarefo_ai/worker.py --supervise).
+ *
+ * Mantém um único processo supervisor vivo, que gerencia N workers pré-aquecidos.
+ * As requisições usam o protocolo JSON-lines com id para correlacionar respostas.
+ */
+class TarefoWorkerClient {
+  private process: ChildProcessWithoutNullStreams | null = null;
+  private ready: Promise<void> | null = null;
+  private pending = new Map<number, PendingRequest>();
+  private nextId = 1;
+
+  private start(): Promise<void> {
+    if (this.ready) {
+      return this.ready;
+    }
+
+    this.ready = new Promise<void>((resolve, reject) => {
+      const python = spawn('python', [WORKER_SCRIPT, '--supervise', '--workers', WORKER_COUNT], {
+        env: process.env
+      });
+      this.process = python;
+
+      let isReady = false;
+      const lines = readline.createInterface({ input: python.stdout });
+
+      // Falha ao iniciar o processo (ex.: python ausente)
+      python.on('error', (error: Error) => {
+        console.error('❌ Não foi possível iniciar o supervisor TarefoAI:', error);
+        if (!isReady) {
+          this.process = null;
+          this.ready = null;
+          reject(error);
+        }
+      });
+
+      lines.on('line', (line: string) => {
+        let frame: any;
+        try {
+          frame = JSON.parse(line);
+        } catch (error) {
+          console.error('⚠️ Resposta inválida do worker TarefoAI:', line);
+          return;
+        }
+
+        if (frame.id === null || frame.id === undefined) {
+          if (!isReady && frame.ok) {
+            isReady = true;
+            console.log(`✅ Supervisor TarefoAI pronto com ${WORKER_COUNT} workers`);
+            resolve();
+          }
+          return;
+        }
+
+        const request = this.pending.get(frame.id);
+        if (!request) {
+          return;
+        }
+
+        // Eventos de streaming chegam antes da resposta final (que tem "ok")
+        if (frame.event !== undefined && frame.ok === undefined) {
+          try {
+            request.onEvent?.(frame.event);
+          } catch (error) {
+            console.error('⚠️ Erro no tratamento de evento do TarefoAI:', error);
+          }
+          return;
+        }
+
+        this.pending.delete(frame.id);
+        clearTimeout(request.timer);
+
+        if (frame.ok) {
+          request.resolve(frame.result);
+        } else {
+          request.reject(new Error(frame.error || 'Erro desconhecido no worker TarefoAI'));
+        }
+      });
+
+      python.stderr.on('data', (data: Buffer) => {
+        console.error(`⚠️ Worker TarefoAI: ${data.toString()}`);
+      });
+
+      python.on('close', (code: number) => {
+        console.error(`❌ Supervisor TarefoAI encerrado com código ${code}`);
+        const error = new Error('Supervisor TarefoAI encerrado');
+        this.pending.forEach((request) => {
+          clearTimeout(request.timer);
+          request.reject(error);
+        });
+        this.pending.clear();
+        this.process = null;
+        this.ready = null;
+        if (!isReady) {
+          reject(error);
+        }
+      });
+    });
+
+    return this.ready;
+  }
+
+  private send(frame: Record<string, any>): boolean {
+    if (!this.process || !this.process.stdin.writable) {
+      return false;
+    }
+    this.process.stdin.write(JSON.stringify(frame) + '\n');
+    return true;
+  }
+
+  /**
+   * Envia uma requisição ao supervisor.
+   *
+   * Lança TarefoWorkerUnavailableError apenas quando a requisição não chegou ao
+   * Python; erros do worker e timeouts são repassados como Error comum.
+   */
+  async call(
+    method: string,
+    params: Record<string, any>,
+    onEvent?: (event: TarefoStreamEvent) => void
+  ): Promise<any> {
+    try {
+      await this.start();
+    } catch (error) {
+      throw new TarefoWorkerUnavailableError(`Supervisor TarefoAI indisponível: ${error}`);
+    }
+
+    return new Promise<any>((resolve, reject) => {
+      const id = this.nextId++;
+      const timer = setTimeout(() => {
+        this.pending.delete(id);
+        // Interrompe o job no Python: o supervisor reinicia o worker ocupado
+        this.send({ id: null, method: 'cancel', params: { request_id: id } });
+        reject(new Error(`Tempo esgotado aguardando o worker TarefoAI (${method})`));
+      }, WORKER_REQUEST_TIMEOUT_MS);
+
+      this.pending.set(id, { resolve, reject, timer, onEvent });
+      if (!this.send({ id, method, params })) {
+        this.pending.delete(id);
+        clearTimeout(timer);
+        reject(new TarefoWorkerUnavailableError('Supervisor TarefoAI não está em execução'));
+      }
+    });
+  }
+}
+
+const workerClient = new TarefoWorkerClient();
+
+/**
+ * Envia uma requisição ao pool de workers persistentes.
+ * Retorna undefined se o modo worker estiver desativado ou se o supervisor não
+ * puder ser iniciado, para que o chamador use o caminho legado (um processo
+ * Python por requisição). Erros do worker e timeouts são lançados: repetir a
+ * requisição pelo caminho legado executaria o mesmo trabalho duas vezes.
+ */
+async function callWorker(
+  method: string,
+  params: Record<string, any>,
+  onEvent?: (event: TarefoStreamEvent) => void
+): Promise<any | undefined> {
+  if (!WORKER_MODE_ENABLED || !fs.existsSync(WORKER_SCRIPT)) {
+    return undefined;
+  }
+
+  try {
+    return await workerClient.call(method, params, onEvent);
+  } catch (error) {
+    if (error instanceof TarefoWorkerUnavailableError) {
+      console.error(`⚠️ Worker TarefoAI indisponível (${method}), usando processo avulso:`, error);
+      return undefined;
+    }
+    console.error(`❌ Falha no worker TarefoAI (${method}):`, error);
+    throw error;
+  }
+}
 
 /**
  * Verifica se o módulo TarefoAI está disponível
@@ -72,6 +324,15 @@ export async function processMessage(
     throw new Error(error);
   }
   
+  const workerResult = await callWorker('process_message', {
+    user_id: userId,
+    message: message,
+    platform: platform
+  });
+  if (workerResult !== undefined) {
+    return typeof workerResult === 'string' ? workerResult : JSON.stringify(workerResult);
+  }
+  
   try {
     // Prepara os dados para o script Python
     const data = JSON.stringify({
@@ -141,6 +402,160 @@ export async function processMessage(
   }
 }
 
+/**
+ * Processa uma mensagem em modo streaming.
+ *
+ * Cada tarefa concluída (e cada token, quando o LLM faz streaming) é entregue a
+ * onEvent assim que fica pronta, permitindo enviar indicadores de digitação e uma
+ * primeira resposta antes do fim da crew. Sem o modo worker, recorre a processMessage.
+ *
+ * @param userId ID do usuário
+ * @param message Mensagem a ser processada
+ * @param platform Plataforma de origem (app, telegram, whatsapp)
+ * @param onEvent Função chamada para cada evento intermediário
+ * @returns Resposta final processada
+ */
+export async function processMessageStream(
+  userId: number,
+  message: string,
+  platform: string = 'app',
+  onEvent: (event: TarefoStreamEvent) => void = () => {}
+): Promise<string> {
+  if (!isTarefoAIAvailable()) {
+    const error = 'TarefoAI não está disponível. Verifique a configuração do sistema.';
+    console.error(`❌ ${error}`);
+    throw new Error(error);
+  }
+
+  const workerResult = await callWorker('process_message_stream', {
+    user_id: userId,
+    message: message,
+    platform: platform
+  }, onEvent);
+  if (workerResult !== undefined) {
+    return typeof workerResult === 'string' ? workerResult : JSON.stringify(workerResult);
+  }
+
+  return processMessage(userId, message, platform);
+}
+
+/**
+ * Extrai um documento página a página (sem a crew), recebendo cada página assim
+ * que fica pronta
+ *
+ * @param userId ID do usuário
+ * @param imagePath Caminho ou dados base64 do documento
+ * @param extractType Tipo de extração (full, receipt, invoice)
+ * @param onPage Função chamada para cada página
+ * @returns Número de páginas processadas
+ */
+export async function processImageStream(
+  userId: number,
+  imagePath: string,
+  extractType: string = 'full',
+  onPage: (page: TarefoDocumentPage) => void = () => {}
+): Promise<{ pages: number; extract_type: string }> {
+  const workerResult = await callWorker('process_image_stream', {
+    user_id: userId,
+    image_path: imagePath,
+    extract_type: extractType
+  }, (event) => {
+    if (event.event === 'page' && event.page) {
+      onPage(event.page);
+    }
+  });
+  if (workerResult === undefined) {
+    throw new Error('Extração por página disponível apenas no modo worker');
+  }
+  return workerResult;
+}
+
+/**
+ * Verifica a conformidade de uma exportação inteira (auditorias LGPD), recebendo
+ * o resultado de cada registro à medida que fica pronto
+ *
+ * @param records Caminho de um arquivo JSONL no servidor ou lista de registros
+ *   ({ operation, data } ou só os dados)
+ * @param operation Operação dos registros que não informam a sua
+ * @param onRecord Função chamada para cada registro verificado
+ * @returns Totais e contagens por regra reprovada e por tipo sensível
+ */
+export async function checkComplianceBatch(
+  records: string | any[],
+  operation?: string,
+  onRecord: (record: TarefoComplianceRecord) => void = () => {}
+): Promise<TarefoComplianceSummary> {
+  const params = typeof records === 'string' ? { path: records, operation } : { records, operation };
+  const workerResult = await callWorker('check_compliance_batch', params, (event) => {
+    if (event.event === 'record' && event.record) {
+      onRecord(event.record);
+    }
+  });
+  if (workerResult === undefined) {
+    throw new Error('Verificação em lote disponível apenas no modo worker');
+  }
+  return workerResult;
+}
+
+/**
+ * Estado de um job da fila de OCR
+ */
+export interface TarefoImageJob {
+  job_id: string;
+  status?: 'queued' | 'running' | 'done' | 'failed';
+  attempts?: number;
+  result?: any;
+  error?: string | null;
+}
+
+/**
+ * Enfileira uma imagem para OCR e retorna o ID do job sem esperar o processamento
+ *
+ * Requer o modo worker e o pool de OCR (python -m tools.ocr_queue).
+ *
+ * @param userId ID do usuário
+ * @param imagePath Caminho ou dados base64 da imagem
+ * @param extractType Tipo de extração (full, receipt, invoice)
+ * @param priority Prioridade do job: número (maior sai primeiro) ou 'interactive',
+ *   'normal', 'bulk'. Padrão: interativa, exceto recibos e notas (receipt,
+ *   invoice), que entram como lote para não atrasar o chat
+ * @returns ID do job
+ */
+export async function submitImage(
+  userId: number,
+  imagePath: string,
+  extractType: string = 'full',
+  priority?: number | 'interactive' | 'normal' | 'bulk'
+): Promise<string> {
+  const workerResult = await callWorker('submit_image', {
+    user_id: userId,
+    image_path: imagePath,
+    extract_type: extractType,
+    priority: priority
+  });
+  if (workerResult === undefined) {
+    throw new Error('Fila de OCR disponível apenas no modo worker');
+  }
+  if (workerResult.error) {
+    throw new Error(workerResult.error);
+  }
+  return workerResult.job_id;
+}
+
+/**
+ * Consulta o estado de um job de OCR
+ *
+ * @param jobId ID retornado por submitImage
+ * @returns Estado do job, com o resultado quando status for 'done'
+ */
+export async function getImageJob(jobId: string): Promise<TarefoImageJob> {
+  const workerResult = await callWorker('image_job', { job_id: jobId });
+  if (workerResult === undefined) {
+    throw new Error('Fila de OCR disponível apenas no modo worker');
+  }
+  return workerResult;
+}
+
 /**
  * Processa uma imagem enviada pelo usuário (usa OCR via CrewAI)
  * 
@@ -163,6 +578,15 @@ export async function processImage(
     throw new Error(error);
   }
   
+  const workerResult = await callWorker('process_image', {
+    user_id: userId,
+    image_path: imagePath,
+    extract_type: extractType
+  });
+  if (workerResult !== undefined) {
+    return workerResult;
+  }
+  
   try {
     // Prepara os dados para o script Python
     const data = JSON.stringify({
@@ -348,6 +772,11 @@ export async function checkCompliance(
     throw new Error(error);
   }
   
+  const workerResult = await callWorker('check_compliance', { operation, data });
+  if (workerResult !== undefined) {
+    return workerResult;
+  }
+  
   try {
     // Prepara os dados para o script Python
     const requestData = JSON.stringify({
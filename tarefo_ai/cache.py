@@ -0,0 +1,221 @@
+"""
+TarefoAI - Cache de respostas da crew
+
+Guarda as respostas de `run_crew` em um banco SQLite para que mensagens repetidas
+("bom dia", comandos de ajuda) não disparem um novo `crew.kickoff`. As entradas expiram após um TTL e, quando o limite de entradas é
+atingido, as menos usadas recentemente são descartadas (LRU). Como o banco fica
+em disco, o cache sobrevive ao reinício dos workers.
+
+Só as intenções somente leitura de TAREFO_CACHE_INTENTS passam pelo cache: as
+demais têm efeitos colaterais (criar um lembrete, agendar um evento) e repetir a
+mensagem precisa executar a crew de novo, não devolver a confirmação guardada.
+
+As respostas são sempre separadas por usuário: o user_id entra na chave de todas
+as intenções, a menos que a intenção seja declarada compartilhada em
+TAREFO_CACHE_SHARED_INTENTS (útil apenas para respostas que não dependem de quem
+pergunta, como a ajuda). O banco fica em um diretório privado (0700) e é criado
+com permissão 0600.
+
+Variáveis de ambiente:
+    TAREFO_CACHE=off                desativa o cache
+    TAREFO_CACHE_PATH               caminho do banco SQLite
+                                    (padrão: DATA_DIR/response_cache.sqlite3)
+    TAREFO_CACHE_INTENTS            intenções somente leitura que usam o cache,
+                                    separadas por vírgula (padrão: message)
+    TAREFO_CACHE_SHARED_INTENTS     intenções compartilhadas entre usuários,
+                                    separadas por vírgula (padrão: nenhuma)
+    TAREFO_CACHE_TTL            validade das entradas em segundos (padrão: 600)
+    TAREFO_CACHE_MAX_ENTRIES    número máximo de entradas (padrão: 1000)
+"""
+import os
+import re
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+
+from config.config import DATA_DIR, ensure_private_dir
+
+DEFAULT_CACHE_PATH = DATA_DIR / "response_cache.sqlite3"
+
+# Campos do contexto que nunca fazem parte da chave
+VOLATILE_FIELDS = {"timestamp"}
+
+
+def normalize_text(text):
+    """Normaliza uma mensagem: minúsculas, espaços colapsados e sem pontuação final"""
+    text = re.sub(r"\s+", " ", str(text).strip().lower())
+    return text.rstrip(" .!?…")
+
+
+def _intent_list(name, default=""):
+    value = os.environ.get(name, default)
+    return frozenset(intent.strip() for intent in value.split(",") if intent.strip())
+
+
+def cacheable_intents():
+    """Intenções somente leitura cujas respostas podem ser guardadas no cache"""
+    return _intent_list("TAREFO_CACHE_INTENTS", "message")
+
+
+def shared_intents():
+    """Intenções cujas respostas podem ser compartilhadas entre usuários (opt-in)"""
+    return _intent_list("TAREFO_CACHE_SHARED_INTENTS")
+
+
+def normalize_context(context, intent, shared=None):
+    """
+    Monta a forma canônica do contexto usada como chave do cache
+
+    O user_id entra na chave de todas as intenções, exceto as declaradas
+    compartilhadas (`shared`, padrão: TAREFO_CACHE_SHARED_INTENTS).
+    """
+    if shared is None:
+        shared = shared_intents()
+    normalized = {"intent": intent}
+    for field, value in sorted((context or {}).items()):
+        if field in VOLATILE_FIELDS:
+            continue
+        if field == "user_id" and intent in shared:
+            continue
+        if field == "message" and isinstance(value, str):
+            value = normalize_text(value)
+        normalized[field] = value
+    return normalized
+
+
+class ResponseCache:
+    """Cache LRU com TTL persistido em SQLite"""
+
+    def __init__(self, path=None, ttl=None, max_entries=None):
+        self.path = str(path or os.environ.get("TAREFO_CACHE_PATH", DEFAULT_CACHE_PATH))
+        self.ttl = ttl if ttl is not None else float(os.environ.get("TAREFO_CACHE_TTL", "600"))
+        self.max_entries = max_entries or int(os.environ.get("TAREFO_CACHE_MAX_ENTRIES", "1000"))
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self):
+        """Abre o banco na primeira utilização"""
+        if self._conn is None:
+            self._create_private_file()
+            self._conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _create_private_file(self):
+        """Cria o banco com permissão 0600 (o SQLite usa a mesma para o WAL)"""
+        directory = os.path.dirname(self.path)
+        if self.path == str(DEFAULT_CACHE_PATH):
+            ensure_private_dir(directory)
+        elif directory:
+            os.makedirs(directory, exist_ok=True)
+        os.close(os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600))
+
+    @staticmethod
+    def make_key(normalized_context, version=""):
+        """Gera a chave a partir do contexto normalizado e da versão da configuração"""
+        payload = json.dumps(normalized_context, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(f"{version}\0{payload}".encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """
+        Busca uma resposta no cache
+
+        Returns:
+            tuple: (encontrado, valor)
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                if row is not None:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    conn.commit()
+                self.misses += 1
+                return False, None
+            conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            conn.commit()
+            self.hits += 1
+        return True, json.loads(row[0])
+
+    def set(self, key, value):
+        """Armazena uma resposta e aplica o limite de entradas"""
+        now = time.time()
+        encoded = json.dumps(value, ensure_ascii=False, default=str)
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, encoded, now, now),
+            )
+            conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+            excess = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_entries
+            if excess > 0:
+                conn.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY last_access ASC LIMIT ?)",
+                    (excess,),
+                )
+                self.evictions += excess
+            conn.commit()
+
+    def clear(self):
+        """Remove todas as entradas"""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM responses")
+            conn.commit()
+
+    def stats(self):
+        """Retorna os contadores do cache"""
+        with self._lock:
+            size = self._connection().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "size": size,
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+        }
+
+
+_response_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Retorna o cache compartilhado do processo, ou None se estiver desativado"""
+    global _response_cache
+    if os.environ.get("TAREFO_CACHE", "on").lower() == "off":
+        return None
+    with _cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache()
+        return _response_cache
+
+
+__all__ = ['ResponseCache', 'get_response_cache', 'normalize_context', 'cacheable_intents', 'shared_intents']
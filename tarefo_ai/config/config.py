@@ -11,10 +11,18 @@ from pathlib import Path
 BASE_DIR = Path(__file__).parent.parent
 CONFIG_DIR = Path(__file__).parent
 TOOLS_DIR = BASE_DIR / 'tools'
-UPLOAD_DIR = BASE_DIR / 'uploads'
+UPLOAD_DIR = Path(os.environ.get('TAREFO_UPLOAD_DIR', BASE_DIR / 'uploads'))
+# Dados locais do aplicativo (caches com conteúdo dos usuários)
+DATA_DIR = Path(os.environ.get('TAREFO_DATA_DIR', BASE_DIR / 'data'))
 
-# Cria diretório de uploads se não existir
-UPLOAD_DIR.mkdir(exist_ok=True)
+
+def ensure_private_dir(path=None):
+    """Cria o diretório (padrão: DATA_DIR) acessível apenas pelo usuário do processo"""
+    path = Path(path or DATA_DIR)
+    path.mkdir(mode=0o700, parents=True, exist_ok=True)
+    if path.stat().st_mode & 0o077:
+        path.chmod(0o700)
+    return path
 
 # Configurações do modelo LLM
 LLM_CONFIG = {
@@ -48,16 +56,24 @@ CREW_CONFIG = {
 # Configurações do OCR
 OCR_CONFIG = {
     'supported_formats': ['.jpg', '.jpeg', '.png', '.pdf'],
-    'languages': ['por', 'eng']  # Idiomas suportados (Portuguese, English)
+    'languages': ['por', 'eng'],  # Idiomas suportados (Portuguese, English)
+    # Pré-processamento antes do OCR (cada etapa pode ser desligada)
+    'preprocessing': {
+        'draft': True,  # Decodifica JPEGs grandes já reduzidos
+        'grayscale': True,
+        'normalize_dpi': True,
+        'binarize': True,
+        'deskew': True,
+        'target_dpi': 300,
+        'max_pixels': 4_000_000  # Limite de pixels após a redução
+    }
 }
 
 # Configurações de compliance (LGPD/GDPR)
 COMPLIANCE_CONFIG = {
     'log_audits': True,  # Registra todas as verificações de conformidade
-    'sensitive_fields': [
-        'cpf', 'rg', 'id', 'passport', 'credit_card', 'health', 'religion',
-        'political', 'sexual_orientation', 'biometric', 'genetic', 'location'
-    ]
+    # Regras por operação, tipos sensíveis e textos (JSON ou YAML, recarregado ao mudar)
+    'policy_path': str(os.environ.get('TAREFO_COMPLIANCE_POLICY', CONFIG_DIR / 'compliance_policy.json'))
 }
 
 def get_config(config_name=None):
@@ -81,7 +97,8 @@ def get_config(config_name=None):
             'base_dir': str(BASE_DIR),
             'config_dir': str(CONFIG_DIR),
             'tools_dir': str(TOOLS_DIR),
-            'upload_dir': str(UPLOAD_DIR)
+            'upload_dir': str(UPLOAD_DIR),
+            'data_dir': str(DATA_DIR)
         }
     }
     
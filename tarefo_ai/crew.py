@@ -1,8 +1,14 @@
 import os
 import sys
-import yaml
+import json
+import time
+import hashlib
+import threading
+import contextvars
 from pathlib import Path
 
+from metrics import timer, observe
+
 # Importa a configuração personalizada
 try:
     from config import get_llm_config
@@ -17,67 +23,198 @@ except ImportError:
         "temperature": 0.7
     }
 
-# Tenta importar o crewai, mas cria stubs se falhar
-try:
-    from crewai import Crew, Process
-    from crewai import Agent, Task
-    # Configura o LLM para o CrewAI
-    if LLM_CONFIG["provider"] == "anthropic":
-        from langchain_anthropic import ChatAnthropic
+# O crewai e o cliente do LLM são carregados apenas no primeiro uso
+# (load_crewai), de modo que importar este módulo continue rápido.
+_load_lock = threading.Lock()
+_crewai_loaded = False
+CREWAI_AVAILABLE = None
+llm = None
+
+
+# Definições de fallback para desenvolvimento/teste
+class _StubAgent:
+    def __init__(self, role="", goal="", backstory="", verbose=False, memory=False):
+        self.role = role
+        self.goal = goal
+        self.backstory = backstory
+        self.verbose = verbose
+        self.memory = memory
+
+
+class _StubTask:
+    def __init__(self, description="", expected_output="", agent=None):
+        self.description = description
+        self.expected_output = expected_output
+        self.agent = agent
+
+
+class _StubProcess:
+    sequential = "sequential"
+    hierarchical = "hierarchical"
+
+
+class _StubCrew:
+    def __init__(self, agents=None, tasks=None, process=None, verbose=False, task_callback=None):
+        self.agents = agents or []
+        self.tasks = tasks or []
+        self.process = process
+        self.verbose = verbose
+        self.task_callback = task_callback
+
+    def copy(self):
+        return _StubCrew(self.agents, self.tasks, self.process, self.verbose, self.task_callback)
+
+    def kickoff(self, inputs=None):
+        print(f"🚀 Simulação de execução do CrewAI com {len(self.agents)} agentes e {len(self.tasks)} tarefas")
+        print(f"📝 Contexto: {inputs}")
+        response = "Esta é uma resposta simulada do CrewAI para desenvolvimento"
+        if self.task_callback is not None:
+            from types import SimpleNamespace
+            for task in self.tasks:
+                self.task_callback(SimpleNamespace(description=task.description, agent=task.agent.role, raw=response))
+        return response
+
+
+# LLMs em modo streaming em uso -> destino dos tokens. Cada execução de
+# run_crew_stream cria o seu LLM, então os tokens chegam ao chamador certo mesmo que
+# o crewai emita os eventos em outra thread.
+_stream_sinks = {}
+_stream_listener_registered = False
+_stream_listener_lock = threading.Lock()
+
+
+def _forward_stream_chunk(source, event):
+    """Listener de LLMStreamChunkEvent: repassa o trecho ao destino do LLM que o gerou"""
+    sink = _stream_sinks.get(id(source))
+    chunk = getattr(event, "chunk", None)
+    if sink is not None and chunk:
+        sink({"event": "token", "text": chunk})
+
+
+def _register_stream_listener():
+    """
+    Registra _forward_stream_chunk no barramento de eventos do crewai (uma vez)
+
+    Returns:
+        bool: False se a versão do crewai não emitir eventos de streaming
+    """
+    global _stream_listener_registered
+    with _stream_listener_lock:
+        if _stream_listener_registered:
+            return True
         try:
-            llm = ChatAnthropic(
-                anthropic_api_key=LLM_CONFIG["api_key"],
-                model_name=LLM_CONFIG["model"],
-                temperature=LLM_CONFIG["temperature"]
-            )
-            print(f"✅ LLM configurado: Anthropic {LLM_CONFIG['model']}")
+            from crewai.events import LLMStreamChunkEvent, crewai_event_bus
+        except ImportError:
+            try:
+                from crewai.utilities.events import crewai_event_bus
+                from crewai.utilities.events.llm_events import LLMStreamChunkEvent
+            except ImportError:
+                return False
+        crewai_event_bus.on(LLMStreamChunkEvent)(_forward_stream_chunk)
+        _stream_listener_registered = True
+        return True
+
+
+def _create_llm(stream=False):
+    """
+    Configura o LLM para o CrewAI
+
+    Args:
+        stream (bool): Cria o LLM em modo streaming (usado só por run_crew_stream;
+            os tokens chegam como LLMStreamChunkEvent)
+    """
+    if LLM_CONFIG["provider"] != "anthropic":
+        print("⚠️ Provedor LLM não suportado ou não configurado")
+        return None
+
+    from crewai import LLM
+    try:
+        model = LLM_CONFIG["model"]
+        client = LLM(
+            model=model if "/" in model else f"anthropic/{model}",
+            api_key=LLM_CONFIG["api_key"],
+            temperature=LLM_CONFIG["temperature"],
+            stream=stream,
+        )
+        if not stream:
+            print(f"✅ LLM configurado: Anthropic {model}")
+        return client
+    except Exception as e:
+        print(f"❌ Erro ao configurar Anthropic LLM: {e}")
+        return None
+
+
+def _stream_llm():
+    """
+    LLM em modo streaming para uma execução de run_crew_stream
+
+    Returns:
+        LLM ou None se TAREFO_STREAM_TOKENS=off, se não houver LLM configurado ou
+        se o crewai não emitir eventos de streaming
+    """
+    if os.environ.get("TAREFO_STREAM_TOKENS", "on").lower() == "off":
+        return None
+    if not load_crewai() or llm is None or not _register_stream_listener():
+        return None
+    return _create_llm(stream=True)
+
+
+def _use_llm(crew, client):
+    """Troca o LLM dos agentes de uma cópia da crew (não usar na crew compartilhada)"""
+    for agent in getattr(crew, "agents", None) or []:
+        try:
+            agent.llm = client
         except Exception as e:
-            print(f"❌ Erro ao configurar Anthropic LLM: {e}")
+            print(f"⚠️ Não foi possível trocar o LLM do agente: {e}")
+
+
+def load_crewai():
+    """
+    Importa o crewai e cria o cliente do LLM na primeira chamada
+
+    Se o crewai não estiver instalado, usa stubs para desenvolvimento.
+
+    Returns:
+        bool: True se o crewai real estiver disponível
+    """
+    global _crewai_loaded, CREWAI_AVAILABLE, llm, Agent, Task, Crew, Process
+
+    if _crewai_loaded:
+        return CREWAI_AVAILABLE
+
+    with _load_lock:
+        if _crewai_loaded:
+            return CREWAI_AVAILABLE
+        try:
+            from crewai import Crew, Process
+            from crewai import Agent, Task
+            llm = _create_llm()
+            CREWAI_AVAILABLE = True
+        except ImportError:
+            print("⚠️ Módulo crewai não encontrado, usando stubs para desenvolvimento")
+            Agent, Task, Crew, Process = _StubAgent, _StubTask, _StubCrew, _StubProcess
             llm = None
-    else:
-        llm = None
-        print("⚠️ Provedor LLM não suportado ou não configurado")
-    
-    CREWAI_AVAILABLE = True
-except ImportError:
-    # Definições de fallback para desenvolvimento/teste
-    print("⚠️ Módulo crewai não encontrado, usando stubs para desenvolvimento")
-    CREWAI_AVAILABLE = False
-    llm = None
-    
-    class Agent:
-        def __init__(self, role="", goal="", backstory="", verbose=False, memory=False):
-            self.role = role
-            self.goal = goal
-            self.backstory = backstory
-            self.verbose = verbose
-            self.memory = memory
-    
-    class Task:
-        def __init__(self, description="", expected_output="", agent=None):
-            self.description = description
-            self.expected_output = expected_output
-            self.agent = agent
-    
-    class Process:
-        sequential = "sequential"
-        hierarchical = "hierarchical"
-    
-    class Crew:
-        def __init__(self, agents=None, tasks=None, process=None, verbose=False):
-            self.agents = agents or []
-            self.tasks = tasks or []
-            self.process = process
-            self.verbose = verbose
-        
-        def kickoff(self, inputs=None):
-            print(f"🚀 Simulação de execução do CrewAI com {len(self.agents)} agentes e {len(self.tasks)} tarefas")
-            print(f"📝 Contexto: {inputs}")
-            return "Esta é uma resposta simulada do CrewAI para desenvolvimento"
+            CREWAI_AVAILABLE = False
+        _crewai_loaded = True
+
+    return CREWAI_AVAILABLE
+
+
+def __getattr__(name):
+    # Acesso externo a crew.Agent, crew.Crew etc. dispara o carregamento
+    if name in ("Agent", "Task", "Crew", "Process"):
+        load_crewai()
+        return globals()[name]
+    if name in ("agents_data", "tasks_data"):
+        load_config()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 def load_yaml(file_path):
     """Carrega um arquivo YAML com tratamento de erros"""
     try:
+        import yaml
         with open(file_path, 'r', encoding='utf-8') as f:
             return yaml.safe_load(f)
     except Exception as e:
@@ -89,13 +226,26 @@ config_dir = Path(__file__).parent / "config"
 agents_yaml = config_dir / "agents.yaml"
 tasks_yaml = config_dir / "tasks.yaml"
 
-# Carrega as configurações dos agentes e tarefas
-agents_data = load_yaml(agents_yaml)
-tasks_data = load_yaml(tasks_yaml)
+# As configurações dos agentes e tarefas são lidas no primeiro uso
+_config_loaded = False
 
-def create_agents():
+
+def load_config(force=False):
+    """Carrega (ou recarrega) agents.yaml e tasks.yaml"""
+    global agents_data, tasks_data, _config_loaded
+    if force or not _config_loaded:
+        with timer("tarefo_config_load_seconds"):
+            agents_data = load_yaml(agents_yaml)
+            tasks_data = load_yaml(tasks_yaml)
+        _config_loaded = True
+    return agents_data, tasks_data
+
+def create_agents(agents_data=None):
     """Cria os agentes a partir das configurações YAML"""
     agents = []
+    load_crewai()
+    if agents_data is None:
+        agents_data = load_config()[0]
     
     if not agents_data or 'agents' not in agents_data:
         print("⚠️ Configuração de agentes não encontrada ou vazia")
@@ -124,9 +274,16 @@ def create_agents():
     
     return agents
 
-def create_tasks(agents):
-    """Cria tarefas e as atribui aos agentes apropriados"""
+def create_tasks(agents, tasks_data=None, task_configs=None):
+    """
+    Cria tarefas e as atribui aos agentes apropriados
+
+    Se `task_configs` for uma lista, recebe a entrada do YAML de cada tarefa criada.
+    """
     tasks = []
+    load_crewai()
+    if tasks_data is None:
+        tasks_data = load_config()[1]
     
     if not tasks_data or 'tasks' not in tasks_data:
         print("⚠️ Configuração de tarefas não encontrada ou vazia")
@@ -153,35 +310,57 @@ def create_tasks(agents):
                 agent=agent
             )
             tasks.append(task)
+            if task_configs is not None:
+                task_configs.append(task_config)
             print(f"✅ Tarefa criada: {task.description} (Agente: {agent.role})")
         except Exception as e:
             print(f"❌ Erro ao criar tarefa: {e}")
     
     return tasks
 
-def initialize_crew():
+def _single_task_crew(task):
+    """Cria uma crew que executa apenas uma tarefa (usada pelo ScheduledCrew)"""
+    load_crewai()
+    return Crew(
+        agents=[task.agent],
+        tasks=[task],
+        process=Process.sequential,
+        verbose=True
+    )
+
+def initialize_crew(agents_data=None, tasks_data=None):
     """Inicializa a tripulação (crew) com os agentes e tarefas configurados"""
     try:
         print("🚀 Inicializando TarefoAI CrewAI...")
+        load_crewai()
         
         # Cria os agentes
-        agents = create_agents()
+        agents = create_agents(agents_data)
         if not agents:
             print("❌ Nenhum agente disponível para criar a crew")
             return None
         
         # Cria as tarefas
-        tasks = create_tasks(agents)
+        task_configs = []
+        tasks = create_tasks(agents, tasks_data, task_configs)
         if not tasks:
             print("❌ Nenhuma tarefa disponível para criar a crew")
             return None
         
+        # Tarefas com async_execution rodam em paralelo seguindo o DAG
+        if len(tasks) > 1 and any(c.get('async_execution') for c in task_configs):
+            from scheduler import ScheduledCrew
+            crew = ScheduledCrew(agents, tasks, task_configs, _single_task_crew)
+            print(f"✅ TarefoAI CrewAI inicializado com {len(agents)} agentes e {len(tasks)} tarefas (DAG concorrente)")
+            return crew
+        
         # Define a Crew com processo sequencial
         crew = Crew(
             agents=agents,
             tasks=tasks,
             process=Process.sequential,
-            verbose=True
+            verbose=True,
+            task_callback=record_task_timing
         )
         
         print(f"✅ TarefoAI CrewAI inicializado com {len(agents)} agentes e {len(tasks)} tarefas")
@@ -191,6 +370,219 @@ def initialize_crew():
         print(f"❌ Erro ao inicializar CrewAI: {e}")
         return None
 
+class CrewRegistry:
+    """
+    Mantém as crews já construídas em memória
+
+    Cada crew é identificada por um hash do conteúdo de agents.yaml, tasks.yaml
+    e das configurações do LLM. Os arquivos só são relidos quando o mtime ou o
+    tamanho mudam; se o conteúdo também mudou, a crew é reconstruída.
+    """
+
+    def __init__(self, config_files=None):
+        self.config_files = list(config_files or [agents_yaml, tasks_yaml])
+        self._lock = threading.RLock()
+        self._crews = {}
+        self._stats = None
+        self._key = None
+        self.builds = 0
+
+    def _stat_files(self):
+        """Retorna (mtime, tamanho) de cada arquivo de configuração"""
+        stats = []
+        for path in self.config_files:
+            try:
+                st = os.stat(path)
+                stats.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                stats.append(None)
+        return tuple(stats)
+
+    def _compute_key(self):
+        """Calcula o hash do conteúdo da configuração e do LLM"""
+        digest = hashlib.sha256()
+        for path in self.config_files:
+            try:
+                digest.update(Path(path).read_bytes())
+            except OSError:
+                digest.update(b"<ausente>")
+            digest.update(b"\0")
+        llm_settings = {k: v for k, v in LLM_CONFIG.items() if k != 'api_key'}
+        digest.update(json.dumps(llm_settings, sort_keys=True, default=str).encode("utf-8"))
+        return digest.hexdigest()
+
+    def _reload_config(self):
+        """Relê os arquivos YAML e atualiza as configurações do módulo"""
+        load_config(force=True)
+
+    def current_key(self):
+        """Retorna a chave da configuração atual, relendo os arquivos se mudaram"""
+        with self._lock:
+            stats = self._stat_files()
+            if stats != self._stats or self._key is None:
+                key = self._compute_key()
+                if key != self._key:
+                    if self._key is not None:
+                        print("🔄 Configuração de agentes/tarefas alterada, recarregando...")
+                    self._reload_config()
+                    self._crews.clear()
+                self._stats = stats
+                self._key = key
+            return self._key
+
+    def get(self, name="default", builder=None):
+        """
+        Retorna a crew em cache, construindo-a apenas na primeira vez
+
+        Args:
+            name (str): Nome da crew dentro do registro
+            builder: Função sem argumentos que constrói a crew
+                (padrão: initialize_crew)
+
+        Returns:
+            Crew: Crew pronta para execução ou None em caso de erro
+        """
+        with self._lock:
+            cache_key = (name, self.current_key())
+            crew = self._crews.get(cache_key)
+            if crew is None:
+                with timer("tarefo_crew_build_seconds", crew=name):
+                    crew = (builder or initialize_crew)()
+                if crew is not None:
+                    self._crews[cache_key] = crew
+                    self.builds += 1
+            return crew
+
+    def clear(self):
+        """Descarta todas as crews em cache"""
+        with self._lock:
+            self._crews.clear()
+            self._stats = None
+            self._key = None
+
+
+crew_registry = CrewRegistry()
+
+
+def get_crew(name="default", builder=None):
+    """Retorna a crew memoizada do registro global"""
+    return crew_registry.get(name, builder)
+
+
+# Palavras-chave usadas para refinar a intenção de mensagens de texto
+INTENT_KEYWORDS = {
+    "reminder": ("lembr", "remind", "não esquecer", "nao esquecer", "avise", "avisar"),
+    "calendar": ("agend", "reuni", "evento", "calend", "compromisso", "marcar",
+                 "meeting", "schedule"),
+}
+
+
+def detect_intent(context):
+    """
+    Identifica a intenção de uma requisição a partir do contexto
+
+    Args:
+        context (dict): Contexto recebido por run_crew
+
+    Returns:
+        str: message, calendar, reminder, image, compliance ou full
+    """
+    if not isinstance(context, dict):
+        return "full"
+    if context.get("operation"):
+        return "compliance"
+    if context.get("image_path"):
+        return "image"
+    message = context.get("message")
+    if isinstance(message, str):
+        text = message.lower()
+        for intent, keywords in INTENT_KEYWORDS.items():
+            if any(keyword in text for keyword in keywords):
+                return intent
+        return "message"
+    return "full"
+
+
+def select_config(intent):
+    """
+    Filtra agents.yaml e tasks.yaml para as tarefas de uma intenção
+
+    Returns:
+        tuple: (agents_data, tasks_data) restritos, ou (None, None) quando
+            nenhuma tarefa declara a intenção
+    """
+    agents_data, tasks_data = load_config()
+    tasks = [
+        task for task in (tasks_data or {}).get('tasks', [])
+        if intent in (task.get('intents') or [])
+    ]
+    if not tasks:
+        return None, None
+
+    roles = {task.get('agent') for task in tasks}
+    agents = [
+        agent for agent in (agents_data or {}).get('agents', [])
+        if agent.get('role') in roles
+    ]
+    return {'agents': agents}, {'tasks': tasks}
+
+
+def build_intent_crew(intent):
+    """Constrói a crew com apenas as tarefas relevantes para a intenção"""
+    scoped_agents, scoped_tasks = select_config(intent)
+    if scoped_tasks is None:
+        if intent != "full":
+            print(f"⚠️ Nenhuma tarefa para a intenção '{intent}', usando a crew completa")
+        return initialize_crew()
+    print(f"🎯 Intenção '{intent}': {len(scoped_tasks['tasks'])} tarefa(s)")
+    return initialize_crew(scoped_agents, scoped_tasks)
+
+
+def get_crew_for_context(context):
+    """Retorna a sub-crew em cache adequada ao contexto da requisição"""
+    intent = detect_intent(context)
+    return crew_registry.get(intent, lambda: build_intent_crew(intent))
+
+# Instante da última conclusão de tarefa na execução atual (métricas por tarefa)
+_task_clock = contextvars.ContextVar("tarefo_task_clock", default=None)
+
+
+def record_task_timing(output):
+    """
+    task_callback que registra a duração de cada tarefa da crew sequencial
+
+    A duração é o tempo desde o início do kickoff ou desde a tarefa anterior.
+    """
+    now = time.perf_counter()
+    started = _task_clock.get()
+    if started is not None:
+        agent = getattr(output, "agent", "") or ""
+        observe(
+            "tarefo_task_seconds", now - started,
+            task=str(getattr(output, "description", "") or "")[:80],
+            agent=getattr(agent, "role", agent),
+        )
+    _task_clock.set(now)
+
+
+def crew_for_call(crew):
+    """
+    Crew para uma execução que pode ocorrer em paralelo com outras
+
+    Crews do crewai não são reentrantes: cada execução concorrente usa uma cópia
+    (`copy()` não reconstrói o LLM, como em Crew.kickoff_for_each). O ScheduledCrew
+    já copia as tarefas a cada execução e é usado diretamente.
+    """
+    copy = getattr(crew, "copy", None)
+    return copy() if copy is not None else crew
+
+
+def _timed_kickoff(crew, initial_context, **kwargs):
+    """Executa crew.kickoff medindo a execução completa e cada tarefa"""
+    _task_clock.set(time.perf_counter())
+    with timer("tarefo_crew_kickoff_seconds"):
+        return crew.kickoff(inputs=initial_context, **kwargs)
+
 # Função para executar a crew e obter resultados
 def run_crew(crew, initial_context=None):
     """Executa a crew com um contexto inicial opcional"""
@@ -200,7 +592,7 @@ def run_crew(crew, initial_context=None):
             return "Erro: sistema não inicializado corretamente"
         
         print("🔄 Executando CrewAI...")
-        result = crew.kickoff(inputs=initial_context)
+        result = _timed_kickoff(crew, initial_context)
         print("✅ Execução do CrewAI concluída")
         return result
     
@@ -208,5 +600,252 @@ def run_crew(crew, initial_context=None):
         print(f"❌ Erro ao executar CrewAI: {e}")
         return f"Erro durante o processamento: {str(e)}"
 
+def _cache_lookup(initial_context, cache=None):
+    """
+    Consulta o cache de respostas para o contexto
+
+    Intenções fora de TAREFO_CACHE_INTENTS (lembretes, agenda) não usam o cache:
+    a crew precisa executar a ação a cada mensagem.
+
+    Returns:
+        tuple: (cache, chave, encontrado, valor); cache é None se indisponível
+            ou se a intenção não puder ser cacheada
+    """
+    from cache import cacheable_intents, get_response_cache, normalize_context
+
+    intent = detect_intent(initial_context)
+    if intent not in cacheable_intents():
+        return None, None, False, None
+    cache = cache or get_response_cache()
+    if cache is None:
+        return None, None, False, None
+    try:
+        normalized = normalize_context(initial_context, intent)
+        key = cache.make_key(normalized, crew_registry.current_key())
+        found, cached = cache.get(key)
+    except Exception as e:
+        print(f"⚠️ Cache de respostas indisponível: {e}")
+        return None, None, False, None
+    if found:
+        print("⚡ Resposta obtida do cache")
+    return cache, key, found, cached
+
+
+def cacheable_result(result):
+    """
+    Forma serializável da resposta (o texto de um CrewOutput)
+
+    É a forma guardada no cache, devolvida tanto nos acertos quanto nas execuções,
+    para que quem chama receba sempre o mesmo tipo.
+    """
+    if result is None or isinstance(result, (str, dict, list)):
+        return result
+    return str(result)
+
+
+def _cache_store(cache, key, result):
+    """Armazena uma resposta bem-sucedida no cache"""
+    if cache is None or not result or (isinstance(result, str) and result.startswith("Erro")):
+        return
+    try:
+        cache.set(key, cacheable_result(result))
+    except Exception as e:
+        print(f"⚠️ Falha ao gravar no cache de respostas: {e}")
+
+
+def run_crew_cached(crew, initial_context=None, cache=None):
+    """
+    Executa a crew consultando antes o cache de respostas
+
+    Só intenções somente leitura (TAREFO_CACHE_INTENTS) usam o cache. A chave
+    combina o contexto normalizado para a intenção detectada com a versão da
+    configuração, de modo que alterar o YAML invalida as respostas anteriores.
+    Respostas de erro não são armazenadas. O resultado tem sempre a forma do
+    cache (texto, dict ou lista), com ou sem acerto.
+    """
+    if not crew:
+        return run_crew(crew, initial_context)
+
+    cache, key, found, cached = _cache_lookup(initial_context, cache)
+    if found:
+        return cached
+
+    result = cacheable_result(run_crew(crew, initial_context))
+    _cache_store(cache, key, result)
+    return result
+
+
+def _task_completed_event(output):
+    """Converte a saída de uma tarefa do crewai em evento de streaming"""
+    text = getattr(output, "raw", None)
+    if text is None:
+        text = str(output)
+    return {
+        "event": "task_completed",
+        "task": getattr(output, "description", None),
+        "output": text,
+    }
+
+
+def run_crew_stream(crew, initial_context=None):
+    """
+    Executa a crew e produz eventos à medida que a execução avança
+
+    Yields:
+        dict: {"event": "started"}, {"event": "task_completed", "task", "output"},
+            {"event": "token", "text"} (se o LLM estiver em modo streaming) e, por
+            fim, {"event": "result", "result"} ou {"event": "error", "error"}
+    """
+    import queue
+
+    if not crew:
+        print("❌ CrewAI não inicializado. Impossível executar.")
+        yield {"event": "error", "error": "Erro: sistema não inicializado corretamente"}
+        return
+
+    events = queue.Queue()
+    done = object()
+    # Só esta execução usa o LLM em modo streaming; as demais seguem sem streaming
+    stream_llm = _stream_llm()
+    if stream_llm is not None:
+        _stream_sinks[id(stream_llm)] = events.put
+
+    def on_task(output):
+        if not hasattr(crew, "graph"):
+            record_task_timing(output)
+        events.put(_task_completed_event(output))
+
+    def execute():
+        try:
+            print("🔄 Executando CrewAI (streaming)...")
+            if hasattr(crew, "graph"):
+                # ScheduledCrew aceita o callback e o LLM por execução
+                result = _timed_kickoff(crew, initial_context, task_callback=on_task, llm=stream_llm)
+            else:
+                # Uma cópia evita alterar o callback e o LLM da crew compartilhada
+                runner = crew_for_call(crew)
+                try:
+                    runner.task_callback = on_task
+                except Exception:
+                    pass
+                if stream_llm is not None and runner is not crew:
+                    _use_llm(runner, stream_llm)
+                result = _timed_kickoff(runner, initial_context)
+            print("✅ Execução do CrewAI concluída")
+            events.put({"event": "result", "result": result})
+        except Exception as e:
+            print(f"❌ Erro ao executar CrewAI: {e}")
+            events.put({"event": "error", "error": f"Erro durante o processamento: {str(e)}"})
+        finally:
+            if stream_llm is not None:
+                _stream_sinks.pop(id(stream_llm), None)
+            events.put(done)
+
+    thread = threading.Thread(
+        target=contextvars.copy_context().run, args=(execute,),
+        name="tarefo-stream", daemon=True
+    )
+    thread.start()
+    yield {"event": "started"}
+
+    while True:
+        event = events.get()
+        if event is done:
+            break
+        yield event
+
+
+_async_executor = None
+_async_workers = None
+
+
+def get_async_executor():
+    """
+    Pool de threads usado pelas funções assíncronas para trabalho bloqueante
+
+    O tamanho acompanha TAREFO_ASYNC_CONCURRENCY (padrão: 32) ou
+    set_async_workers, para que o pool padrão do asyncio não limite o número de
+    conversas em andamento.
+    """
+    global _async_executor
+    with _load_lock:
+        if _async_executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            _async_executor = ThreadPoolExecutor(
+                max_workers=_async_workers or int(os.environ.get("TAREFO_ASYNC_CONCURRENCY", "32")),
+                thread_name_prefix="tarefo-async"
+            )
+        return _async_executor
+
+
+def set_async_workers(limit):
+    """
+    Redimensiona o pool das funções assíncronas
+
+    As chamadas seguintes usam um pool novo; as já enviadas terminam no anterior.
+    """
+    global _async_executor, _async_workers
+    with _load_lock:
+        _async_workers = max(1, int(limit))
+        previous, _async_executor = _async_executor, None
+    if previous is not None:
+        previous.shutdown(wait=False)
+
+
+async def run_in_thread(func, *args):
+    """Executa uma função bloqueante no pool assíncrono"""
+    import asyncio
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_async_executor(), func, *args)
+
+
+async def run_crew_async(crew, initial_context=None):
+    """
+    Versão assíncrona de run_crew
+
+    Usa `kickoff_async` quando a versão do crewai oferece; caso contrário executa
+    `kickoff` em uma thread do pool.
+    """
+    try:
+        if not crew:
+            print("❌ CrewAI não inicializado. Impossível executar.")
+            return "Erro: sistema não inicializado corretamente"
+
+        print("🔄 Executando CrewAI (assíncrono)...")
+        # Várias execuções assíncronas podem usar a mesma crew memoizada
+        runner = crew_for_call(crew)
+        kickoff_async = getattr(runner, "kickoff_async", None)
+        if kickoff_async is not None:
+            _task_clock.set(time.perf_counter())
+            with timer("tarefo_crew_kickoff_seconds"):
+                result = await kickoff_async(inputs=initial_context)
+        else:
+            result = await run_in_thread(_timed_kickoff, runner, initial_context)
+        print("✅ Execução do CrewAI concluída")
+        return result
+
+    except Exception as e:
+        print(f"❌ Erro ao executar CrewAI: {e}")
+        return f"Erro durante o processamento: {str(e)}"
+
+
+async def run_crew_cached_async(crew, initial_context=None, cache=None):
+    """Versão assíncrona de run_crew_cached"""
+    if not crew:
+        return await run_crew_async(crew, initial_context)
+
+    cache, key, found, cached = await run_in_thread(_cache_lookup, initial_context, cache)
+    if found:
+        return cached
+
+    result = cacheable_result(await run_crew_async(crew, initial_context))
+    await run_in_thread(_cache_store, cache, key, result)
+    return result
+
 # Exporta as funções principais para uso em outros módulos
-__all__ = ['initialize_crew', 'run_crew']
\ No newline at end of file
+__all__ = [
+    'initialize_crew', 'run_crew', 'run_crew_cached', 'get_crew', 'crew_registry', 'CrewRegistry',
+    'detect_intent', 'get_crew_for_context', 'load_crewai', 'load_config',
+    'run_crew_async', 'run_crew_cached_async', 'run_in_thread', 'run_crew_stream', 'cacheable_result',
+    'crew_for_call', 'get_async_executor', 'set_async_workers'
+]
\ No newline at end of file
@@ -6,9 +6,16 @@ import sys
 from pathlib import Path
 import json
 import yaml
+import asyncio
+import weakref
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 
 # Importa as funções reais do framework CrewAI
-from crew import initialize_crew, run_crew
+from crew import (
+    get_crew_for_context, run_crew, run_crew_cached,
+    run_crew_async, run_crew_cached_async, run_in_thread, run_crew_stream
+)
+from crew import _cache_lookup, _cache_store, cacheable_result, crew_for_call, set_async_workers
 
 # Configuração do ambiente
 def setup_environment():
@@ -50,6 +57,24 @@ def setup_environment():
     if llm_provider:
         print(f"🤖 Provedor LLM ativo: {llm_provider}")
 
+def _parse_image_result(result):
+    """Tenta converter o resultado da extração para um formato estruturado"""
+    try:
+        if isinstance(result, str):
+            return json.loads(result)
+        return result
+    except:
+        return {"text": result}
+
+def _parse_compliance_result(result):
+    """Tenta converter o resultado da verificação para um formato estruturado"""
+    try:
+        if isinstance(result, str):
+            return json.loads(result)
+        return result
+    except:
+        return {"compliant": False, "reason": "Erro ao processar verificação", "details": result}
+
 def process_user_message(user_id, message, platform="app"):
     """
     Processa uma mensagem do usuário usando o framework CrewAI
@@ -63,9 +88,6 @@ def process_user_message(user_id, message, platform="app"):
         str: Resposta processada
     """
     try:
-        # Inicializa o CrewAI (se ainda não estiver inicializado)
-        crew = initialize_crew()
-        
         # Contexto inicial para a execução
         context = {
             "user_id": user_id,
@@ -74,8 +96,11 @@ def process_user_message(user_id, message, platform="app"):
             "timestamp": ""  # Poderia ser preenchido com datetime.now().isoformat()
         }
         
-        # Executa o processamento com o CrewAI
-        result = run_crew(crew, context)
+        # Seleciona a sub-crew da intenção (construída apenas uma vez)
+        crew = get_crew_for_context(context)
+        
+        # Executa o processamento com o CrewAI (mensagens repetidas vêm do cache)
+        result = run_crew_cached(crew, context)
         
         # Se não houver resultado, fornece uma resposta genérica
         if not result:
@@ -87,6 +112,56 @@ def process_user_message(user_id, message, platform="app"):
         print(f"❌ Erro ao processar mensagem: {e}")
         return f"Erro no processamento: {str(e)}"
 
+def process_user_message_stream(user_id, message, platform="app"):
+    """
+    Processa uma mensagem produzindo eventos incrementais (streaming)
+    
+    Yields:
+        dict: Eventos de run_crew_stream; o último é {"event": "result", "result"}
+            ou {"event": "error", "error"}
+    """
+    context = {
+        "user_id": user_id,
+        "message": message,
+        "platform": platform,
+        "timestamp": ""
+    }
+    try:
+        cache, key, found, cached = _cache_lookup(context)
+        if found:
+            yield {"event": "result", "result": cached, "cached": True}
+            return
+        
+        crew = get_crew_for_context(context)
+        for event in run_crew_stream(crew, context):
+            if event["event"] == "result":
+                if not event["result"]:
+                    event["result"] = "Desculpe, não consegui processar sua mensagem. Por favor, tente novamente mais tarde."
+                else:
+                    # Mesma forma da resposta vinda do cache
+                    event["result"] = cacheable_result(event["result"])
+                    _cache_store(cache, key, event["result"])
+            yield event
+    
+    except Exception as e:
+        print(f"❌ Erro ao processar mensagem: {e}")
+        yield {"event": "error", "error": f"Erro no processamento: {str(e)}"}
+
+def _extract_document(image_path, extract_type):
+    """
+    Extrai recibo ou nota fiscal por regras sobre o texto do documento
+    
+    Returns:
+        dict: Campos extraídos (com needs_review) ou None se a extração falhar
+    """
+    from tools.ocr_tool import ocr_tool
+    
+    document = ocr_tool.run(image_path, extract_type)
+    if "error" in document:
+        print(f"⚠️ Extração por regras falhou ({extract_type}): {document['error']}")
+        return None
+    return document
+
 def process_image(user_id, image_path, extract_type="full"):
     """
     Processa uma imagem enviada pelo usuário
@@ -100,9 +175,6 @@ def process_image(user_id, image_path, extract_type="full"):
         dict: Dados extraídos da imagem
     """
     try:
-        # Inicializa o CrewAI
-        crew = initialize_crew()
-        
         # Contexto inicial para a execução
         context = {
             "user_id": user_id,
@@ -110,21 +182,106 @@ def process_image(user_id, image_path, extract_type="full"):
             "extract_type": extract_type
         }
         
+        # Recibos e notas legíveis são resolvidos por regras, sem passar pelo LLM
+        if extract_type in ("receipt", "invoice"):
+            document = _extract_document(image_path, extract_type)
+            if document is not None and not document.get("needs_review"):
+                return document
+            context[f"{extract_type}_draft"] = document
+        
+        # Seleciona a sub-crew da intenção (construída apenas uma vez)
+        crew = get_crew_for_context(context)
+        
         # Executa o processamento com o CrewAI
         result = run_crew(crew, context)
         
-        # Tenta converter o resultado para um formato estruturado
-        try:
-            if isinstance(result, str):
-                return json.loads(result)
-            return result
-        except:
-            return {"text": result}
+        return _parse_image_result(result)
     
     except Exception as e:
         print(f"❌ Erro ao processar imagem: {e}")
         return {"error": str(e)}
 
+def process_image_stream(user_id, image_path, extract_type="full"):
+    """
+    Extrai um documento página a página, sem passar pela crew
+    
+    Para documentos longos (extratos de 100 páginas): cada página é entregue assim
+    que fica pronta e a memória não cresce com o tamanho do documento.
+    
+    Yields:
+        dict: {"event": "page", "page": {...}} por página e, por fim,
+            {"event": "result", "result": {"pages"}} ou {"event": "error", "error"}
+    """
+    from tools.ocr_tool import ocr_tool
+    
+    print(f"📄 Extração por página para o usuário {user_id}")
+    pages = 0
+    for page in ocr_tool.iter_pages(image_path, extract_type):
+        if "error" in page:
+            yield {"event": "error", "error": page["error"]}
+            return
+        pages += 1
+        yield {"event": "page", "page": page}
+    yield {"event": "result", "result": {"pages": pages, "extract_type": extract_type}}
+
+def submit_image(user_id, image_path, extract_type="full", priority=None):
+    """
+    Enfileira uma imagem para OCR sem bloquear a requisição
+    
+    O job é processado pelo pool de workers de OCR (python -m tools.ocr_queue);
+    o resultado é consultado com get_image_job.
+    
+    Args:
+        user_id (int): ID do usuário
+        image_path (str): Caminho ou dados base64 da imagem
+        extract_type (str): Tipo de extração (full, receipt, invoice)
+        priority: Prioridade do job, número ou nome (interactive, normal, bulk);
+            padrão: interativa, exceto recibos e notas, que entram como lote
+        
+    Returns:
+        dict: {"job_id"} ou {"error"}
+    """
+    from tools.ocr_queue import get_ocr_queue
+    from tools.ocr_tool import ocr_tool
+    from tools.upload_store import touch_upload
+    
+    try:
+        if not os.path.exists(str(image_path)):
+            # Payload base64/bytes: grava antes, o job só carrega o caminho
+            image_path = ocr_tool.save_image_from_base64(image_path)
+            if not image_path:
+                return {"error": "Falha ao processar dados da imagem"}
+        else:
+            # Upload já armazenado reenviado pelo caminho: renova o prazo
+            touch_upload(image_path)
+        job_id = get_ocr_queue().submit(image_path, extract_type, priority=priority)
+        print(f"📥 Job de OCR {job_id} enfileirado para o usuário {user_id}")
+        return {"job_id": job_id}
+    
+    except Exception as e:
+        print(f"❌ Erro ao enfileirar imagem: {e}")
+        return {"error": str(e)}
+
+def get_image_job(job_id):
+    """
+    Consulta um job de OCR enfileirado
+    
+    Returns:
+        dict: job_id, status (queued, running, done, failed), attempts e result/error
+    """
+    from tools.ocr_queue import get_ocr_queue
+    
+    job = get_ocr_queue().get(job_id)
+    if job is None:
+        return {"job_id": job_id, "error": "Job não encontrado"}
+    return {
+        "job_id": job_id,
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "result": job["result"],
+        "error": job["error"],
+    }
+
 def check_compliance(operation, data):
     """
     Verifica conformidade com regulamentos como LGPD/GDPR
@@ -137,36 +294,239 @@ def check_compliance(operation, data):
         dict: Resultado da verificação
     """
     try:
-        # Inicializa o CrewAI
-        crew = initialize_crew()
-        
         # Contexto inicial para a execução
         context = {
             "operation": operation,
             "data": data
         }
         
+        # Seleciona a sub-crew da intenção (construída apenas uma vez)
+        crew = get_crew_for_context(context)
+        
         # Executa o processamento com o CrewAI
         result = run_crew(crew, context)
         
-        # Tenta converter o resultado para um formato estruturado
-        try:
-            if isinstance(result, str):
-                return json.loads(result)
-            return result
-        except:
-            return {"compliant": False, "reason": "Erro ao processar verificação", "details": result}
+        return _parse_compliance_result(result)
     
     except Exception as e:
         print(f"❌ Erro ao verificar conformidade: {e}")
         return {"compliant": False, "reason": str(e)}
 
+def check_compliance_batch_stream(records, operation=None, max_workers=None):
+    """
+    Verifica a conformidade de uma exportação inteira, sem passar pela crew
+    
+    Args:
+        records: Iterável de registros ou caminho de um arquivo JSONL
+        operation (str): Operação dos registros que não informam a sua
+        max_workers (int): Processos do pool (padrão: TAREFO_COMPLIANCE_BATCH_WORKERS)
+        
+    Yields:
+        dict: {"event": "record", "record": {...}} por registro e, por fim,
+            {"event": "result", "result": resumo} ou {"event": "error", "error"}
+    """
+    from tools.compliance_checker_tool import check_compliance_batch
+    
+    try:
+        for item in check_compliance_batch(records, operation, max_workers=max_workers, ordered=True):
+            if "summary" in item:
+                yield {"event": "result", "result": item["summary"]}
+            else:
+                yield {"event": "record", "record": item}
+    except Exception as e:
+        print(f"❌ Erro na verificação de conformidade em lote: {e}")
+        yield {"event": "error", "error": str(e)}
+
+def _batch_item_args(item):
+    """Converte um item do lote (dict ou tupla) em (user_id, message, platform)"""
+    if isinstance(item, dict):
+        return item.get("user_id"), item.get("message", ""), item.get("platform", "app")
+    if isinstance(item, (list, tuple)) and 2 <= len(item) <= 3:
+        return (tuple(item) + ("app",))[:3]
+    raise ValueError(f"Item de lote inválido: {item!r}")
+
+def _process_batch_item(item):
+    """Processa um item do lote; erros são propagados para o chamador"""
+    user_id, message, platform = _batch_item_args(item)
+    context = {
+        "user_id": user_id,
+        "message": message,
+        "platform": platform,
+        "timestamp": ""
+    }
+    crew = get_crew_for_context(context)
+    if crew is None:
+        raise RuntimeError("CrewAI não inicializado")
+    # Crews do crewai não são reentrantes; uma cópia por item evita
+    # reconstruir agentes e tarefas (o mesmo que Crew.kickoff_for_each faz)
+    result = run_crew_cached(crew_for_call(crew), context)
+    # run_crew devolve os erros como texto; no lote eles viram erros do item
+    if isinstance(result, str) and result.startswith("Erro"):
+        raise RuntimeError(result)
+    if not result:
+        return "Desculpe, não consegui processar sua mensagem. Por favor, tente novamente mais tarde."
+    return result
+
+def process_messages_batch(messages, max_workers=None, ordered=False):
+    """
+    Processa várias mensagens usando as crews já inicializadas
+    
+    Args:
+        messages: Iterável de dicts (user_id, message, platform) ou tuplas
+            (user_id, message[, platform])
+        max_workers (int): Mensagens processadas em paralelo
+            (padrão: TAREFO_BATCH_WORKERS ou 4)
+        ordered (bool): True para devolver na ordem de entrada; False para
+            devolver na ordem de conclusão
+        
+    Yields:
+        dict: {"index", "ok", "result"} ou {"index", "ok", "error"}; um item com
+            erro não interrompe o lote
+    """
+    max_workers = max_workers or int(os.environ.get("TAREFO_BATCH_WORKERS", "4"))
+    # Limita quantos itens do iterável ficam pendentes ao mesmo tempo, incluindo os
+    # concluídos que aguardam os anteriores (ordered=True)
+    window = max_workers * 2
+    items = enumerate(messages)
+    pending = {}
+    buffered = {}
+    next_index = 0
+    exhausted = False
+    
+    def outcome(index, future):
+        try:
+            return {"index": index, "ok": True, "result": future.result()}
+        except Exception as e:
+            print(f"❌ Erro ao processar mensagem {index} do lote: {e}")
+            return {"index": index, "ok": False, "error": str(e)}
+    
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tarefo-batch") as pool:
+        while True:
+            while not exhausted and len(pending) + len(buffered) < window:
+                try:
+                    index, item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending[pool.submit(_process_batch_item, item)] = index
+            
+            if not pending:
+                break
+            
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in sorted(done, key=pending.get):
+                index = pending.pop(future)
+                if not ordered:
+                    yield outcome(index, future)
+                else:
+                    buffered[index] = outcome(index, future)
+            
+            while next_index in buffered:
+                yield buffered.pop(next_index)
+                next_index += 1
+
+# Limite de requisições assíncronas simultâneas por event loop
+ASYNC_CONCURRENCY = int(os.environ.get("TAREFO_ASYNC_CONCURRENCY", "32"))
+_semaphores = weakref.WeakKeyDictionary()
+
+def set_async_concurrency(limit):
+    """Altera o limite de requisições assíncronas simultâneas e o pool de threads"""
+    global ASYNC_CONCURRENCY
+    ASYNC_CONCURRENCY = max(1, int(limit))
+    _semaphores.clear()
+    set_async_workers(ASYNC_CONCURRENCY)
+
+def _get_semaphore():
+    """Retorna o semáforo de concorrência do event loop atual"""
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(ASYNC_CONCURRENCY)
+        _semaphores[loop] = semaphore
+    return semaphore
+
+async def process_user_message_async(user_id, message, platform="app"):
+    """
+    Versão assíncrona de process_user_message
+    
+    Várias conversas podem estar em andamento no mesmo processo, limitadas por
+    TAREFO_ASYNC_CONCURRENCY (ou set_async_concurrency).
+    """
+    async with _get_semaphore():
+        try:
+            context = {
+                "user_id": user_id,
+                "message": message,
+                "platform": platform,
+                "timestamp": ""
+            }
+            crew = await run_in_thread(get_crew_for_context, context)
+            result = await run_crew_cached_async(crew, context)
+            
+            if not result:
+                return "Desculpe, não consegui processar sua mensagem. Por favor, tente novamente mais tarde."
+            
+            return result
+        
+        except Exception as e:
+            print(f"❌ Erro ao processar mensagem: {e}")
+            return f"Erro no processamento: {str(e)}"
+
+async def process_image_async(user_id, image_path, extract_type="full"):
+    """Versão assíncrona de process_image"""
+    async with _get_semaphore():
+        try:
+            context = {
+                "user_id": user_id,
+                "image_path": image_path,
+                "extract_type": extract_type
+            }
+            if extract_type in ("receipt", "invoice"):
+                document = await run_in_thread(_extract_document, image_path, extract_type)
+                if document is not None and not document.get("needs_review"):
+                    return document
+                context[f"{extract_type}_draft"] = document
+            crew = await run_in_thread(get_crew_for_context, context)
+            result = await run_crew_async(crew, context)
+            return _parse_image_result(result)
+        
+        except Exception as e:
+            print(f"❌ Erro ao processar imagem: {e}")
+            return {"error": str(e)}
+
+async def check_compliance_async(operation, data):
+    """Versão assíncrona de check_compliance"""
+    async with _get_semaphore():
+        try:
+            context = {
+                "operation": operation,
+                "data": data
+            }
+            crew = await run_in_thread(get_crew_for_context, context)
+            result = await run_crew_async(crew, context)
+            return _parse_compliance_result(result)
+        
+        except Exception as e:
+            print(f"❌ Erro ao verificar conformidade: {e}")
+            return {"compliant": False, "reason": str(e)}
+
 if __name__ == "__main__":
+    # Modo streaming: python main.py --stream "sua mensagem aqui"
+    # Os eventos saem como JSON-lines em stdout; os logs vão para stderr
+    streaming = len(sys.argv) > 2 and sys.argv[1] == "--stream"
+    protocol_out = sys.stdout
+    if streaming:
+        sys.stdout = sys.stderr
+    
     # Configuração inicial
     setup_environment()
     
+    if streaming:
+        for event in process_user_message_stream(1, sys.argv[2]):
+            protocol_out.write(json.dumps(event, ensure_ascii=False, default=str) + "\n")
+            protocol_out.flush()
     # Teste simples
-    if len(sys.argv) > 1:
+    elif len(sys.argv) > 1:
         # Modo de teste: python main.py "sua mensagem aqui"
         result = process_user_message(1, sys.argv[1])
         print(f"\nResposta: {result}")
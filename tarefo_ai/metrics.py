@@ -0,0 +1,225 @@
+"""
+TarefoAI - Métricas de latência por etapa
+
+Histogramas em memória para as etapas de uma requisição (carga da configuração,
+construção da crew, execução de cada tarefa, chamadas de ferramentas e a
+requisição completa), exportados no formato texto do Prometheus.
+
+Uso:
+    with timer("tarefo_crew_build_seconds", crew="reminder"):
+        ...
+
+    print(render_prometheus())
+
+O worker expõe as métricas pelo método `metrics` do protocolo, por HTTP em
+127.0.0.1:TAREFO_METRICS_PORT e/ou gravando o arquivo TAREFO_METRICS_FILE.
+"""
+import os
+import time
+import threading
+import functools
+from contextlib import contextmanager
+
+# Limites dos buckets em segundos (de chamadas de ferramentas até execuções do LLM)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Descrição de cada métrica registrada
+METRICS = {
+    "tarefo_config_load_seconds": "Tempo para ler agents.yaml e tasks.yaml",
+    "tarefo_crew_build_seconds": "Tempo para construir agentes, tarefas e a crew",
+    "tarefo_crew_kickoff_seconds": "Tempo de execução completo da crew",
+    "tarefo_task_seconds": "Tempo de execução de cada tarefa",
+    "tarefo_tool_seconds": "Tempo de cada chamada de ferramenta",
+    "tarefo_ocr_preprocess_seconds": "Tempo de cada etapa do pré-processamento de OCR",
+    "tarefo_request_seconds": "Tempo total de cada requisição do worker",
+}
+
+
+class Histogram:
+    """Histograma cumulativo com séries por conjunto de labels"""
+
+    def __init__(self, name, help_text="", buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        """Registra uma observação (em segundos)"""
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+                self._series[key] = series
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][index] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def snapshot(self):
+        """Retorna uma cópia serializável em JSON do histograma"""
+        with self._lock:
+            return {
+                "help": self.help,
+                "buckets": list(self.buckets),
+                "series": [
+                    {
+                        "labels": dict(key),
+                        "counts": list(series["counts"]),
+                        "sum": series["sum"],
+                        "count": series["count"],
+                    }
+                    for key, series in self._series.items()
+                ],
+            }
+
+
+_histograms = {}
+_registry_lock = threading.Lock()
+
+
+def histogram(name):
+    """Retorna (criando se preciso) o histograma com o nome informado"""
+    with _registry_lock:
+        hist = _histograms.get(name)
+        if hist is None:
+            hist = Histogram(name, METRICS.get(name, ""))
+            _histograms[name] = hist
+        return hist
+
+
+def observe(name, seconds, **labels):
+    """Registra uma duração no histograma `name`"""
+    histogram(name).observe(seconds, **labels)
+
+
+@contextmanager
+def timer(name, **labels):
+    """Mede o bloco e registra a duração, mesmo se houver exceção"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def timed_tool(tool, action_arg=False):
+    """
+    Decorador que mede uma função de ferramenta
+
+    Com action_arg=True, o primeiro argumento (ex.: "send_message") vira o label
+    action; caso contrário, o label é o nome da função.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            action = func.__name__
+            if action_arg and args and isinstance(args[0], str):
+                action = args[0]
+            with timer("tarefo_tool_seconds", tool=tool, action=action):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def snapshot():
+    """Retorna todas as métricas do processo em formato serializável"""
+    with _registry_lock:
+        hists = list(_histograms.values())
+    return {hist.name: hist.snapshot() for hist in hists}
+
+
+def merge_snapshots(snapshots):
+    """
+    Junta snapshots de vários processos
+
+    Args:
+        snapshots: Lista de (labels extras, snapshot), ex.: ({"worker": "0"}, {...})
+    """
+    merged = {}
+    for extra_labels, snap in snapshots:
+        for name, hist in (snap or {}).items():
+            target = merged.setdefault(
+                name, {"help": hist.get("help", ""), "buckets": hist["buckets"], "series": []}
+            )
+            for series in hist["series"]:
+                target["series"].append(dict(series, labels={**series["labels"], **extra_labels}))
+    return merged
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    parts = []
+    for key, value in sorted(labels.items()):
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def render_prometheus(snap=None):
+    """Gera o texto no formato de exposição do Prometheus"""
+    snap = snapshot() if snap is None else snap
+    lines = []
+    for name in sorted(snap):
+        hist = snap[name]
+        lines.append(f"# HELP {name} {hist.get('help', '')}")
+        lines.append(f"# TYPE {name} histogram")
+        for series in hist["series"]:
+            labels = series["labels"]
+            for bound, count in zip(hist["buckets"], series["counts"]):
+                lines.append(f"{name}_bucket{_format_labels({**labels, 'le': repr(float(bound))})} {count}")
+            lines.append(f"{name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {series['count']}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {series['sum']}")
+            lines.append(f"{name}_count{_format_labels(labels)} {series['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path, snap=None):
+    """Grava as métricas em um arquivo (troca atômica, para leitura pelo node_exporter)"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(render_prometheus(snap))
+    os.replace(tmp_path, path)
+
+
+def start_http_server(port, provider=None, host="127.0.0.1"):
+    """
+    Serve as métricas em http://host:port/metrics em uma thread daemon
+
+    Args:
+        port (int): Porta local
+        provider: Função sem argumentos que retorna o snapshot (padrão: snapshot)
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    provider = provider or snapshot
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") not in ("", "/metrics"):
+                self.send_error(404)
+                return
+            body = render_prometheus(provider()).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, int(port)), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="tarefo-metrics", daemon=True).start()
+    print(f"📈 Métricas disponíveis em http://{host}:{port}/metrics")
+    return server
+
+
+__all__ = [
+    'Histogram', 'histogram', 'observe', 'timer', 'timed_tool', 'snapshot',
+    'merge_snapshots', 'render_prometheus', 'write_prometheus', 'start_http_server'
+]
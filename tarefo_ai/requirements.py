@@ -9,6 +9,9 @@ requirements = [
     "python-dotenv",
     "pydantic",
     "pillow",
+    "pytesseract",
+    "pdf2image",
+    "pypdf",
     "pyyaml",
     "python-telegram-bot"
 ]
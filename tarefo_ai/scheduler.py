@@ -0,0 +1,221 @@
+"""
+TarefoAI - Execução concorrente das tarefas da crew
+
+Monta um grafo de dependências (DAG) a partir de tasks.yaml e executa as tarefas
+independentes em paralelo em um pool de threads limitado. As regras são:
+
+- toda tarefa depende da tarefa síncrona anterior, de modo que recebe o
+  resultado dela como no processo sequencial;
+- uma tarefa com `async_execution: false` passa a ser a referência das
+  seguintes, preservando a ordem do processo sequencial;
+- uma tarefa com `async_execution: true` não bloqueia as seguintes e pode rodar
+  em paralelo com as demais;
+- `depends_on` lista as `description` de outras tarefas das quais ela também
+  depende. As entradas de `context` são instruções em texto livre para o agente
+  e não criam dependências.
+
+Os resultados das dependências chegam à tarefa pelo `Task.context` do crewai, que
+inclui a saída das tarefas listadas no prompt. Os resultados são sempre reunidos
+na ordem do arquivo de configuração.
+"""
+import os
+import copy
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from metrics import observe
+
+DEFAULT_MAX_WORKERS = int(os.environ.get("TAREFO_MAX_PARALLEL_TASKS", "4"))
+
+
+def build_task_graph(task_configs):
+    """
+    Calcula as dependências de cada tarefa
+
+    Args:
+        task_configs (list): Entradas de tasks.yaml, na ordem do arquivo
+
+    Returns:
+        list: Para cada tarefa, o conjunto de índices das tarefas de que depende
+
+    Referências de `depends_on` a tarefas fora da lista (ex.: removidas de uma
+    sub-crew por intenção) são ignoradas com um aviso.
+
+    Raises:
+        ValueError: Se as dependências formarem um ciclo
+    """
+    index_by_description = {}
+    for index, config in enumerate(task_configs):
+        index_by_description.setdefault(config.get("description"), index)
+
+    graph = []
+    last_sync = None
+    for index, config in enumerate(task_configs):
+        deps = set()
+        for reference in config.get("depends_on") or []:
+            dep = index_by_description.get(reference)
+            if dep is None:
+                print(f"⚠️ Tarefa '{config.get('description')}' depende de uma tarefa ausente: {reference}")
+            elif dep != index:
+                deps.add(dep)
+
+        if last_sync is not None:
+            deps.add(last_sync)
+        if not config.get("async_execution", False):
+            last_sync = index
+
+        graph.append(deps)
+
+    _check_acyclic(graph)
+    return graph
+
+
+def _check_acyclic(graph):
+    """Lança ValueError se o grafo tiver ciclos"""
+    state = [0] * len(graph)  # 0: não visitado, 1: em visita, 2: concluído
+
+    def visit(node):
+        if state[node] == 1:
+            raise ValueError(f"Dependência circular envolvendo a tarefa {node}")
+        if state[node] == 2:
+            return
+        state[node] = 1
+        for dep in graph[node]:
+            visit(dep)
+        state[node] = 2
+
+    for node in range(len(graph)):
+        visit(node)
+
+
+def run_dag(graph, run_node, max_workers=None):
+    """
+    Executa os nós do grafo respeitando as dependências
+
+    Args:
+        graph (list): Dependências de cada nó (saída de build_task_graph)
+        run_node: Função (índice, {dep: resultado}) -> resultado
+        max_workers (int): Máximo de nós executando ao mesmo tempo
+
+    Returns:
+        list: Resultados na ordem dos nós
+    """
+    count = len(graph)
+    results = [None] * count
+    if not count:
+        return results
+
+    pending = {node: set(deps) for node, deps in enumerate(graph)}
+    dependents = {node: [] for node in range(count)}
+    for node, deps in enumerate(graph):
+        for dep in deps:
+            dependents[dep].append(node)
+
+    max_workers = max(1, min(max_workers or DEFAULT_MAX_WORKERS, count))
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tarefo-task") as pool:
+        running = {}
+
+        def submit_ready():
+            for node in sorted(n for n, deps in pending.items() if not deps):
+                del pending[node]
+                inputs = {dep: results[dep] for dep in sorted(graph[node])}
+                # Propaga contextvars (ex.: destino do streaming) para a thread
+                context = contextvars.copy_context()
+                running[pool.submit(context.run, run_node, node, inputs)] = node
+
+        submit_ready()
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                node = running.pop(future)
+                try:
+                    results[node] = future.result()
+                except Exception:
+                    for other in running:
+                        other.cancel()
+                    raise
+                for dependent in dependents[node]:
+                    pending[dependent].discard(node)
+            submit_ready()
+
+    return results
+
+
+class _NodeOutput:
+    """Saída de uma tarefa do DAG no formato esperado por task_callback"""
+
+    def __init__(self, description, output):
+        self.description = description
+        self.raw = getattr(output, "raw", None) or str(output)
+
+    def __str__(self):
+        return self.raw
+
+
+def _node_task(task, context, llm=None):
+    """
+    Cópia da tarefa para uma execução do DAG
+
+    `context` recebe as cópias das tarefas de que ela depende nessa mesma
+    execução: o crewai lê a saída delas (`task.output`) ao montar o prompt. O
+    agente também é copiado, pois tarefas paralelas podem usar o mesmo agente;
+    com `llm`, a cópia do agente usa esse LLM (ex.: em modo streaming).
+    """
+    agent = task.agent
+    if hasattr(agent, "copy"):
+        agent = agent.copy()
+        if llm is not None:
+            agent.llm = llm
+    if hasattr(task, "model_copy"):
+        return task.model_copy(update={"agent": agent, "context": context or None, "output": None})
+    clone = copy.copy(task)
+    clone.agent = agent
+    clone.context = context or None
+    clone.output = None
+    return clone
+
+
+class ScheduledCrew:
+    """
+    Crew que executa cada tarefa como uma crew de uma tarefa só, seguindo o DAG
+
+    Expõe o mesmo `kickoff(inputs)` da Crew; o resultado é o da última tarefa
+    na ordem do arquivo, como no processo sequencial. Cada execução usa cópias
+    próprias das tarefas e das crews, então execuções simultâneas não misturam
+    as saídas das tarefas.
+    """
+
+    def __init__(self, agents, tasks, task_configs, crew_factory, max_workers=None):
+        self.agents = agents
+        self.tasks = tasks
+        self.graph = build_task_graph(task_configs)
+        self.max_workers = max_workers or DEFAULT_MAX_WORKERS
+        self.crew_factory = crew_factory
+
+    def kickoff(self, inputs=None, task_callback=None, llm=None):
+        inputs = dict(inputs or {})
+        # As cópias seguem a ordem do arquivo, então as dependências já existem
+        node_tasks = []
+        for index, task in enumerate(self.tasks):
+            context = [node_tasks[dep] for dep in sorted(self.graph[index])]
+            node_tasks.append(_node_task(task, context, llm))
+
+        def run_node(index, dep_results):
+            task = node_tasks[index]
+            started = time.perf_counter()
+            output = self.crew_factory(task).kickoff(inputs=inputs)
+            observe(
+                "tarefo_task_seconds", time.perf_counter() - started,
+                task=str(task.description)[:80],
+                agent=getattr(task.agent, "role", ""),
+            )
+            if task_callback is not None:
+                task_callback(_NodeOutput(task.description, output))
+            return output
+
+        outputs = run_dag(self.graph, run_node, self.max_workers)
+        return outputs[-1] if outputs else None
+
+
+__all__ = ['build_task_graph', 'run_dag', 'ScheduledCrew']
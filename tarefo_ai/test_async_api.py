@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Testes da API assíncrona
+
+Confere que várias chamadas assíncronas simultâneas sobre a mesma crew memoizada
+não executam a crew compartilhada em paralelo (cada chamada usa uma cópia) e que
+set_async_concurrency redimensiona o pool de threads usado pelo kickoff.
+"""
+import os
+import sys
+import time
+import asyncio
+import threading
+
+import pytest
+
+import main
+from crew import run_crew_async, get_async_executor
+
+
+@pytest.fixture(autouse=True)
+def cache_off(monkeypatch):
+    """O cache de respostas fica desligado só durante os testes deste arquivo"""
+    monkeypatch.setenv("TAREFO_CACHE", "off")
+
+
+class NonReentrantCrew:
+    """Crew que falha se duas execuções entrarem na mesma instância"""
+
+    def __init__(self, stats):
+        self.stats = stats
+        self.running = False
+
+    def copy(self):
+        self.stats["copies"] += 1
+        return NonReentrantCrew(self.stats)
+
+    def kickoff(self, inputs=None):
+        if self.running:
+            raise RuntimeError("crew executada em paralelo")
+        self.running = True
+        try:
+            with self.stats["lock"]:
+                self.stats["active"] += 1
+                self.stats["peak"] = max(self.stats["peak"], self.stats["active"])
+            time.sleep(0.05)
+            return f"resposta para {inputs['user_id']}"
+        finally:
+            with self.stats["lock"]:
+                self.stats["active"] -= 1
+            self.running = False
+
+
+def new_stats():
+    return {"copies": 0, "active": 0, "peak": 0, "lock": threading.Lock()}
+
+
+def test_concurrent_calls_use_private_copies():
+    """Chamadas simultâneas sobre a mesma crew rodam em paralelo, cada uma na sua cópia"""
+    stats = new_stats()
+    shared = NonReentrantCrew(stats)
+
+    async def scenario():
+        return await asyncio.gather(*(run_crew_async(shared, {"user_id": user}) for user in range(16)))
+
+    results = asyncio.run(scenario())
+    assert results == [f"resposta para {user}" for user in range(16)], results
+    assert stats["copies"] == 16
+    assert stats["peak"] > 1
+
+
+def test_process_user_message_async_concurrently():
+    """process_user_message_async com a crew memoizada não dispara execuções reentrantes"""
+    stats = new_stats()
+    shared = NonReentrantCrew(stats)
+    original = main.get_crew_for_context
+    main.get_crew_for_context = lambda context: shared
+    try:
+        async def scenario():
+            return await asyncio.gather(*(
+                main.process_user_message_async(user, "Quanto gastei hoje?") for user in range(12)
+            ))
+        results = asyncio.run(scenario())
+    finally:
+        main.get_crew_for_context = original
+    assert results == [f"resposta para {user}" for user in range(12)], results
+
+
+def test_set_async_concurrency_resizes_pool():
+    """set_async_concurrency limita também as threads que executam o kickoff"""
+    stats = new_stats()
+    shared = NonReentrantCrew(stats)
+    previous = main.ASYNC_CONCURRENCY
+    main.set_async_concurrency(3)
+    try:
+        assert get_async_executor()._max_workers == 3
+
+        async def scenario():
+            return await asyncio.gather(*(run_crew_async(shared, {"user_id": user}) for user in range(9)))
+
+        asyncio.run(scenario())
+        assert stats["peak"] == 3, stats["peak"]
+    finally:
+        main.set_async_concurrency(previous)
+    assert get_async_executor()._max_workers == previous
+
+
+if __name__ == "__main__":
+    # Processo próprio: desligar o cache aqui não afeta outros testes
+    os.environ["TAREFO_CACHE"] = "off"
+    failures = 0
+    for test in (test_concurrent_calls_use_private_copies, test_process_user_message_async_concurrently,
+                 test_set_async_concurrency_resizes_pool):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Testes do registro de auditoria de conformidade
+
+Confere o buffer circular de tools/audit_log.py (tamanho fixo, leitura das k
+entradas mais recentes sem ordenação), o arquivo JSONL com rotação por tamanho e
+idade, o arquivo padrão no diretório privado de dados e a gravação concorrente de
+vários processos no mesmo arquivo.
+"""
+import sys
+import json
+import stat
+import time
+import tempfile
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from tools import audit_log
+from tools.audit_log import AuditLog
+
+
+def entry(index):
+    return {"operation": "store", "timestamp": datetime.now().isoformat(), "index": index}
+
+
+def read_lines(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_ring_buffer_is_bounded():
+    """A memória guarda só as últimas entradas, e recent() devolve da mais nova para a mais antiga"""
+    log = AuditLog(path=False, max_entries=100)
+    for index in range(10000):
+        log.append(entry(index))
+    assert len(log) == 100
+    assert [item["index"] for item in log.recent(3)] == [9999, 9998, 9997]
+    assert len(log.recent(1000)) == 100
+
+
+def test_recent_does_not_depend_on_size():
+    """Ler as 10 mais recentes custa o mesmo com 100 ou 100 mil entradas"""
+    timings = []
+    for size in (100, 100000):
+        log = AuditLog(path=False, max_entries=size)
+        for index in range(size):
+            log.append(entry(index))
+        start = time.perf_counter()
+        for _ in range(1000):
+            log.recent(10)
+        timings.append(time.perf_counter() - start)
+    print(f"⚡ recent(10): {timings[0] * 1000:.1f} ms / {timings[1] * 1000:.1f} ms para 1000 leituras")
+    assert timings[1] < timings[0] * 5, timings
+
+
+def test_jsonl_sink_and_size_rotation():
+    """Todas as entradas vão para o arquivo, rotacionado ao passar do tamanho máximo"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "audit.jsonl"
+        log = AuditLog(path=path, max_entries=10, max_bytes=4096, backups=100)
+        for index in range(500):
+            log.append(entry(index))
+        log.close()
+
+        files = sorted(Path(tmp).glob("audit.jsonl.*")) + [path]
+        assert len(files) > 1
+        assert all(f.stat().st_size <= 4096 for f in files)
+        indexes = [item["index"] for f in files for item in read_lines(f)]
+        assert indexes == list(range(500)), indexes[:10]
+
+
+def test_time_rotation_and_backups():
+    """Arquivos mais velhos que o limite são rotacionados e só as últimas cópias ficam"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "audit.jsonl"
+        old = {"timestamp": "2020-01-01T00:00:00", "index": -1}
+        path.write_text(json.dumps(old) + "\n", encoding="utf-8")
+        for day in range(1, 4):
+            Path(tmp, f"audit.jsonl.2020010{day}-000000-000000").write_text("{}\n", encoding="utf-8")
+
+        log = AuditLog(path=path, rotate_seconds=3600, backups=2)
+        log.append(entry(0))
+        log.close()
+
+        rotated = sorted(Path(tmp).glob("audit.jsonl.*"))
+        assert len(rotated) == 2, rotated
+        assert read_lines(rotated[-1]) == [old]
+        assert [item["index"] for item in read_lines(path)] == [0]
+
+
+def test_default_path_is_private():
+    """Sem TAREFO_AUDIT_LOG_PATH, o registro fica no diretório privado de dados"""
+    with tempfile.TemporaryDirectory() as tmp, pytest.MonkeyPatch.context() as monkeypatch:
+        path = Path(tmp) / "data" / "audit.jsonl"
+        monkeypatch.setattr(audit_log, "DEFAULT_AUDIT_LOG_PATH", path)
+        monkeypatch.delenv("TAREFO_AUDIT_LOG_PATH", raising=False)
+        monkeypatch.delenv("TAREFO_AUDIT_LOG", raising=False)
+        log = AuditLog()
+        log.append(entry(0))
+        log.close()
+        assert [item["index"] for item in read_lines(path)] == [0]
+        assert stat.S_IMODE(path.parent.stat().st_mode) == 0o700
+        assert stat.S_IMODE(path.stat().st_mode) == 0o600
+
+
+def _append_many(path, worker, count):
+    log = AuditLog(path=path, fsync_interval=0.05)
+    for index in range(count):
+        log.append({"worker": worker, "index": index, "padding": "x" * 200})
+    log.close()
+
+
+def test_concurrent_processes():
+    """Vários processos gravando no mesmo arquivo não misturam linhas"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "audit.jsonl"
+        with ProcessPoolExecutor(max_workers=4) as pool:
+            for future in [pool.submit(_append_many, path, worker, 500) for worker in range(4)]:
+                future.result()
+        lines = read_lines(path)
+        assert len(lines) == 2000
+        for worker in range(4):
+            indexes = [item["index"] for item in lines if item["worker"] == worker]
+            assert indexes == list(range(500))
+
+
+if __name__ == "__main__":
+    failures = 0
+    for test in (test_ring_buffer_is_bounded, test_recent_does_not_depend_on_size,
+                 test_jsonl_sink_and_size_rotation, test_time_rotation_and_backups,
+                 test_default_path_is_private, test_concurrent_processes):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+    sys.exit(1 if failures else 0)
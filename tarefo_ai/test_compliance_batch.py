@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Testes da verificação de conformidade em lote
+
+Confere check_compliance_batch (tools/compliance_checker_tool.py) com um iterável
+e com um arquivo JSONL, no próprio processo e no pool de processos: um resultado
+por registro, o resumo por regra reprovada e por tipo sensível, a memória
+constante com o tamanho da entrada e a janela do modo ordenado com um bloco lento.
+"""
+import sys
+import json
+import time
+import tempfile
+import threading
+import tracemalloc
+from concurrent import futures
+from pathlib import Path
+
+import pytest
+
+from tools import compliance_checker_tool
+from tools.compliance_checker_tool import check_compliance_batch
+
+
+def make_record(index):
+    record = {"name": f"Usuário {index}", "consent_obtained": True, "secure_storage": index % 2 == 0}
+    if index % 10 == 0:
+        record["cpf"] = "529.982.247-25"
+    if index % 4 == 0:
+        record["notes"] = "contato: (11) 98765-4321"
+    return record
+
+
+def run_batch(records, **kwargs):
+    outcomes, summary = [], None
+    for item in check_compliance_batch(records, "store", **kwargs):
+        if "summary" in item:
+            summary = item["summary"]
+        else:
+            outcomes.append(item)
+    return outcomes, summary
+
+
+def check_summary(summary, count):
+    assert summary["records"] == count + summary["errors"]
+    assert summary["compliant"] == 0 and summary["non_compliant"] == count
+    assert summary["failed_rules"]["secure_storage"] == count // 2
+    assert summary["failed_rules"]["data_retention_policy"] == count
+    assert summary["sensitive_types"] == {"cpf": count // 10}
+    assert summary["personal_data"] == {"cpf": count // 10, "phone": count // 4}
+
+
+def test_iterable_in_process():
+    """Cada registro tem um resultado, e o resumo soma as regras reprovadas e os tipos"""
+    outcomes, summary = run_batch((make_record(index) for index in range(1000)), max_workers=1, chunk_size=64)
+    assert [item["index"] for item in outcomes] == list(range(1000))
+    assert all(item["ok"] for item in outcomes)
+    assert "recommendations" not in outcomes[0]["result"]
+    check_summary(summary, 1000)
+
+
+def test_jsonl_with_pool():
+    """Um arquivo JSONL é lido sob demanda e verificado no pool, com linhas inválidas como erro"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "export.jsonl"
+        with open(path, "w", encoding="utf-8") as f:
+            for index in range(1000):
+                f.write(json.dumps({"operation": "store", "data": make_record(index)}, ensure_ascii=False) + "\n")
+            f.write("{inválido\n")
+        outcomes, summary = run_batch(str(path), max_workers=2, chunk_size=100, ordered=True)
+
+    assert [item["index"] for item in outcomes] == list(range(1001))
+    assert not outcomes[-1]["ok"] and "error" in outcomes[-1]
+    assert summary["errors"] == 1
+    check_summary(summary, 1000)
+
+
+def test_constant_memory():
+    """A memória de pico não cresce com o número de registros"""
+    peaks = []
+    for count in (2000, 20000):
+        tracemalloc.start()
+        for _ in check_compliance_batch((make_record(index) for index in range(count)), "store",
+                                        max_workers=1, chunk_size=200):
+            pass
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    print(f"📦 pico de memória: {peaks[0] / 1024:.0f} KiB / {peaks[1] / 1024:.0f} KiB")
+    assert peaks[1] < peaks[0] * 2, peaks
+
+
+def test_ordered_window_with_stalled_chunk():
+    """Com ordered=True, um bloco lento não faz os blocos seguintes acumularem além da janela"""
+    release = threading.Event()
+    consumed, outcomes = [], []
+    check_chunk = compliance_checker_tool._check_batch_chunk
+
+    def stalled_first_chunk(start, chunk, *args):
+        if start == 0:
+            release.wait(10)
+        return check_chunk(start, chunk, *args)
+
+    def source():
+        for index in range(200):
+            consumed.append(index)
+            yield make_record(index)
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        # Threads no lugar de processos: o bloco lento espera um Event deste processo
+        monkeypatch.setattr(futures, "ProcessPoolExecutor", futures.ThreadPoolExecutor)
+        monkeypatch.setattr(compliance_checker_tool, "_check_batch_chunk", stalled_first_chunk)
+        reader = threading.Thread(target=lambda: outcomes.extend(
+            run_batch(source(), max_workers=2, chunk_size=10, ordered=True)[0]))
+        reader.start()
+        try:
+            time.sleep(0.3)
+            # Janela de 2 * max_workers blocos, somando os em andamento e os concluídos
+            assert len(consumed) <= 4 * 10, len(consumed)
+        finally:
+            release.set()
+            reader.join(30)
+    assert [item["index"] for item in outcomes] == list(range(200))
+
+
+if __name__ == "__main__":
+    failures = 0
+    for test in (test_iterable_in_process, test_jsonl_with_pool, test_constant_memory,
+                 test_ordered_window_with_stalled_chunk):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+    sys.exit(1 if failures else 0)
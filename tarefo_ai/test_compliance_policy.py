@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Testes da política de conformidade compilada
+
+Confere tools/compliance_policy.py: o arquivo padrão reproduz as regras e os
+textos do verificador, os vereditos são memoizados por combinação de regras
+atendidas, o arquivo é recarregado quando muda (e uma versão inválida é
+ignorada) e a verificação fica barata com a política compilada.
+"""
+import sys
+import json
+import time
+import tempfile
+from pathlib import Path
+
+from tools.compliance_policy import CompiledPolicy, PolicyStore, PolicyError, load_policy_file, DEFAULT_POLICY_PATH
+from tools.compliance_checker_tool import ComplianceCheckerTool
+
+
+def write_policy(path, raw):
+    Path(path).write_text(json.dumps(raw, ensure_ascii=False), encoding="utf-8")
+
+
+def test_default_policy_matches_checker():
+    """O arquivo padrão traz as quatro operações e os textos de cada regra"""
+    policy = CompiledPolicy(load_policy_file(DEFAULT_POLICY_PATH))
+    assert list(policy.operations) == ["store", "process", "share", "delete"]
+    assert policy.operations["store"] == (
+        "consent_obtained", "necessary_data_only", "secure_storage", "data_retention_policy"
+    )
+    assert "cpf" in policy.sensitive_set and "location" in policy.sensitive_set
+    assert all(rule in policy.descriptions for rules in policy.operations.values() for rule in rules)
+    assert all(rule in policy.recommendations for rules in policy.operations.values() for rule in rules)
+    assert policy.unknown_recommendation == "Use uma das operações suportadas: store, process, share, delete"
+
+
+def test_check_results():
+    """O resultado da verificação mantém o formato de antes"""
+    tool = ComplianceCheckerTool()
+    data = {"consent_obtained": True, "necessary_data_only": True, "secure_storage": "yes", "cpf": "x"}
+    result = tool.check_operation_compliance("store", data, audit=False)
+    assert not result["compliant"]
+    assert [check["rule"] for check in result["checks"]] == [
+        "consent_obtained", "necessary_data_only", "secure_storage", "data_retention_policy",
+        "sensitive_data_handling"
+    ]
+    assert [check["passed"] for check in result["checks"]] == [True, True, False, False, False]
+    assert result["checks"][-1]["description"] == "Dados sensíveis requerem tratamento especial conforme LGPD/GDPR"
+    assert result["recommendations"][0] == (
+        "Implemente criptografia e controles de acesso adequados para armazenamento"
+    )
+    assert result["reason"] == "Nem todas as verificações de conformidade foram aprovadas"
+
+    # Os checks devolvidos são cópias: alterá-los não afeta o memo
+    result["checks"][0]["passed"] = False
+    again = tool.check_operation_compliance("store", data, audit=False)
+    assert again["checks"][0]["passed"] is True
+
+    unknown = tool.check_operation_compliance("archive", {}, audit=False)
+    assert unknown["reason"] == "Operação desconhecida: archive"
+    assert unknown["recommendations"] == ["Use uma das operações suportadas: store, process, share, delete"]
+
+
+def test_verdicts_are_memoized():
+    """Payloads com as mesmas regras atendidas reaproveitam o mesmo veredito"""
+    policy = CompiledPolicy(load_policy_file(DEFAULT_POLICY_PATH))
+    first = policy.evaluate("share", {"consent_obtained": True, "note": "a"}, False)
+    second = policy.evaluate("share", {"consent_obtained": True, "other": 1}, False)
+    assert first is second
+    assert policy.evaluate("share", {"consent_obtained": True}, True) is not first
+    assert policy.evaluate("share", {"consent_obtained": 1}, False) is first
+
+
+def test_hot_reload():
+    """Uma mudança no arquivo vale na próxima verificação; uma versão inválida é ignorada"""
+    raw = load_policy_file(DEFAULT_POLICY_PATH)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "policy.json"
+        write_policy(path, raw)
+        store = PolicyStore(path=path, check_interval=0)
+        assert "audit_trail" not in store.get().operations["store"]
+
+        raw["operations"]["store"].append("audit_trail")
+        write_policy(path, raw)
+        assert store.get().operations["store"][-1] == "audit_trail"
+        assert store.get().describe("audit_trail") == "Regra: audit_trail"
+        assert store.reloads == 1
+
+        path.write_text("{inválido", encoding="utf-8")
+        assert store.get().operations["store"][-1] == "audit_trail"
+        write_policy(path, {"operations": {"store": "consent_obtained"}})
+        assert store.get().operations["store"][-1] == "audit_trail"
+        assert store.reloads == 1
+
+        try:
+            PolicyStore(path=path).get()
+            assert False, "uma política inicial inválida deveria falhar"
+        except PolicyError:
+            pass
+
+
+def test_check_throughput():
+    """Com a política compilada, o custo da verificação fica na busca de dados sensíveis"""
+    tool = ComplianceCheckerTool()
+    data = {"consent_obtained": True, "legitimate_purpose": True, "access_controls": False, "name": "Maria"}
+    count = 20000
+    start = time.perf_counter()
+    for _ in range(count):
+        tool.check_operation_compliance("process", data, audit=False)
+    elapsed = time.perf_counter() - start
+    print(f"⚡ {count / elapsed:,.0f} verificações/s ({elapsed / count * 1e6:.1f} µs cada)")
+    assert elapsed / count < 0.001
+
+
+if __name__ == "__main__":
+    failures = 0
+    for test in (test_default_policy_matches_checker, test_check_results, test_verdicts_are_memoized,
+                 test_hot_reload, test_check_throughput):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+    sys.exit(1 if failures else 0)
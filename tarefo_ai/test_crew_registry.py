@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Testes do registro de crews memoizadas
+
+Confere CrewRegistry (crew.py): a crew é construída uma vez por nome, um arquivo
+de configuração com mtime novo mas mesmo conteúdo não reconstrói nada, uma
+mudança de conteúdo recarrega a configuração e reconstrói, e falhas de
+construção não ficam em cache.
+"""
+import os
+import sys
+import time
+import tempfile
+from pathlib import Path
+
+from crew import CrewRegistry
+
+
+class CountingRegistry(CrewRegistry):
+    """Registro que conta as recargas em vez de reler o tasks.yaml real"""
+
+    def __init__(self, config_files):
+        super().__init__(config_files)
+        self.reloads = 0
+
+    def _reload_config(self):
+        self.reloads += 1
+
+
+def make_files(tmp):
+    agents = Path(tmp) / "agents.yaml"
+    tasks = Path(tmp) / "tasks.yaml"
+    agents.write_text("agents: []\n", encoding="utf-8")
+    tasks.write_text("tasks: []\n", encoding="utf-8")
+    return agents, tasks
+
+
+def bump_mtime(path):
+    later = time.time() + 5
+    os.utime(path, (later, later))
+
+
+def test_builds_once_per_name():
+    """A mesma crew é devolvida enquanto a configuração não muda"""
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = CountingRegistry(make_files(tmp))
+        first = registry.get("message", object)
+        assert registry.get("message", object) is first
+        other = registry.get("calendar", object)
+        assert other is not first
+        assert registry.builds == 2 and registry.reloads == 1
+
+
+def test_same_content_does_not_rebuild():
+    """Um mtime novo com o mesmo conteúdo não invalida as crews"""
+    with tempfile.TemporaryDirectory() as tmp:
+        agents, _ = make_files(tmp)
+        registry = CountingRegistry([agents])
+        first = registry.get("message", object)
+        bump_mtime(agents)
+        assert registry.get("message", object) is first
+        assert registry.builds == 1 and registry.reloads == 1
+
+
+def test_content_change_rebuilds():
+    """Uma mudança no conteúdo recarrega a configuração e reconstrói as crews"""
+    with tempfile.TemporaryDirectory() as tmp:
+        agents, tasks = make_files(tmp)
+        registry = CountingRegistry([agents, tasks])
+        first = registry.get("message", object)
+        key = registry.current_key()
+
+        tasks.write_text("tasks:\n  - description: nova\n", encoding="utf-8")
+        bump_mtime(tasks)
+        second = registry.get("message", object)
+        assert second is not first
+        assert registry.current_key() != key
+        assert registry.builds == 2 and registry.reloads == 2
+
+        registry.clear()
+        assert registry.get("message", object) is not second
+        assert registry.builds == 3
+
+
+def test_failed_build_is_not_cached():
+    """Uma construção que devolve None é tentada de novo na próxima chamada"""
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = CountingRegistry(make_files(tmp))
+        attempts = []
+
+        def flaky():
+            attempts.append(1)
+            return None if len(attempts) == 1 else object()
+
+        assert registry.get("message", flaky) is None
+        assert registry.get("message", flaky) is not None
+        assert len(attempts) == 2 and registry.builds == 1
+
+
+if __name__ == "__main__":
+    failures = 0
+    for test in (test_builds_once_per_name, test_same_content_does_not_rebuild, test_content_change_rebuilds,
+                 test_failed_build_is_not_cached):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Teste de tempo de importação dos pontos de entrada do TarefoAI
+
+Usa a saída de `python -X importtime` para garantir que as ferramentas isoladas
+(OCR e compliance) iniciem rápido e não carreguem o CrewAI, o LangChain ou o YAML.
+O limite pode ser ajustado com TAREFO_IMPORT_BUDGET_MS (padrão: 50 ms); como o
+tempo medido varia com a carga da máquina, vale o menor de várias execuções e a
+comparação aceita a folga TAREFO_IMPORT_MARGIN sobre o orçamento (padrão: 0.5).
+"""
+import os
+import sys
+import subprocess
+from pathlib import Path
+
+PACKAGE_DIR = Path(__file__).parent
+IMPORT_BUDGET_MS = float(os.environ.get("TAREFO_IMPORT_BUDGET_MS", "50"))
+IMPORT_MARGIN = float(os.environ.get("TAREFO_IMPORT_MARGIN", "0.5"))
+IMPORT_RUNS = 5
+
+# Módulos que os pontos de entrada das ferramentas não devem importar
+HEAVY_MODULES = ("crewai", "langchain", "langchain_anthropic", "yaml", "PIL")
+
+# Pontos de entrada que devem ficar dentro do orçamento
+TOOL_ENTRY_POINTS = ("tools.ocr_tool", "tools.compliance_checker_tool")
+
+
+def measure_import(module, runs=3):
+    """
+    Importa um módulo em um interpretador novo com -X importtime
+
+    Returns:
+        tuple: (menor tempo cumulativo em ms entre as execuções, módulos importados)
+    """
+    best = None
+    imported = set()
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=PACKAGE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        cumulative = None
+        for line in completed.stderr.splitlines():
+            # Formato: "import time: self [us] | cumulative | imported package"
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, cumulative_us, name = line[len("import time:"):].split("|")
+            name = name.strip()
+            imported.add(name)
+            if name == module:
+                cumulative = int(cumulative_us) / 1000
+        if cumulative is not None and (best is None or cumulative < best):
+            best = cumulative
+    return best, imported
+
+
+def test_tool_entry_points_are_lightweight():
+    """As ferramentas não devem importar dependências pesadas"""
+    for module in TOOL_ENTRY_POINTS:
+        _, imported = measure_import(module, runs=1)
+        heavy = sorted(
+            name for name in imported
+            if name.split(".")[0] in HEAVY_MODULES
+        )
+        assert not heavy, f"{module} importou {heavy}"
+
+
+def test_tool_entry_points_within_budget():
+    """O tempo de importação das ferramentas fica dentro do orçamento"""
+    limit = IMPORT_BUDGET_MS * (1 + IMPORT_MARGIN)
+    for module in TOOL_ENTRY_POINTS:
+        elapsed, _ = measure_import(module, runs=IMPORT_RUNS)
+        assert elapsed is not None, f"{module} não apareceu na saída de -X importtime"
+        print(f"⏱️ {module}: {elapsed:.1f} ms (orçamento {IMPORT_BUDGET_MS:.0f} ms, limite {limit:.0f} ms)")
+        assert elapsed <= limit, f"{module} levou {elapsed:.1f} ms"
+
+
+def test_crew_import_is_lazy():
+    """Importar crew.py não deve carregar o CrewAI nem o YAML"""
+    _, imported = measure_import("crew", runs=1)
+    heavy = sorted(name for name in imported if name.split(".")[0] in HEAVY_MODULES)
+    assert not heavy, f"crew importou {heavy}"
+
+
+if __name__ == "__main__":
+    failures = 0
+    for test in (
+        test_tool_entry_points_are_lightweight,
+        test_tool_entry_points_within_budget,
+        test_crew_import_is_lazy,
+    ):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+    sys.exit(1 if failures else 0)
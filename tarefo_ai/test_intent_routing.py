@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Testes do roteamento por intenção
+
+Confere detect_intent, select_config e get_crew_for_context (crew.py): cada
+requisição vai para a sub-crew da sua intenção, a sub-crew só carrega as tarefas
+que declaram a intenção em tasks.yaml (e os agentes delas) e cada intenção tem
+a sua crew no registro.
+"""
+import sys
+
+import crew
+from crew import detect_intent, select_config, get_crew_for_context
+
+
+def test_detect_intent_routing():
+    """Operações, imagens e palavras-chave definem a intenção"""
+    cases = [
+        ({"operation": "check", "message": "lembrar de pagar"}, "compliance"),
+        ({"image_path": "recibo.jpg", "message": "agendar"}, "image"),
+        ({"message": "Me lembre de pagar a conta amanhã"}, "reminder"),
+        ({"message": "Não esquecer do remédio"}, "reminder"),
+        ({"message": "Agendar reunião com o time às 15h"}, "calendar"),
+        ({"message": "Schedule a meeting tomorrow"}, "calendar"),
+        ({"message": "Quanto gastei com mercado este mês?"}, "message"),
+        ({"message": ""}, "message"),
+        ({"user_id": 1}, "full"),
+        (None, "full"),
+        ("texto solto", "full"),
+    ]
+    for context, expected in cases:
+        assert detect_intent(context) == expected, (context, detect_intent(context))
+
+
+def test_select_config_scopes_tasks_and_agents():
+    """A sub-crew tem apenas as tarefas da intenção e os agentes dessas tarefas"""
+    agents_data, tasks_data = select_config("image")
+    descriptions = [task["description"] for task in tasks_data["tasks"]]
+    assert descriptions == ["Extrair informações de imagem/documento"]
+    assert [agent["role"] for agent in agents_data["agents"]] == ["Document Processing Specialist"]
+
+    _, calendar_tasks = select_config("calendar")
+    assert all("calendar" in task["intents"] for task in calendar_tasks["tasks"])
+    assert len(calendar_tasks["tasks"]) == 2
+
+    assert select_config("full") == (None, None)
+
+
+def test_each_intent_has_its_own_crew():
+    """get_crew_for_context memoiza uma crew por intenção"""
+    built = []
+    original = crew.build_intent_crew
+    crew.build_intent_crew = lambda intent: built.append(intent) or f"crew-{intent}"
+    crew.crew_registry.clear()
+    try:
+        assert get_crew_for_context({"message": "lembrar do aluguel"}) == "crew-reminder"
+        assert get_crew_for_context({"message": "me lembra de novo"}) == "crew-reminder"
+        assert get_crew_for_context({"image_path": "nota.pdf"}) == "crew-image"
+        assert built == ["reminder", "image"]
+    finally:
+        crew.build_intent_crew = original
+        crew.crew_registry.clear()
+
+
+if __name__ == "__main__":
+    failures = 0
+    for test in (test_detect_intent_routing, test_select_config_scopes_tasks_and_agents,
+                 test_each_intent_has_its_own_crew):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Testes da leitura de NF-e
+
+Confere tools/invoice_parser.py e tools/pdf_text.py: o dígito verificador da
+chave de acesso, a decodificação dos campos da chave, a preferência pela chave
+após o rótulo, os totais da DANFE e a leitura da camada de texto de um PDF
+digital (sem OCR) até os campos da nota, também com o cache de OCR ligado e sem
+backend de OCR instalado.
+"""
+import base64
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from tools.invoice_parser import (
+    access_key_is_valid, find_access_key, find_totals, parse_access_key, parse_invoice,
+)
+from tools.pdf_text import has_text_layer, read_text_layer
+from tools.ocr_tool import OCRTool
+from tools import ocr_backends, ocr_cache
+from tools.ocr_backends import OCRBackend, StubBackend
+
+# UF 35 (SP), 2024-09, CNPJ 11.222.333/0001-81, modelo 55, série 1, número 12345
+KEY_PREFIX = "35" + "2409" + "11222333000181" + "55" + "001" + "000012345" + "1" + "23456789"
+
+
+def with_check_digit(prefix):
+    """Completa os 43 primeiros dígitos com o dígito verificador (módulo 11)"""
+    total = sum(int(digit) * (2 + index % 8) for index, digit in enumerate(reversed(prefix)))
+    check = 11 - total % 11
+    return prefix + str(0 if check >= 10 else check)
+
+
+ACCESS_KEY = with_check_digit(KEY_PREFIX)
+
+DANFE = f"""DANFE
+DOCUMENTO AUXILIAR DA NOTA FISCAL ELETRÔNICA
+CHAVE DE ACESSO
+{" ".join(ACCESS_KEY[i:i + 4] for i in range(0, 44, 4))}
+DATA DA EMISSÃO 12/09/2024
+CÁLCULO DO IMPOSTO
+BASE DE CÁLCULO DO ICMS   VALOR DO ICMS   VALOR TOTAL DOS PRODUTOS
+1.000,00                  180,00          1.150,00
+VALOR DO FRETE 25,50
+VALOR TOTAL DA NOTA 1.175,50
+"""
+
+
+def test_access_key_check_digit():
+    """Só chaves de 44 dígitos com o dígito verificador correto são válidas"""
+    assert access_key_is_valid(ACCESS_KEY)
+    wrong = ACCESS_KEY[:43] + str((int(ACCESS_KEY[43]) + 1) % 10)
+    assert not access_key_is_valid(wrong)
+    assert not access_key_is_valid(ACCESS_KEY[:43])
+    assert not access_key_is_valid(ACCESS_KEY[:43] + "x")
+
+
+def test_parse_access_key():
+    """Os campos da chave são decodificados"""
+    assert parse_access_key(ACCESS_KEY) == {
+        "uf": "SP",
+        "issue_month": "2024-09",
+        "issuer_cnpj": "11.222.333/0001-81",
+        "model": "NF-e",
+        "series": 1,
+        "number": 12345,
+        "emission_type": 1,
+    }
+
+
+def test_find_access_key_prefers_label():
+    """Uma chave inválida é ignorada e a chave após o rótulo tem preferência"""
+    other = with_check_digit("41" + KEY_PREFIX[2:])
+    invalid = ACCESS_KEY[:43] + str((int(ACCESS_KEY[43]) + 1) % 10)
+    text = f"Protocolo {other}\nReferência {invalid}\nCHAVE DE ACESSO\n{ACCESS_KEY}"
+    assert find_access_key(text) == ACCESS_KEY
+    assert find_access_key(f"{invalid}\n{other}") == other
+    assert find_access_key("sem chave") == ""
+
+
+def test_parse_invoice_totals():
+    """Totais na mesma linha ou na linha de valores seguinte"""
+    totals = find_totals(DANFE)
+    assert totals == {
+        "icms_base": 1000.0, "icms": 180.0, "products_total": 1150.0,
+        "freight": 25.5, "invoice_total": 1175.5,
+    }, totals
+    invoice = parse_invoice(DANFE)
+    assert invoice["access_key"] == ACCESS_KEY and invoice["uf"] == "SP"
+    assert invoice["issue_date"] and invoice["total"] == 1175.5
+    assert invoice["confidence"] == 1.0
+    assert parse_invoice("")["confidence"] == 0.0
+
+
+def make_text_pdf(path, lines):
+    """PDF digital mínimo com uma página de texto (Helvetica)"""
+    content = "BT /F1 10 Tf 40 800 Td 12 TL " + " ".join(
+        "({}) '".format(line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)"))
+        for line in lines
+    ) + " ET"
+    content = content.encode("latin-1")
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+        b"/Resources << /Font << /F1 5 0 R >> >> /Contents 4 0 R >>",
+        b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    Path(path).write_bytes(bytes(out))
+
+
+def test_pdf_text_layer_to_invoice():
+    """A DANFE digital é lida pela camada de texto, sem OCR"""
+    with tempfile.TemporaryDirectory() as tmp, pytest.MonkeyPatch.context() as monkeypatch:
+        path = Path(tmp) / "danfe.pdf"
+        make_text_pdf(path, DANFE.splitlines())
+        pages = read_text_layer(path)
+        assert pages and ACCESS_KEY[:4] in pages[0]
+
+        result = OCRTool(backend=StubBackend(), cache=False, parallel_pages=False).run(str(path), "invoice")
+        assert result["text_source"] == "text_layer", result
+        assert result["access_key"] == ACCESS_KEY and result["total"] == 1175.5
+        assert result["needs_review"] is False
+
+        monkeypatch.setenv("TAREFO_PDF_TEXT_LAYER", "off")
+        assert read_text_layer(path) is None
+
+
+class MissingBackend(OCRBackend):
+    """Backend padrão sem as dependências instaladas"""
+
+    name = "ausente"
+
+    def is_available(self):
+        return False
+
+
+def test_text_layer_pdf_without_ocr_backend():
+    """Com o cache ligado e sem backend de OCR, a DANFE digital é lida e guardada"""
+    with tempfile.TemporaryDirectory() as tmp, pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setitem(ocr_backends.BACKENDS, "ausente", MissingBackend)
+        monkeypatch.setenv("TAREFO_OCR_BACKEND", "ausente")
+        monkeypatch.setenv("TAREFO_OCR_CACHE", "on")
+        monkeypatch.setenv("TAREFO_OCR_CACHE_DIR", str(Path(tmp) / "cache"))
+        monkeypatch.setenv("TAREFO_UPLOAD_DIR", str(Path(tmp) / "uploads"))
+        monkeypatch.setattr(ocr_cache, "_ocr_cache", None)
+        path = Path(tmp) / "danfe.pdf"
+        make_text_pdf(path, DANFE.splitlines())
+        payload = "data:application/pdf;base64," + base64.b64encode(path.read_bytes()).decode()
+
+        for source in (str(path), str(path), payload, payload):
+            result = OCRTool().run(source, "invoice")
+            assert "error" not in result, result
+            assert result["text_source"] == "text_layer" and result["access_key"] == ACCESS_KEY
+        # Só a primeira leitura extrai o texto; as demais vêm do cache
+        assert ocr_cache.get_ocr_cache().hits == 3
+
+        pages = list(OCRTool().iter_pages(str(path), "invoice"))
+        assert [(page["page"], page["pages"], page["text_source"]) for page in pages] == [(1, 1, "text_layer")]
+
+        # Sem camada de texto, o OCR continua exigindo o backend
+        scanned = Path(tmp) / "foto.png"
+        scanned.write_bytes(b"png")
+        assert "indisponível" in OCRTool().run(str(scanned))["error"]
+
+
+def test_scanned_pdf_has_no_text_layer():
+    """Páginas com pouco texto (PDF digitalizado) vão para o OCR"""
+    assert not has_text_layer([])
+    assert not has_text_layer(["", "  \n"])
+    assert not has_text_layer(["texto suficiente " * 5, ""])
+    assert has_text_layer(["texto suficiente " * 5, "outra página com bastante texto " * 3])
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "digitalizado.pdf"
+        make_text_pdf(path, ["p. 1"])
+        assert read_text_layer(path) is None
+
+
+if __name__ == "__main__":
+    failures = 0
+    for test in (test_access_key_check_digit, test_parse_access_key, test_find_access_key_prefers_label,
+                 test_parse_invoice_totals, test_pdf_text_layer_to_invoice, test_text_layer_pdf_without_ocr_backend,
+                 test_scanned_pdf_has_no_text_layer):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Testes do lote de mensagens
+
+Confere process_messages_batch (main.py) com uma crew falsa: formatos de item
+aceitos, ordem de entrada com ordered=True, erros isolados por item, leitura
+preguiçosa do iterável (janela limitada, também com ordered=True e um item
+lento) e uma cópia da crew por item.
+"""
+import os
+import sys
+import time
+import threading
+
+import pytest
+
+import main
+from main import process_messages_batch
+
+
+@pytest.fixture(autouse=True)
+def cache_off(monkeypatch):
+    """O cache de respostas fica desligado só durante os testes deste arquivo"""
+    monkeypatch.setenv("TAREFO_CACHE", "off")
+
+
+class FakeCrew:
+    """Crew falsa: responde com o texto da mensagem e falha em mensagens 'falhar'"""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def copy(self):
+        with self.stats["lock"]:
+            self.stats["copies"] += 1
+        return FakeCrew(self.stats)
+
+    def kickoff(self, inputs=None):
+        message = inputs["message"]
+        if message == "falhar":
+            raise RuntimeError("falha na crew")
+        if message == "travar":
+            self.stats["release"].wait(10)
+        # Mensagens mais longas terminam antes, para embaralhar a ordem de conclusão
+        time.sleep(0.01 * (5 - len(message) % 5))
+        return f"{inputs['user_id']}:{inputs['platform']}:{message}"
+
+
+class use_crew:
+    """Troca a crew de get_crew_for_context durante o teste"""
+
+    def __init__(self):
+        self.stats = {"copies": 0, "lock": threading.Lock(), "release": threading.Event()}
+
+    def __enter__(self):
+        self.original = main.get_crew_for_context
+        shared = FakeCrew(self.stats)
+        main.get_crew_for_context = lambda context: shared
+        return self.stats
+
+    def __exit__(self, *exc):
+        main.get_crew_for_context = self.original
+
+
+def test_item_formats_and_order():
+    """Dicts e tuplas são aceitos e ordered=True preserva a ordem de entrada"""
+    messages = [
+        {"user_id": 1, "message": "a", "platform": "telegram"},
+        (2, "bb"),
+        (3, "ccc", "whatsapp"),
+        {"user_id": 4, "message": "dddd"},
+    ]
+    with use_crew() as stats:
+        outcomes = list(process_messages_batch(messages, max_workers=4, ordered=True))
+    assert [item["index"] for item in outcomes] == [0, 1, 2, 3]
+    assert [item["result"] for item in outcomes] == [
+        "1:telegram:a", "2:app:bb", "3:whatsapp:ccc", "4:app:dddd",
+    ]
+    assert stats["copies"] == 4
+
+
+def test_errors_do_not_stop_batch():
+    """Um item inválido ou com erro na crew vira erro só daquele item"""
+    messages = [(1, "ok"), (2, "falhar"), "inválido", (4, "fim")]
+    with use_crew():
+        outcomes = {item["index"]: item for item in process_messages_batch(messages, max_workers=2)}
+    assert outcomes[0] == {"index": 0, "ok": True, "result": "1:app:ok"}
+    assert outcomes[1]["ok"] is False and "falha na crew" in outcomes[1]["error"]
+    assert outcomes[2]["ok"] is False and "Item de lote inválido" in outcomes[2]["error"]
+    assert outcomes[3]["ok"] is True
+
+
+def test_reads_iterable_lazily():
+    """No máximo 2 * max_workers itens são lidos além dos já entregues"""
+    consumed = []
+
+    def source():
+        for index in range(100):
+            consumed.append(index)
+            yield (index, "m")
+
+    with use_crew():
+        batch = process_messages_batch(source(), max_workers=2)
+        first = next(batch)
+        assert first["ok"]
+        assert len(consumed) <= 2 * 2 + 1, len(consumed)
+        rest = list(batch)
+    assert len(rest) == 99 and len(consumed) == 100
+
+
+def test_ordered_window_with_stalled_item():
+    """Com ordered=True, um item lento não faz os concluídos acumularem além da janela"""
+    consumed, outcomes = [], []
+
+    def source():
+        for index in range(50):
+            consumed.append(index)
+            yield (index, "travar" if index == 0 else "m")
+
+    with use_crew() as stats:
+        batch = process_messages_batch(source(), max_workers=2, ordered=True)
+        reader = threading.Thread(target=lambda: outcomes.extend(batch))
+        reader.start()
+        try:
+            time.sleep(0.3)
+            assert len(consumed) <= 2 * 2, len(consumed)
+        finally:
+            stats["release"].set()
+            reader.join(30)
+    assert [item["index"] for item in outcomes] == list(range(50))
+
+
+if __name__ == "__main__":
+    # Processo próprio: desligar o cache aqui não afeta outros testes
+    os.environ["TAREFO_CACHE"] = "off"
+    failures = 0
+    for test in (test_item_formats_and_order, test_errors_do_not_stop_batch, test_reads_iterable_lazily,
+                 test_ordered_window_with_stalled_item):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Testes das métricas de latência
+
+Confere metrics.py: buckets cumulativos, o formato de exposição do Prometheus
+(HELP, TYPE, _bucket com le, +Inf, _sum e _count, escape de labels), a junção de
+snapshots de vários workers, o timer com exceção, o decorador de ferramentas e o
+endpoint HTTP.
+"""
+import sys
+import tempfile
+import urllib.request
+from pathlib import Path
+
+from metrics import (
+    Histogram, merge_snapshots, render_prometheus, start_http_server, timed_tool, timer,
+    write_prometheus, snapshot,
+)
+
+
+def test_buckets_are_cumulative():
+    """Cada observação conta em todos os buckets com limite maior ou igual"""
+    hist = Histogram("teste_seconds", "Teste", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        hist.observe(value, etapa="a")
+    series = hist.snapshot()["series"][0]
+    assert series["labels"] == {"etapa": "a"}
+    assert series["counts"] == [2, 3]
+    assert series["count"] == 4 and abs(series["sum"] - 2.65) < 1e-9
+
+
+def test_exposition_format():
+    """O texto segue o formato de exposição do Prometheus"""
+    hist = Histogram("teste_seconds", "Tempo de teste", buckets=(0.1, 1.0))
+    hist.observe(0.5, crew="lembrete")
+    text = render_prometheus({"teste_seconds": hist.snapshot()})
+    assert text == (
+        "# HELP teste_seconds Tempo de teste\n"
+        "# TYPE teste_seconds histogram\n"
+        'teste_seconds_bucket{crew="lembrete",le="0.1"} 0\n'
+        'teste_seconds_bucket{crew="lembrete",le="1.0"} 1\n'
+        'teste_seconds_bucket{crew="lembrete",le="+Inf"} 1\n'
+        'teste_seconds_sum{crew="lembrete"} 0.5\n'
+        'teste_seconds_count{crew="lembrete"} 1\n'
+    ), text
+
+
+def test_label_escaping():
+    """Aspas, barras invertidas e quebras de linha são escapadas nos labels"""
+    hist = Histogram("teste_seconds", buckets=(1.0,))
+    hist.observe(0.1, task='diz "oi"\\\nfim')
+    text = render_prometheus({"teste_seconds": hist.snapshot()})
+    assert 'task="diz \\"oi\\"\\\\\\nfim"' in text, text
+
+
+def test_merge_snapshots_adds_worker_label():
+    """Snapshots de vários workers viram séries com o label do worker"""
+    first = Histogram("teste_seconds", buckets=(1.0,))
+    second = Histogram("teste_seconds", buckets=(1.0,))
+    first.observe(0.5)
+    second.observe(2.0)
+    merged = merge_snapshots([
+        ({"worker": "0"}, {"teste_seconds": first.snapshot()}),
+        ({"worker": "1"}, {"teste_seconds": second.snapshot()}),
+    ])
+    text = render_prometheus(merged)
+    assert 'teste_seconds_bucket{le="1.0",worker="0"} 1' in text
+    assert 'teste_seconds_bucket{le="1.0",worker="1"} 0' in text
+    assert 'teste_seconds_count{worker="1"} 1' in text
+
+
+def test_timer_and_timed_tool():
+    """O timer registra mesmo com exceção, e o decorador usa a ação como label"""
+    try:
+        with timer("tarefo_test_timer_seconds", etapa="falha"):
+            raise ValueError("erro")
+    except ValueError:
+        pass
+    series = snapshot()["tarefo_test_timer_seconds"]["series"]
+    assert series[0]["labels"] == {"etapa": "falha"} and series[0]["count"] == 1
+
+    @timed_tool("teste", action_arg=True)
+    def tool(action, value):
+        return value * 2
+
+    assert tool("dobrar", 2) == 4
+    labels = [s["labels"] for s in snapshot()["tarefo_tool_seconds"]["series"]]
+    assert {"tool": "teste", "action": "dobrar"} in labels
+
+
+def test_http_and_file_export():
+    """O endpoint HTTP e o arquivo trazem o mesmo texto"""
+    hist = Histogram("teste_seconds", "Teste", buckets=(1.0,))
+    hist.observe(0.2)
+    provider = lambda: {"teste_seconds": hist.snapshot()}
+    server = start_http_server(0, provider)
+    try:
+        port = server.server_address[1]
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=10) as response:
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            body = response.read().decode("utf-8")
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert body == render_prometheus(provider())
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "tarefo.prom"
+        write_prometheus(path, provider())
+        assert path.read_text(encoding="utf-8") == body
+
+
+if __name__ == "__main__":
+    failures = 0
+    for test in (test_buckets_are_cumulative, test_exposition_format, test_label_escaping,
+                 test_merge_snapshots_adds_worker_label, test_timer_and_timed_tool, test_http_and_file_export):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+    sys.exit(1 if failures else 0)
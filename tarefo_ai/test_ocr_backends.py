@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Testes dos backends de OCR
+
+Confere tools/ocr_backends.py: o stub só é usado quando selecionado, um backend
+indisponível falha em vez de cair no stub, o stub é determinístico, documentos de
+várias páginas saem na ordem e a contagem de páginas de PDFs lidos em blocos
+não perde nem duplica marcadores na fronteira entre blocos.
+"""
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from tools import ocr_backends
+from tools.ocr_backends import (
+    OCRBackend, StubBackend, count_pdf_pages, get_backend, recognize_document, register_backend,
+)
+from tools.ocr_tool import OCRTool
+
+
+class MissingBackend(OCRBackend):
+    """Backend cujas dependências não estão instaladas"""
+
+    name = "ausente"
+
+    def is_available(self):
+        return False
+
+
+def make_pdf(tmp, pages, padding=0):
+    """PDF mínimo com `pages` objetos /Type /Page e um /Type /Pages"""
+    body = [b"%PDF-1.4\n", b"1 0 obj << /Type /Pages /Count %d >> endobj\n" % pages]
+    for index in range(pages):
+        body.append(b" " * padding)
+        body.append(b"%d 0 obj << /Type /Page /Parent 1 0 R >> endobj\n" % (index + 2))
+    path = Path(tmp) / f"doc_{pages}.pdf"
+    path.write_bytes(b"".join(body))
+    return path
+
+
+def test_stub_only_when_selected():
+    """O stub vem do nome ou de TAREFO_OCR_BACKEND=stub"""
+    assert isinstance(get_backend("stub"), StubBackend)
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv("TAREFO_OCR_BACKEND", "stub")
+        assert isinstance(get_backend(), StubBackend)
+
+
+def test_unavailable_backend_raises():
+    """Um backend sem dependências falha, sem cair no stub"""
+    register_backend("ausente", MissingBackend)
+    try:
+        try:
+            get_backend("ausente")
+            assert False, "backend indisponível deveria falhar"
+        except RuntimeError as e:
+            assert "TAREFO_OCR_BACKEND=stub" in str(e)
+        try:
+            get_backend("inexistente")
+            assert False, "backend desconhecido deveria falhar"
+        except ValueError:
+            pass
+    finally:
+        del ocr_backends.BACKENDS["ausente"]
+
+
+def test_stub_is_deterministic():
+    """O texto do stub depende só do conteúdo e da página"""
+    with tempfile.TemporaryDirectory() as tmp:
+        first = Path(tmp) / "a.png"
+        second = Path(tmp) / "b.png"
+        first.write_bytes(b"mesmo conteudo")
+        second.write_bytes(b"mesmo conteudo")
+        backend = StubBackend()
+        assert backend.recognize_page(first, 0) == backend.recognize_page(second, 0)
+        assert backend.recognize_page(first, 0) != backend.recognize_page(first, 1)
+        assert backend.page_count(first) == 1
+
+
+def test_multipage_document_in_order():
+    """As páginas de um PDF saem na ordem, também pela ferramenta"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_pdf(tmp, 3)
+        pages = recognize_document(path, StubBackend(), parallel=False)
+        assert [page.split("] ")[1] for page in pages] == ["página 1", "página 2", "página 3"]
+
+        tool = OCRTool(backend=StubBackend(), cache=False, parallel_pages=False)
+        result = tool.run(str(path))
+        assert result["pages"] == 3 and result["text_source"] == "ocr", result
+
+
+def test_count_pdf_pages_in_chunks():
+    """A contagem em blocos pequenos é igual à leitura do arquivo inteiro"""
+    previous = ocr_backends.PDF_SCAN_CHUNK
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = make_pdf(tmp, 40, padding=7)
+            expected = len(ocr_backends.PDF_PAGE_PATTERN.findall(path.read_bytes()))
+            assert expected == 40
+            for chunk in (1, 5, 17, 64, 100, 1024 * 1024):
+                ocr_backends.PDF_SCAN_CHUNK = chunk
+                assert count_pdf_pages(path) == expected, chunk
+
+            empty = Path(tmp) / "vazio.pdf"
+            empty.write_bytes(b"%PDF-1.4\n")
+            assert count_pdf_pages(empty) == 1
+    finally:
+        ocr_backends.PDF_SCAN_CHUNK = previous
+
+
+if __name__ == "__main__":
+    failures = 0
+    for test in (test_stub_only_when_selected, test_unavailable_backend_raises, test_stub_is_deterministic,
+                 test_multipage_document_in_order, test_count_pdf_pages_in_chunks):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Testes do lote de OCR
+
+Confere OCRTool.run_batch (tools/ocr_tool.py) com o backend stub: todos os itens
+saem com o índice original, um item com erro não interrompe o lote, um item que
+passa do tempo limite falha sozinho (os demais itens em execução não são
+reenviados) e o cancelamento encerra o lote.
+"""
+import os
+import sys
+import time
+import tempfile
+import threading
+from pathlib import Path
+
+import pytest
+
+from tools.ocr_tool import OCRTool
+from tools.ocr_backends import StubBackend
+
+
+@pytest.fixture(autouse=True)
+def ocr_cache_off(monkeypatch):
+    """O cache de OCR fica desligado só durante os testes deste arquivo"""
+    monkeypatch.setenv("TAREFO_OCR_CACHE", "off")
+
+
+class SlowBackend(StubBackend):
+    """Stub que demora em arquivos marcados e conta as execuções em disco"""
+
+    def __init__(self, log_dir):
+        self.log_dir = log_dir
+
+    def recognize_page(self, path, page_index, lang=None):
+        name = Path(path).stem
+        with open(Path(self.log_dir) / f"{name}.{os.getpid()}.{time.monotonic_ns()}", "w"):
+            pass
+        if name.startswith("trava"):
+            time.sleep(60)
+        elif name.startswith("pausa"):
+            time.sleep(0.9)
+        elif name.startswith("lento"):
+            time.sleep(0.8)
+        return super().recognize_page(path, page_index, lang)
+
+
+def make_images(tmp, names):
+    paths = []
+    for name in names:
+        path = Path(tmp) / f"{name}.png"
+        path.write_bytes(f"imagem {name}".encode("utf-8"))
+        paths.append(str(path))
+    return paths
+
+
+def runs(log_dir, name):
+    return len([entry for entry in os.listdir(log_dir) if entry.split(".")[0] == name])
+
+
+def test_batch_results_keep_index():
+    """Todos os itens saem com o índice original; erros não interrompem o lote"""
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = make_images(tmp, [f"foto_{index}" for index in range(5)])
+        paths.insert(2, str(Path(tmp) / "inexistente.png"))
+        tool = OCRTool(backend=StubBackend(), parallel_pages=False)
+
+        outcomes = {item["index"]: item for item in tool.run_batch(paths, max_workers=2)}
+        assert sorted(outcomes) == list(range(6))
+        assert outcomes[2]["ok"] is False and "não encontrado" in outcomes[2]["error"]
+        for index in (0, 1, 3, 4, 5):
+            assert outcomes[index]["ok"], outcomes[index]
+            assert "[ocr-stub" in outcomes[index]["result"]["text"]
+
+
+def test_timeout_fails_only_that_item():
+    """O item travado falha por tempo; o item lento em execução não é reenviado"""
+    # trava e pausa começam juntos; lento começa quando pausa termina e ainda
+    # está em execução quando trava vence o prazo
+    with tempfile.TemporaryDirectory() as tmp:
+        log_dir = Path(tmp) / "log"
+        log_dir.mkdir()
+        paths = make_images(tmp, ["trava", "pausa", "lento", "foto_a", "foto_b"])
+        tool = OCRTool(backend=SlowBackend(str(log_dir)), parallel_pages=False)
+
+        started = time.monotonic()
+        outcomes = {item["index"]: item for item in tool.run_batch(paths, max_workers=2, timeout=1.5)}
+        assert time.monotonic() - started < 30
+
+        assert outcomes[0]["ok"] is False and "Tempo limite" in outcomes[0]["error"]
+        for index in (1, 2, 3, 4):
+            assert outcomes[index]["ok"], outcomes[index]
+        assert runs(log_dir, "lento") == 1
+        assert runs(log_dir, "trava") == 1
+
+
+def test_cancel_event_stops_batch():
+    """Com o evento acionado, os itens em execução saem como cancelados"""
+    with tempfile.TemporaryDirectory() as tmp:
+        log_dir = Path(tmp) / "log"
+        log_dir.mkdir()
+        paths = make_images(tmp, [f"trava_{index}" for index in range(4)])
+        tool = OCRTool(backend=SlowBackend(str(log_dir)), parallel_pages=False)
+        cancel = threading.Event()
+        threading.Timer(0.5, cancel.set).start()
+
+        started = time.monotonic()
+        outcomes = list(tool.run_batch(paths, max_workers=2, cancel_event=cancel))
+        assert time.monotonic() - started < 30
+        assert sorted(item["index"] for item in outcomes) == [0, 1]
+        assert all(item["error"] == "Cancelado" for item in outcomes)
+
+
+if __name__ == "__main__":
+    # Processo próprio: desligar o cache aqui não afeta outros testes
+    os.environ["TAREFO_OCR_CACHE"] = "off"
+    failures = 0
+    for test in (test_batch_results_keep_index, test_timeout_fails_only_that_item,
+                 test_cancel_event_stops_batch):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Testes do cache de resultados de OCR
+
+Confere tools/ocr_cache.py: o LRU em memória, o nível em disco (leitura por outra
+instância e descarte dos menos usados acima do limite), a contagem de bytes em
+disco ao gravar e sobrescrever chaves, as permissões do diretório e dos arquivos e
+a gravação concorrente da mesma chave.
+"""
+import os
+import sys
+import json
+import stat
+import time
+import tempfile
+import threading
+from pathlib import Path
+
+from config.config import DATA_DIR
+from tools.ocr_cache import DEFAULT_CACHE_DIR, OCRCache, make_key
+
+
+def key(name):
+    return make_key(name * 8, "full", "stub")
+
+
+def test_default_dir_is_app_data():
+    """O padrão fica nos dados do aplicativo, não no diretório temporário compartilhado"""
+    assert DEFAULT_CACHE_DIR.parent == DATA_DIR
+    assert not str(DEFAULT_CACHE_DIR).startswith(tempfile.gettempdir())
+
+
+def test_memory_lru_eviction():
+    """O nível em memória descarta o menos usado; o disco ainda responde"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = OCRCache(tmp, memory_entries=2)
+        cache.set(key("a"), {"text": "a"})
+        cache.set(key("b"), {"text": "b"})
+        assert cache.get(key("a")) == {"text": "a"}
+        cache.set(key("c"), {"text": "c"})
+
+        assert list(cache._memory) == [key("a"), key("c")]
+        assert cache.get(key("b")) == {"text": "b"}
+        stats = cache.stats()
+        assert stats["hits"] == 2 and stats["disk_hits"] == 1 and stats["memory_entries"] == 2
+        assert cache.get(key("z")) is None and cache.stats()["misses"] == 1
+
+
+def test_disk_tier_shared_between_instances():
+    """Outra instância (outro processo) lê o resultado gravado em disco"""
+    with tempfile.TemporaryDirectory() as tmp:
+        OCRCache(tmp).set(key("a"), {"text": "recibo", "pages": 1})
+        other = OCRCache(tmp)
+        assert other.get(key("a")) == {"text": "recibo", "pages": 1}
+        assert other.stats()["disk_hits"] == 1
+
+
+def test_disk_eviction_keeps_recently_used():
+    """Acima do limite, saem primeiro os arquivos usados há mais tempo"""
+    with tempfile.TemporaryDirectory() as tmp:
+        value = {"text": "x" * 1000}
+        cache = OCRCache(tmp, memory_entries=1, max_disk_bytes=3500)
+        for index, name in enumerate("abc"):
+            cache.set(key(name), value)
+            path = cache._disk_path(key(name))
+            os.utime(path, (time.time() - 100 + index, time.time() - 100 + index))
+        # "a" é lido do disco e passa a ser o mais recente
+        assert cache.get(key("a")) == value
+
+        cache.set(key("d"), value)
+        assert cache._disk_path(key("a")).exists()
+        assert not cache._disk_path(key("b")).exists()
+        assert cache._disk_path(key("d")).exists()
+        assert cache.stats()["disk_bytes"] <= 3500
+
+
+def disk_size(cache_dir):
+    return sum(path.stat().st_size for path in Path(cache_dir).glob("*/*.json"))
+
+
+def test_disk_usage_matches_files():
+    """A contagem em disco não soma duas vezes o primeiro arquivo nem as chaves sobrescritas"""
+    with tempfile.TemporaryDirectory() as tmp:
+        OCRCache(tmp).set(key("a"), {"text": "antigo"})
+        cache = OCRCache(tmp)
+        for value in ({"text": "b" * 500}, {"text": "b" * 100}, {"text": "b" * 800}):
+            cache.set(key("b"), value)
+            assert cache.stats()["disk_bytes"] == disk_size(tmp)
+        cache.set(key("a"), {"text": "novo"})
+        assert cache.stats()["disk_bytes"] == disk_size(tmp)
+
+        # Sobrescrever a mesma chave muitas vezes não dispara o descarte
+        cache = OCRCache(Path(tmp) / "limite", max_disk_bytes=2000)
+        cache.set(key("a"), {"text": "a" * 500})
+        for attempt in range(20):
+            cache.set(key("b"), {"text": f"{attempt}" * 500})
+        assert cache._disk_path(key("a")).exists()
+        assert cache.stats()["disk_bytes"] == disk_size(Path(tmp) / "limite")
+
+
+def test_disk_files_are_private():
+    """Diretórios com permissão 0700, arquivos com 0600 e nenhum temporário sobrando"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_dir = Path(tmp) / "ocr_cache"
+        cache = OCRCache(cache_dir)
+        cache.set(key("a"), {"text": "dados do usuário"})
+        path = cache._disk_path(key("a"))
+        assert stat.S_IMODE(cache_dir.stat().st_mode) == 0o700
+        assert stat.S_IMODE(path.parent.stat().st_mode) == 0o700
+        assert stat.S_IMODE(path.stat().st_mode) == 0o600
+        assert [entry.name for entry in path.parent.iterdir()] == [path.name]
+
+
+def test_concurrent_writes_same_key():
+    """Gravações simultâneas da mesma chave por instâncias diferentes não se corrompem"""
+    with tempfile.TemporaryDirectory() as tmp:
+        caches = [OCRCache(tmp) for _ in range(8)]
+        errors = []
+
+        def write(cache, index):
+            try:
+                for attempt in range(50):
+                    cache.set(key("a"), {"text": f"{index}-{attempt}" * 200})
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=write, args=(cache, index)) for index, cache in enumerate(caches)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert not errors, errors
+        path = caches[0]._disk_path(key("a"))
+        assert json.loads(path.read_text(encoding="utf-8"))["text"]
+        assert [entry.name for entry in path.parent.iterdir()] == [path.name]
+
+
+if __name__ == "__main__":
+    failures = 0
+    for test in (test_default_dir_is_app_data, test_memory_lru_eviction, test_disk_tier_shared_between_instances,
+                 test_disk_eviction_keeps_recently_used, test_disk_usage_matches_files, test_disk_files_are_private,
+                 test_concurrent_writes_same_key):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+    sys.exit(1 if failures else 0)
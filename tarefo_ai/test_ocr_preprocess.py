@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Testes do pré-processamento de imagens para OCR
+
+Confere tools/ocr_preprocess.py: a seleção das etapas pelo ambiente, a redução de
+JPEGs grandes já na decodificação (draft), a normalização de resolução com o
+limite de pixels, o limiar de Otsu, a estimativa de inclinação e o registro do
+tempo de cada etapa.
+"""
+import io
+import os
+import sys
+
+from PIL import Image, ImageDraw
+
+from metrics import snapshot
+from tools.ocr_preprocess import (
+    STEPS, estimate_skew, otsu_threshold, preprocess_image, preprocess_settings, settings_tag,
+)
+
+
+def settings(steps, target_dpi=300, max_pixels=1_000_000):
+    return {"steps": tuple(steps), "target_dpi": target_dpi, "max_pixels": max_pixels}
+
+
+def jpeg(size, dpi=None, color=(200, 200, 200)):
+    """JPEG em memória, aberto sem decodificar"""
+    buffer = io.BytesIO()
+    options = {"dpi": (dpi, dpi)} if dpi else {}
+    Image.new("RGB", size, color).save(buffer, "JPEG", **options)
+    buffer.seek(0)
+    return Image.open(buffer)
+
+
+def test_settings_from_env():
+    """TAREFO_OCR_PREPROCESS escolhe as etapas, sempre na ordem do pipeline"""
+    previous = os.environ.get("TAREFO_OCR_PREPROCESS")
+    try:
+        os.environ["TAREFO_OCR_PREPROCESS"] = "binarize, grayscale"
+        current = preprocess_settings()
+        assert current["steps"] == ("grayscale", "binarize")
+        assert settings_tag(current).startswith("grayscale+binarize@")
+
+        os.environ["TAREFO_OCR_PREPROCESS"] = "off"
+        assert preprocess_settings()["steps"] == ()
+        assert settings_tag(preprocess_settings()) == "raw"
+
+        os.environ["TAREFO_OCR_PREPROCESS"] = "grayscale,sharpen"
+        try:
+            preprocess_settings()
+            assert False, "etapa desconhecida deveria falhar"
+        except ValueError as e:
+            assert "sharpen" in str(e)
+    finally:
+        if previous is None:
+            os.environ.pop("TAREFO_OCR_PREPROCESS", None)
+        else:
+            os.environ["TAREFO_OCR_PREPROCESS"] = previous
+
+
+def test_draft_downsamples_large_jpeg():
+    """Uma foto de 12 MP é decodificada já em 1/4 da escala e em tons de cinza"""
+    image = jpeg((4000, 3000), dpi=400)
+    processed, timings = preprocess_image(image, settings(["draft", "grayscale"]))
+    assert processed.size == (1000, 750), processed.size
+    assert processed.mode == "L"
+    assert set(timings) == {"draft", "grayscale"}
+    # A resolução declarada acompanha a redução
+    assert round(processed.info["dpi"][0]) == 100
+
+
+def test_normalize_dpi():
+    """Ajusta à resolução alvo, ignora 72 dpi de câmera e respeita o limite de pixels"""
+    processed, _ = preprocess_image(jpeg((1200, 800), dpi=600), settings(["normalize_dpi"]))
+    assert processed.size == (600, 400) and processed.info["dpi"] == (300, 300)
+
+    processed, _ = preprocess_image(jpeg((1200, 800), dpi=72), settings(["normalize_dpi"]))
+    assert processed.size == (1200, 800)
+
+    processed, _ = preprocess_image(
+        jpeg((1000, 1000), dpi=150), settings(["normalize_dpi"], max_pixels=250_000)
+    )
+    assert processed.size == (500, 500)
+
+
+def test_otsu_threshold_splits_levels():
+    """O limiar fica entre os dois níveis de uma imagem bimodal"""
+    image = Image.new("L", (100, 100), 40)
+    image.paste(210, (0, 0, 100, 30))
+    threshold = otsu_threshold(image)
+    assert 40 <= threshold < 210
+    processed, _ = preprocess_image(image, settings(["binarize"]))
+    levels = [level for level, count in enumerate(processed.histogram()) if count]
+    assert levels == [0, 255]
+
+
+def test_estimate_skew():
+    """A inclinação de linhas de texto é estimada com a precisão do passo"""
+    page = Image.new("L", (600, 600), 255)
+    draw = ImageDraw.Draw(page)
+    for y in range(60, 560, 40):
+        draw.rectangle((60, y, 540, y + 8), fill=0)
+    assert estimate_skew(page) == 0.0
+
+    tilted = page.rotate(3, resample=Image.BICUBIC, fillcolor=255)
+    assert abs(estimate_skew(tilted) + 3) <= 0.5, estimate_skew(tilted)
+
+
+def test_step_timings_are_recorded():
+    """Cada etapa executada entra no histograma com o label step"""
+    preprocess_image(jpeg((400, 300)), settings(STEPS))
+    steps = {series["labels"]["step"] for series in snapshot()["tarefo_ocr_preprocess_seconds"]["series"]}
+    assert set(STEPS) <= steps
+
+
+if __name__ == "__main__":
+    failures = 0
+    for test in (test_settings_from_env, test_draft_downsamples_large_jpeg, test_normalize_dpi,
+                 test_otsu_threshold_splits_levels, test_estimate_skew, test_step_timings_are_recorded):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Testes da fila persistente de OCR
+
+Confere tools/ocr_queue.py: a ordem de saída por prioridade (com a prioridade
+padrão derivada do tipo de extração), o banco padrão privado no diretório de
+dados, o prazo de visibilidade de um job cujo worker sumiu, a espera exponencial
+entre tentativas, a falha atômica entre workers e o descarte como falho depois
+da última tentativa, e a renovação do upload quando o job é enviado e quando é
+reservado.
+"""
+import sys
+import time
+import stat
+import sqlite3
+import tempfile
+import threading
+from pathlib import Path
+
+import pytest
+
+from tools import ocr_queue, upload_store
+from tools.ocr_queue import (
+    OCRJobQueue, default_priority, resolve_priority,
+    PRIORITY_INTERACTIVE, PRIORITY_NORMAL, PRIORITY_BULK, QUEUED, RUNNING, FAILED, DONE,
+)
+
+
+def new_queue(tmp, **kwargs):
+    return OCRJobQueue(Path(tmp) / "jobs.sqlite3", **kwargs)
+
+
+def test_default_priority_from_extract_type():
+    """Recibos e notas entram como lote; o resto, como interativo"""
+    assert default_priority("receipt") == PRIORITY_BULK
+    assert default_priority("invoice") == PRIORITY_BULK
+    assert default_priority("full") == PRIORITY_INTERACTIVE
+    assert resolve_priority(None, "receipt") == PRIORITY_BULK
+    assert resolve_priority("interactive", "receipt") == PRIORITY_INTERACTIVE
+    assert resolve_priority("normal") == PRIORITY_NORMAL
+    assert resolve_priority("7") == 7
+    try:
+        resolve_priority("urgente")
+        assert False, "prioridade desconhecida deveria falhar"
+    except ValueError:
+        pass
+
+
+def test_priority_order():
+    """Um lote de recibos enfileirado antes não atrasa o job do chat"""
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = new_queue(tmp)
+        receipts = [queue.submit(f"recibo_{index}.jpg", "receipt") for index in range(3)]
+        normal = queue.submit("extrato.pdf", "full", priority="normal")
+        chat = queue.submit("foto.jpg", "full")
+
+        order = [queue.claim("worker")["id"] for _ in range(5)]
+        assert order == [chat, normal] + receipts
+        assert queue.claim("worker") is None
+
+
+def test_default_path_is_private():
+    """O banco padrão fica no diretório de dados, com 0600 em um diretório 0700"""
+    with tempfile.TemporaryDirectory() as tmp, pytest.MonkeyPatch.context() as monkeypatch:
+        path = Path(tmp) / "data" / "ocr_jobs.sqlite3"
+        monkeypatch.setattr(ocr_queue, "DEFAULT_QUEUE_PATH", path)
+        monkeypatch.delenv("TAREFO_OCR_QUEUE_PATH", raising=False)
+        queue = OCRJobQueue()
+        queue.submit("foto.jpg")
+        assert queue.path == str(path)
+        assert stat.S_IMODE(path.parent.stat().st_mode) == 0o700
+        for name in (path.name, path.name + "-wal"):
+            assert stat.S_IMODE((path.parent / name).stat().st_mode) == 0o600, name
+
+
+def test_visibility_timeout():
+    """Um job reservado por um worker que sumiu volta para a fila ao fim do prazo"""
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = new_queue(tmp, visibility_timeout=0.3)
+        job_id = queue.submit("foto.jpg")
+
+        assert queue.claim("a")["id"] == job_id
+        assert queue.claim("b") is None
+        assert queue.heartbeat(job_id, "a")
+        time.sleep(0.4)
+
+        job = queue.claim("b")
+        assert job["id"] == job_id and job["owner"] == "b" and job["attempts"] == 2
+        # O worker antigo perdeu a reserva: o resultado dele é ignorado
+        assert not queue.heartbeat(job_id, "a")
+        assert not queue.complete(job_id, "a", {"text": "atrasado"})
+        assert queue.complete(job_id, "b", {"text": "ok"})
+        assert queue.get(job_id)["status"] == DONE
+        assert queue.get(job_id)["result"] == {"text": "ok"}
+
+
+def test_retry_backoff():
+    """Uma falha reenfileira o job só depois da espera exponencial"""
+    previous = ocr_queue.RETRY_BACKOFF
+    ocr_queue.RETRY_BACKOFF = 0.2
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            queue = new_queue(tmp, max_attempts=3)
+            job_id = queue.submit("foto.jpg")
+
+            queue.claim("w")
+            before = time.time()
+            assert queue.fail(job_id, "w", "tesseract falhou")
+            job = queue.get(job_id)
+            assert job["status"] == QUEUED and job["error"] == "tesseract falhou"
+            assert 0.15 <= job["visible_at"] - before <= 0.3
+            assert queue.claim("w") is None
+
+            time.sleep(0.25)
+            assert queue.claim("w")["attempts"] == 2
+            before = time.time()
+            queue.fail(job_id, "w", "de novo")
+            assert 0.35 <= queue.get(job_id)["visible_at"] - before <= 0.5
+    finally:
+        ocr_queue.RETRY_BACKOFF = previous
+
+
+def test_fail_is_atomic_across_workers():
+    """Vários workers falhando o mesmo job contam a tentativa uma única vez"""
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = new_queue(tmp, max_attempts=3)
+        job_id = queue.submit("foto.jpg")
+        queue.claim("w")
+
+        # Uma instância por worker, cada uma com sua conexão e sua trava
+        workers = [new_queue(tmp) for _ in range(8)]
+        barrier = threading.Barrier(len(workers))
+        results = []
+
+        def fail(worker_queue):
+            barrier.wait()
+            results.append(worker_queue.fail(job_id, "w", "erro"))
+
+        threads = [threading.Thread(target=fail, args=(worker_queue,)) for worker_queue in workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(30)
+        assert results.count(True) == 1, results
+        job = queue.get(job_id)
+        assert job["status"] == QUEUED and job["attempts"] == 1
+
+
+def test_dead_letter_after_last_attempt():
+    """Esgotadas as tentativas, o job fica como falho, por erro ou por prazo vencido"""
+    previous = ocr_queue.RETRY_BACKOFF
+    ocr_queue.RETRY_BACKOFF = 0.01
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            queue = new_queue(tmp, max_attempts=2, visibility_timeout=0.2)
+            failing = queue.submit("ruim.jpg")
+            for attempt in range(2):
+                time.sleep(0.05)
+                assert queue.claim("w")["attempts"] == attempt + 1
+                queue.fail(failing, "w", f"erro {attempt}")
+            job = queue.get(failing)
+            assert job["status"] == FAILED and job["error"] == "erro 1"
+
+            stuck = queue.submit("travado.jpg")
+            for _ in range(2):
+                assert queue.claim("w")["id"] == stuck
+                assert queue.get(stuck)["status"] == RUNNING
+                time.sleep(0.25)
+            assert queue.claim("w") is None
+            assert queue.get(stuck)["status"] == FAILED
+            assert queue.stats() == {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 2}
+    finally:
+        ocr_queue.RETRY_BACKOFF = previous
+
+
+def age_upload(root, seconds):
+    conn = sqlite3.connect(str(Path(root) / upload_store.INDEX_NAME))
+    with conn:
+        conn.execute("UPDATE uploads SET last_access = last_access - ?", (seconds,))
+    conn.close()
+
+
+def last_access(root, path):
+    conn = sqlite3.connect(str(Path(root) / upload_store.INDEX_NAME))
+    try:
+        return conn.execute("SELECT last_access FROM uploads WHERE path = ?", (path,)).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_upload_renewed_on_submit_and_claim():
+    """O upload de um job não expira enquanto o job espera na fila"""
+    import main
+
+    with tempfile.TemporaryDirectory() as tmp, pytest.MonkeyPatch.context() as monkeypatch:
+        uploads = str(Path(tmp) / "uploads")
+        monkeypatch.setenv("TAREFO_OCR_CACHE", "off")
+        monkeypatch.setenv("TAREFO_OCR_BACKEND", "stub")
+        monkeypatch.setenv("TAREFO_UPLOAD_DIR", uploads)
+        monkeypatch.setenv("TAREFO_OCR_QUEUE_PATH", str(Path(tmp) / "jobs.sqlite3"))
+        monkeypatch.setattr(ocr_queue, "_queue", None)
+        try:
+            path, _ = upload_store.get_upload_store().put(b"\x89PNG\r\n\x1a\n" + b"png" * 64)
+            age_upload(uploads, 1000)
+            before = time.time()
+            job_id = main.submit_image(1, path)["job_id"]
+            assert last_access(uploads, path) >= before
+
+            age_upload(uploads, 1000)
+            before = time.time()
+            stop = threading.Event()
+            worker = threading.Thread(target=ocr_queue.run_worker, kwargs={"stop_event": stop, "idle_poll": 0.05})
+            worker.start()
+            job = ocr_queue.get_ocr_queue().wait(job_id, timeout=30)
+            stop.set()
+            worker.join(30)
+            assert job["status"] == DONE, job
+            assert last_access(uploads, path) >= before
+        finally:
+            upload_store._stores.pop(uploads, None)
+
+
+if __name__ == "__main__":
+    failures = 0
+    for test in (test_default_priority_from_extract_type, test_priority_order, test_default_path_is_private,
+                 test_visibility_timeout, test_retry_backoff, test_fail_is_atomic_across_workers,
+                 test_dead_letter_after_last_attempt,
+                 test_upload_renewed_on_submit_and_claim):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Testes da extração página a página
+
+Confere OCRTool.iter_pages (tools/ocr_tool.py) e iter_document
+(tools/ocr_backends.py) com o backend stub: páginas na ordem com o total de
+páginas, leitura preguiçosa (parar no meio não reconhece o resto), PDFs digitais
+pela camada de texto com OCR só nas páginas digitalizadas, campos por página e
+falhas entregues como último item.
+"""
+import sys
+import tempfile
+from pathlib import Path
+
+from tools.ocr_backends import StubBackend, iter_document
+from tools.ocr_tool import OCRTool
+
+
+class CountingBackend(StubBackend):
+    """Stub que registra as páginas reconhecidas (só no mesmo processo)"""
+
+    def __init__(self):
+        self.calls = []
+
+    def recognize_page(self, path, page_index, lang=None):
+        self.calls.append(page_index)
+        return super().recognize_page(path, page_index, lang)
+
+
+def make_pdf(path, pages):
+    """PDF com uma página por item de `pages`: lista de linhas (vazia = digitalizada)"""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        content = ("BT /F1 10 Tf 40 800 Td 12 TL "
+                   + " ".join(f"({line}) '" for line in lines) + " ET").encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+        kids.append(len(objects) + 1)
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (len(objects)))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid in kids), len(kids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    Path(path).write_bytes(bytes(out))
+    return path
+
+
+TEXT_PAGE = ["SUPERMERCADO EXEMPLO LTDA", "CUPOM FISCAL ELETRONICO", "TOTAL R$ 45,90"]
+
+
+def test_iter_document_in_order():
+    """Com o pool e uma janela pequena, as páginas saem na ordem"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_pdf(Path(tmp) / "scan.pdf", [[]] * 5)
+        pages = list(iter_document(path, StubBackend(), parallel=True, window=2))
+        assert [index for index, _ in pages] == [0, 1, 2, 3, 4]
+        assert all(text.endswith(f"página {index + 1}") for index, text in pages)
+
+
+def test_iter_pages_is_lazy():
+    """Quem para na primeira página não paga o OCR das outras"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_pdf(Path(tmp) / "scan.pdf", [[]] * 4)
+        backend = CountingBackend()
+        pages = OCRTool(backend=backend, cache=False, parallel_pages=False).iter_pages(str(path))
+        first = next(pages)
+        assert first["page"] == 1 and first["pages"] == 4 and first["text_source"] == "ocr"
+        assert backend.calls == [0]
+        pages.close()
+        assert backend.calls == [0]
+
+
+def test_text_layer_with_scanned_page():
+    """Páginas com texto vêm da camada de texto; a digitalizada passa pelo OCR"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_pdf(Path(tmp) / "misto.pdf", [TEXT_PAGE, [], TEXT_PAGE])
+        backend = CountingBackend()
+        pages = list(OCRTool(backend=backend, cache=False, parallel_pages=False)
+                     .iter_pages(str(path), "receipt"))
+    assert [page["page"] for page in pages] == [1, 2, 3]
+    assert [page["text_source"] for page in pages] == ["text_layer", "ocr", "text_layer"]
+    assert backend.calls == [1]
+    assert "SUPERMERCADO EXEMPLO" in pages[0]["text"]
+    assert pages[0]["fields"]["total"] == 45.9
+    assert all("fields" in page for page in pages)
+
+
+def test_failure_is_last_item():
+    """Arquivo ausente ou formato inválido vira um único item com error"""
+    tool = OCRTool(backend=StubBackend(), cache=False)
+    pages = list(tool.iter_pages("/nao/existe.pdf"))
+    assert len(pages) == 1 and "Arquivo não encontrado" in pages[0]["error"]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "nota.txt"
+        path.write_text("texto")
+        pages = list(tool.iter_pages(str(path)))
+    assert len(pages) == 1 and "Formato não suportado" in pages[0]["error"]
+
+
+if __name__ == "__main__":
+    failures = 0
+    for test in (test_iter_document_in_order, test_iter_pages_is_lazy, test_text_layer_with_scanned_page,
+                 test_failure_is_last_item):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Testes e benchmark da detecção de dados pessoais nos valores
+
+Confere os detectores de tools/pii_detector.py (CPF, CNPJ, cartão, telefone e
+e-mail, com os dígitos verificadores) e mede a vazão de scan_strings em uma
+exportação de cadastros em que 1% dos registros tem dados pessoais.
+
+Limite ajustável:
+    TAREFO_PII_MIN_THROUGHPUT   MB de texto por segundo (padrão: 30)
+"""
+import os
+import sys
+import time
+
+from tools.compliance_checker_tool import ComplianceCheckerTool
+from tools.pii_detector import detect_pii, scan_strings
+
+MIN_THROUGHPUT = float(os.environ.get("TAREFO_PII_MIN_THROUGHPUT", "30"))
+
+VALID = {
+    "cpf": ["529.982.247-25", "52998224725"],
+    "cnpj": ["11.222.333/0001-81", "11222333000181"],
+    "credit_card": ["4111 1111 1111 1111", "5555-5555-5555-4444", "378282246310005", "3782 822463 10005"],
+    "phone": ["(11) 98765-4321", "+55 11 3456-7890", "11987654321", "(21)3456-7890"],
+    "email": ["joao.silva+teste@example.com.br"],
+}
+
+# Números parecidos que não são dados pessoais
+INVALID = [
+    "123.456.789-00",       # CPF com dígito verificador errado
+    "111.111.111-11",       # CPF com dígitos repetidos
+    "11.222.333/0001-80",   # CNPJ com dígito verificador errado
+    "4111 1111 1111 1112",  # falha no Luhn
+    "pedido 1234567890",
+    "R$ 1.234.567,89",
+    "12/03/2024 10:30",
+    "fale com a@b",
+]
+
+
+def types_in(text):
+    return [hit["type"] for hit in detect_pii(text)]
+
+
+def test_detects_valid_values():
+    """Cada formato aceito é detectado com o tipo certo"""
+    for pii_type, values in VALID.items():
+        for value in values:
+            assert types_in(f"obs: {value}.") == [pii_type], f"{value}: {types_in(value)}"
+
+
+def test_ignores_invalid_values():
+    """Dígitos verificadores errados e números comuns não são dados pessoais"""
+    for text in INVALID:
+        assert types_in(text) == [], f"{text}: {types_in(text)}"
+
+
+def test_adjacent_values_and_masking():
+    """Valores vizinhos são separados e devolvidos mascarados"""
+    hits = detect_pii("529.982.247-25 (11) 98765-4321 maria@example.com")
+    assert [hit["type"] for hit in hits] == ["cpf", "phone", "email"], hits
+    assert hits[0]["value"] == "************25"
+    assert hits[2]["value"] == "m***@example.com"
+
+
+def test_scan_strings_maps_indexes():
+    """As ocorrências voltam com o índice e a posição dentro de cada string"""
+    for strings in (["nada", "cpf 52998224725", "", "x@example.com"],
+                    ["a\x00b", "cpf 52998224725", "", "x@example.com"]):
+        hits = [(index, hit["type"], hit["start"]) for index, hit in scan_strings(strings)]
+        assert hits == [(1, "cpf", 4), (3, "email", 0)], hits
+
+
+def test_compliance_checks_values():
+    """Um CPF em um campo qualquer torna a requisição sensível"""
+    result = ComplianceCheckerTool().check_operation_compliance(
+        "store", {"consent_obtained": True, "notes": ["ligar para (11) 98765-4321, cpf 529.982.247-25"]}
+    )
+    assert result["sensitive_types"] == ["cpf"], result["sensitive_types"]
+    assert result["sensitive_paths"] == [{"path": "notes[0]", "type": "cpf"}]
+    assert [item["type"] for item in result["personal_data"]] == ["phone", "cpf"], result["personal_data"]
+
+
+def test_throughput():
+    """scan_strings fica acima do mínimo de MB/s em cadastros com poucos dados pessoais"""
+    strings = []
+    for index in range(100000):
+        strings += [f"Cliente {index}", "Rua das Flores, 120 - apto 31", "São Paulo",
+                    "prefere contato à tarde; pedido entregue sem problemas"]
+        if index % 100 == 0:
+            strings.append("cpf 529.982.247-25 tel (11) 98765-4321 maria@example.com")
+    size_mb = sum(len(text) for text in strings) / 1e6
+
+    start = time.perf_counter()
+    hits = scan_strings(strings)
+    elapsed = time.perf_counter() - start
+
+    throughput = size_mb / elapsed
+    print(f"⚡ {size_mb:.1f} MB em {elapsed * 1000:.0f} ms ({throughput:.0f} MB/s), {len(hits)} ocorrências")
+    assert len(hits) == 3000, len(hits)
+    assert throughput >= MIN_THROUGHPUT, f"{throughput:.0f} MB/s"
+
+
+if __name__ == "__main__":
+    failures = 0
+    for test in (test_detects_valid_values, test_ignores_invalid_values, test_adjacent_values_and_masking,
+                 test_scan_strings_maps_indexes, test_compliance_checks_values, test_throughput):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+    sys.exit(1 if failures else 0)
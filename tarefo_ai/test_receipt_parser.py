@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark de precisão e vazão do extrator de recibos
+
+Compara a saída de tools/receipt_parser.py com os campos esperados de cada recibo
+em receipt_corpus.json (texto de OCR de cupons fiscais / NFC-e) e mede quantos
+recibos por segundo são processados.
+
+Limites ajustáveis:
+    TAREFO_RECEIPT_MIN_ACCURACY     precisão mínima por campo (padrão: 0.9)
+    TAREFO_RECEIPT_MIN_THROUGHPUT   recibos por segundo (padrão: 1000)
+"""
+import os
+import sys
+import json
+import time
+from pathlib import Path
+
+from tools.receipt_parser import min_confidence, parse_receipt
+
+CORPUS_PATH = Path(__file__).parent / "receipt_corpus.json"
+MIN_ACCURACY = float(os.environ.get("TAREFO_RECEIPT_MIN_ACCURACY", "0.9"))
+MIN_THROUGHPUT = float(os.environ.get("TAREFO_RECEIPT_MIN_THROUGHPUT", "1000"))
+
+FIELDS = ("establishment", "cnpj", "date", "time", "total", "tax", "payment_method", "items")
+
+
+def load_corpus():
+    with open(CORPUS_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def field_matches(field, value, expected):
+    if field == "items":
+        return len(value) == expected
+    if isinstance(expected, float):
+        return abs(value - expected) < 0.005
+    return value == expected
+
+
+def measure_accuracy(corpus):
+    """
+    Returns:
+        dict: Campo -> fração dos recibos com o valor esperado
+    """
+    hits = dict.fromkeys(FIELDS, 0)
+    for sample in corpus:
+        receipt = parse_receipt(sample["text"])
+        for field in FIELDS:
+            if field_matches(field, receipt[field], sample["expected"][field]):
+                hits[field] += 1
+    return {field: hits[field] / len(corpus) for field in FIELDS}
+
+
+def measure_throughput(corpus, rounds=200):
+    """Recibos processados por segundo"""
+    texts = [sample["text"] for sample in corpus]
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in texts:
+            parse_receipt(text)
+    return rounds * len(texts) / (time.perf_counter() - start)
+
+
+def test_field_accuracy():
+    """Cada campo é extraído corretamente na maior parte do corpus"""
+    accuracy = measure_accuracy(load_corpus())
+    for field, value in accuracy.items():
+        print(f"🎯 {field}: {value:.0%}")
+    low = {field: value for field, value in accuracy.items() if value < MIN_ACCURACY}
+    assert not low, f"Precisão abaixo de {MIN_ACCURACY:.0%}: {low}"
+
+
+def test_low_confidence_goes_to_llm():
+    """Recibos ilegíveis ficam abaixo da confiança mínima; os legíveis, acima"""
+    for sample in load_corpus():
+        confidence = parse_receipt(sample["text"])["confidence"]
+        legible = bool(sample["expected"]["total"])
+        assert (confidence >= min_confidence()) == legible, (
+            f"{sample['name']}: confiança {confidence}"
+        )
+
+
+def test_throughput():
+    """A extração por regras fica na casa dos milhares de recibos por segundo"""
+    throughput = measure_throughput(load_corpus())
+    print(f"⚡ {throughput:.0f} recibos/s (mínimo {MIN_THROUGHPUT:.0f})")
+    assert throughput >= MIN_THROUGHPUT, f"{throughput:.0f} recibos/s"
+
+
+if __name__ == "__main__":
+    failures = 0
+    for test in (test_field_accuracy, test_low_confidence_goes_to_llm, test_throughput):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Testes do cache de respostas da crew
+
+Confere cache.py e run_crew_cached (crew.py): as respostas de um usuário nunca
+são servidas a outro, o compartilhamento entre usuários só vale para as intenções
+declaradas, intenções com efeitos colaterais (lembretes, agenda) não usam o
+cache, as entradas expiram pelo TTL, o banco é criado com permissão 0600 e um
+acerto devolve o mesmo tipo que uma execução.
+"""
+import os
+import sys
+import stat
+import time
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from cache import ResponseCache, normalize_context
+from crew import run_crew_cached
+
+
+class FakeOutput:
+    """Imita o CrewOutput: o texto da resposta sai em str()"""
+
+    def __init__(self, raw):
+        self.raw = raw
+
+    def __str__(self):
+        return self.raw
+
+
+class CountingCrew:
+    def __init__(self):
+        self.kickoffs = 0
+
+    def kickoff(self, inputs=None):
+        self.kickoffs += 1
+        return FakeOutput(f"resposta para {inputs['user_id']}")
+
+
+def context(user_id, message="Quanto gastei este mês?"):
+    return {"user_id": user_id, "message": message, "platform": "telegram", "timestamp": ""}
+
+
+def test_keys_are_scoped_per_user():
+    """O user_id entra na chave de todas as intenções, inclusive a mensagem livre"""
+    for intent in ("message", "reminder", "calendar", "image", "compliance", "full"):
+        first = ResponseCache.make_key(normalize_context(context(1), intent, shared=frozenset()))
+        second = ResponseCache.make_key(normalize_context(context(2), intent, shared=frozenset()))
+        assert first != second, intent
+
+    # O compartilhamento é opcional, por intenção
+    shared = frozenset({"message"})
+    assert normalize_context(context(1), "message", shared) == normalize_context(context(2), "message", shared)
+    assert normalize_context(context(1), "reminder", shared) != normalize_context(context(2), "reminder", shared)
+
+
+def test_shared_intents_from_env():
+    """TAREFO_CACHE_SHARED_INTENTS libera o compartilhamento das intenções listadas"""
+    os.environ["TAREFO_CACHE_SHARED_INTENTS"] = "message, calendar"
+    try:
+        assert "user_id" not in normalize_context(context(1), "message")
+        assert "user_id" not in normalize_context(context(1), "calendar")
+        assert normalize_context(context(1), "reminder")["user_id"] == 1
+    finally:
+        del os.environ["TAREFO_CACHE_SHARED_INTENTS"]
+    assert normalize_context(context(1), "message")["user_id"] == 1
+
+
+def test_ttl_expires_entries():
+    """Uma entrada mais velha que o TTL deixa de ser servida e é removida"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResponseCache(path=Path(tmp) / "cache.sqlite3", ttl=0.2)
+        cache.set("chave", "valor")
+        assert cache.get("chave") == (True, "valor")
+        time.sleep(0.3)
+        assert cache.get("chave") == (False, None)
+        assert cache.stats()["size"] == 0
+
+
+def test_database_is_private():
+    """O banco é criado com permissão 0600"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "sub" / "cache.sqlite3"
+        cache = ResponseCache(path=path)
+        cache.set("chave", "valor")
+        assert stat.S_IMODE(path.stat().st_mode) == 0o600
+
+
+def test_hit_path_returns_same_type():
+    """O acerto devolve o mesmo texto e tipo da execução, sem novo kickoff"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResponseCache(path=Path(tmp) / "cache.sqlite3")
+        crew = CountingCrew()
+
+        miss = run_crew_cached(crew, context(1), cache=cache)
+        hit = run_crew_cached(crew, context(1, "  quanto gastei este MÊS? "), cache=cache)
+        assert type(miss) is type(hit) is str
+        assert miss == hit == "resposta para 1"
+        assert crew.kickoffs == 1
+
+        # Outro usuário com a mesma pergunta não recebe a resposta do primeiro
+        other = run_crew_cached(crew, context(2), cache=cache)
+        assert other == "resposta para 2"
+        assert crew.kickoffs == 2
+        assert cache.stats()["hits"] == 1
+
+
+def test_side_effect_intents_skip_cache():
+    """Repetir "me lembre amanhã às 9" executa a crew de novo (o lembrete é criado)"""
+    with tempfile.TemporaryDirectory() as tmp, pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.delenv("TAREFO_CACHE_INTENTS", raising=False)
+        cache = ResponseCache(path=Path(tmp) / "cache.sqlite3")
+        crew = CountingCrew()
+        for message in ("Me lembre amanhã às 9", "Me lembre amanhã às 9",
+                        "Agendar reunião amanhã às 15h", "Agendar reunião amanhã às 15h"):
+            run_crew_cached(crew, context(1, message), cache=cache)
+        assert crew.kickoffs == 4
+        assert cache.stats()["size"] == 0 and cache.stats()["hits"] == 0
+
+        # Só as intenções listadas em TAREFO_CACHE_INTENTS usam o cache
+        monkeypatch.setenv("TAREFO_CACHE_INTENTS", "calendar")
+        run_crew_cached(crew, context(1, "Agendar reunião amanhã às 15h"), cache=cache)
+        run_crew_cached(crew, context(1, "Agendar reunião amanhã às 15h"), cache=cache)
+        run_crew_cached(crew, context(1), cache=cache)
+        run_crew_cached(crew, context(1), cache=cache)
+        assert crew.kickoffs == 7 and cache.stats()["hits"] == 1
+
+
+if __name__ == "__main__":
+    failures = 0
+    for test in (test_keys_are_scoped_per_user, test_shared_intents_from_env, test_ttl_expires_entries,
+                 test_database_is_private, test_hit_path_returns_same_type, test_side_effect_intents_skip_cache):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+    sys.exit(1 if failures else 0)
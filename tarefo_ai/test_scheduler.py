@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Testes do DAG de tarefas
+
+Confere scheduler.py: a montagem do grafo (tarefas assíncronas recebem o
+resultado da tarefa síncrona anterior, `depends_on` cria dependências extras e
+`context` não), a detecção de ciclos, a execução em paralelo respeitando as
+dependências e o repasse dos resultados no ScheduledCrew pelo `Task.context`, sem
+misturar execuções simultâneas.
+"""
+import sys
+import time
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+import yaml
+
+from scheduler import build_task_graph, run_dag, ScheduledCrew, _check_acyclic
+
+TASKS_YAML = Path(__file__).parent / "config" / "tasks.yaml"
+
+
+def task(description, async_execution=False, **extra):
+    return {"description": description, "async_execution": async_execution, **extra}
+
+
+def test_async_tasks_depend_on_previous_sync():
+    """Assíncronas dependem da síncrona anterior e não bloqueiam as seguintes"""
+    graph = build_task_graph([
+        task("a"), task("b", True), task("c"), task("d", True), task("e", True), task("f"),
+    ])
+    assert graph == [set(), {0}, {0}, {2}, {2}, {2}]
+
+
+def test_context_is_free_text_and_depends_on_adds_edges():
+    """Entradas de context não criam arestas; depends_on, sim"""
+    graph = build_task_graph([
+        task("a"),
+        task("b", True, context=["a"]),
+        task("c", True),
+        task("d", depends_on=["b", "c", "ausente"]),
+    ])
+    assert graph == [set(), {0}, {0}, {0, 1, 2}]
+
+
+def test_tasks_yaml_graph():
+    """No tasks.yaml, toda tarefa assíncrona recebe a síncrona que a precede"""
+    configs = yaml.safe_load(TASKS_YAML.read_text(encoding="utf-8"))["tasks"]
+    graph = build_task_graph(configs)
+    last_sync = None
+    for index, config in enumerate(configs):
+        if index:
+            assert last_sync in graph[index], (config["description"], graph[index])
+        if not config.get("async_execution", False):
+            last_sync = index
+
+
+def test_cycle_detection():
+    """Um ciclo entre depends_on e a ordem das síncronas é recusado"""
+    try:
+        build_task_graph([task("a", depends_on=["b"]), task("b")])
+        assert False, "ciclo não detectado"
+    except ValueError as e:
+        assert "circular" in str(e)
+    try:
+        _check_acyclic([{2}, {0}, {1}])
+        assert False, "ciclo não detectado"
+    except ValueError:
+        pass
+    _check_acyclic([set(), {0}, {0, 1}])
+
+
+def test_run_dag_parallel_and_ordered():
+    """Nós independentes rodam juntos; cada nó recebe os resultados das dependências"""
+    graph = [set(), {0}, {0}, {1, 2}]
+    active = []
+    peak = [0]
+    lock = threading.Lock()
+    received = {}
+
+    def run_node(node, inputs):
+        received[node] = inputs
+        with lock:
+            active.append(node)
+            peak[0] = max(peak[0], len(active))
+        time.sleep(0.05)
+        with lock:
+            active.remove(node)
+        return f"r{node}"
+
+    results = run_dag(graph, run_node, max_workers=4)
+    assert results == ["r0", "r1", "r2", "r3"]
+    assert received[1] == {0: "r0"} and received[3] == {1: "r1", 2: "r2"}
+    assert peak[0] == 2
+
+
+def test_run_dag_propagates_errors():
+    """Uma falha em um nó interrompe a execução"""
+    def run_node(node, inputs):
+        if node == 1:
+            raise RuntimeError("falhou")
+        return node
+
+    try:
+        run_dag([set(), {0}, {1}], run_node)
+        assert False, "erro não propagado"
+    except RuntimeError as e:
+        assert str(e) == "falhou"
+
+
+class FakeTask:
+    def __init__(self, description):
+        self.description = description
+        self.agent = None
+        self.context = None
+        self.output = None
+
+
+class FakeCrew:
+    """Crew de uma tarefa que, como o crewai, lê a saída das tarefas em task.context"""
+
+    def __init__(self, task):
+        self.task = task
+
+    def kickoff(self, inputs=None):
+        previous = "+".join(dep.output.raw for dep in self.task.context or [] if dep.output is not None)
+        if self.task.description == "inicio":
+            # Dá tempo para outra execução simultânea terminar a sua tarefa inicial
+            time.sleep(0.05 * inputs["user_id"])
+        raw = f"{self.task.description}{inputs['user_id']}<{previous}>"
+        self.task.output = SimpleNamespace(raw=raw)
+        return raw
+
+
+def test_scheduled_crew_passes_previous_outputs():
+    """A tarefa recebe o resultado das dependências pelo context da tarefa"""
+    configs = [task("inicio"), task("paralela", True), task("fim", depends_on=["paralela"])]
+    tasks = [FakeTask(config["description"]) for config in configs]
+    outputs = []
+    crew = ScheduledCrew([], tasks, configs, FakeCrew)
+    result = crew.kickoff({"user_id": 1}, task_callback=outputs.append)
+    assert result == "fim1<inicio1<>+paralela1<inicio1<>>>", result
+    assert {str(output) for output in outputs} == {
+        "inicio1<>", "paralela1<inicio1<>>", "fim1<inicio1<>+paralela1<inicio1<>>>",
+    }
+    # As tarefas configuradas não são alteradas pela execução
+    assert all(t.context is None and t.output is None for t in tasks)
+
+
+def test_concurrent_kickoffs_do_not_mix_outputs():
+    """Execuções simultâneas da mesma crew veem só as próprias saídas"""
+    configs = [task("inicio"), task("paralela", True), task("fim")]
+    crew = ScheduledCrew([], [FakeTask(config["description"]) for config in configs], configs, FakeCrew)
+    results = {}
+
+    def run(user_id):
+        results[user_id] = crew.kickoff({"user_id": user_id})
+
+    threads = [threading.Thread(target=run, args=(user_id,)) for user_id in (1, 2, 3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+    assert results == {user_id: f"fim{user_id}<inicio{user_id}<>>" for user_id in (1, 2, 3)}, results
+
+
+if __name__ == "__main__":
+    failures = 0
+    for test in (test_async_tasks_depend_on_previous_sync, test_context_is_free_text_and_depends_on_adds_edges,
+                 test_tasks_yaml_graph, test_cycle_detection, test_run_dag_parallel_and_ordered,
+                 test_run_dag_propagates_errors, test_scheduled_crew_passes_previous_outputs,
+                 test_concurrent_kickoffs_do_not_mix_outputs):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark e testes da busca de campos sensíveis do ComplianceCheckerTool
+
+Confere a comparação por tokens e os caminhos devolvidos por
+tools/sensitive_scanner.py e mede a vazão em um payload grande e aninhado
+(exportação de usuários), comparando com a busca antiga (json.dumps + substrings).
+
+Limite ajustável:
+    TAREFO_SCAN_MIN_THROUGHPUT   MB de JSON por segundo (padrão: 5)
+"""
+import os
+import sys
+import json
+import time
+
+from tools.compliance_checker_tool import ComplianceCheckerTool
+
+MIN_THROUGHPUT = float(os.environ.get("TAREFO_SCAN_MIN_THROUGHPUT", "5"))
+
+
+def build_export(users=20000):
+    """Payload no formato de uma exportação de usuários, sem campos sensíveis"""
+    return {
+        "consent_obtained": True,
+        "users": [
+            {
+                "name": f"Usuário {index}",
+                "email": f"usuario{index}@example.com",
+                "address": {"street": "Rua das Flores", "city": "São Paulo", "zip": "01000-000"},
+                "orders": [{"sku": f"SKU{item}", "qty": item, "price": 9.9} for item in range(3)],
+                "preferences": {"theme": "dark", "video": True, "idade_minima": 18},
+            }
+            for index in range(users)
+        ],
+    }
+
+
+def legacy_scan(data, sensitive_types):
+    """Busca anterior: serializa o payload e procura cada tipo como substring"""
+    data_str = json.dumps(data, ensure_ascii=False).lower()
+    return [data_type for data_type in sensitive_types if data_type in data_str]
+
+
+def test_token_boundaries():
+    """Nomes de campo casam por token, não por substring"""
+    tool = ComplianceCheckerTool()
+    types, _ = tool.find_sensitive_data({"video": 1, "idade": 2, "provider": 3, "origin": 4})
+    assert types == [], types
+    types, _ = tool.find_sensitive_data({"user_id": 1, "creditCardNumber": 2, "geo-location": 3})
+    assert types == ["id", "credit_card", "location"], types
+
+
+def test_reports_paths():
+    """Cada ocorrência vem com o caminho do campo"""
+    tool = ComplianceCheckerTool()
+    data = {
+        "profile": {"documents": [{"CPF": "123"}, {"passportNumber": "X1"}]},
+        "data_types": ["health"],
+    }
+    types, paths = tool.find_sensitive_data(data)
+    assert types == ["cpf", "passport", "health"], types
+    assert paths == [
+        {"path": "data_types[0]", "type": "health"},
+        {"path": "profile.documents[0].CPF", "type": "cpf"},
+        {"path": "profile.documents[1].passportNumber", "type": "passport"},
+    ], paths
+    result = tool.check_operation_compliance("store", data)
+    assert result["sensitive_paths"] == paths
+
+
+def test_deep_nesting():
+    """Payloads muito aninhados não esbarram no limite de recursão"""
+    data = node = {}
+    for _ in range(sys.getrecursionlimit() * 2):
+        node["child"] = {}
+        node = node["child"]
+    node["rg"] = "1"
+    types, paths = ComplianceCheckerTool().find_sensitive_data(data)
+    assert types == ["rg"] and paths[0]["path"].endswith("child.rg")
+
+
+def test_throughput():
+    """A varredura de uma exportação grande fica acima do mínimo de MB/s"""
+    tool = ComplianceCheckerTool()
+    data = build_export()
+    size_mb = len(json.dumps(data, ensure_ascii=False).encode("utf-8")) / 1e6
+
+    start = time.perf_counter()
+    types, _ = tool.find_sensitive_data(data)
+    elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    legacy_types = legacy_scan(data, tool.sensitive_data_types)
+    legacy_elapsed = time.perf_counter() - start
+
+    throughput = size_mb / elapsed
+    print(f"⚡ {size_mb:.1f} MB em {elapsed * 1000:.0f} ms ({throughput:.1f} MB/s); "
+          f"busca anterior: {legacy_elapsed * 1000:.0f} ms, tipos {legacy_types}")
+    assert types == [], f"Falsos positivos: {types}"
+    assert throughput >= MIN_THROUGHPUT, f"{throughput:.1f} MB/s"
+
+
+if __name__ == "__main__":
+    failures = 0
+    for test in (test_token_boundaries, test_reports_paths, test_deep_nesting, test_throughput):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+    sys.exit(1 if failures else 0)
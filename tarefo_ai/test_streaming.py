@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Testes do streaming de respostas
+
+Confere run_crew_stream (crew.py) e process_user_message_stream (main.py) com
+crews falsas: a sequência de eventos (started, tokens, tarefas concluídas,
+result), os tokens do LLM em modo streaming entregues pelo barramento de eventos
+do crewai (só no caminho de streaming), a cópia da crew que recebe o callback e o
+LLM, o DAG do ScheduledCrew e a conversão de falhas em evento de erro.
+"""
+import sys
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+
+import crew
+import main
+from crew import run_crew, run_crew_stream
+from scheduler import ScheduledCrew
+
+
+class EventBus:
+    """Barramento de eventos no formato do crewai_event_bus"""
+
+    def __init__(self):
+        self.handlers = {}
+
+    def on(self, event_type):
+        def register(handler):
+            self.handlers.setdefault(event_type, []).append(handler)
+            return handler
+        return register
+
+    def emit(self, source, event):
+        for handler in self.handlers.get(type(event), []):
+            handler(source, event)
+
+
+class LLMStreamChunkEvent:
+    def __init__(self, chunk):
+        self.chunk = chunk
+
+
+class LLM:
+    """LLM do crewai: guarda os argumentos de criação"""
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+
+
+bus = EventBus()
+
+
+@contextmanager
+def fake_crewai(stream_tokens="on"):
+    """crewai falso (LLM e barramento de eventos) com o cache de respostas desligado"""
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv("TAREFO_CACHE", "off")
+        monkeypatch.setenv("TAREFO_STREAM_TOKENS", stream_tokens)
+        monkeypatch.setitem(sys.modules, "crewai", SimpleNamespace(LLM=LLM))
+        monkeypatch.setitem(sys.modules, "crewai.events", SimpleNamespace(
+            crewai_event_bus=bus, LLMStreamChunkEvent=LLMStreamChunkEvent))
+        monkeypatch.setattr(crew, "_stream_listener_registered", False)
+        monkeypatch.setattr(crew, "load_crewai", lambda: True)
+        monkeypatch.setattr(crew, "llm", "padrão")
+        monkeypatch.setitem(crew.LLM_CONFIG, "provider", "anthropic")
+        bus.handlers.clear()
+        yield
+
+
+class TaskOutput:
+    def __init__(self, description, raw):
+        self.description = description
+        self.raw = raw
+
+
+class Agent:
+    def __init__(self, llm="padrão"):
+        self.llm = llm
+
+    def copy(self):
+        return Agent(self.llm)
+
+
+def emit_tokens(llm, tokens):
+    """Como o crewai: cada trecho gerado vira um LLMStreamChunkEvent do LLM"""
+    for token in tokens:
+        bus.emit(llm, LLMStreamChunkEvent(str(token)))
+
+
+class StreamingCrew:
+    """Crew falsa que emite tokens pelo LLM do agente e conclui duas tarefas"""
+
+    def __init__(self, fail=False):
+        self.task_callback = None
+        self.fail = fail
+        self.agents = [Agent()]
+        self.clones = []
+
+    def copy(self):
+        # Como Crew.copy(): os agentes também são copiados
+        clone = StreamingCrew(self.fail)
+        clone.task_callback = self.task_callback
+        clone.agents = [agent.copy() for agent in self.agents]
+        self.clones.append(clone)
+        return clone
+
+    def kickoff(self, inputs=None):
+        emit_tokens(self.agents[0].llm, ("Olá", ", ", inputs["user_id"]))
+        if self.fail:
+            raise RuntimeError("LLM indisponível")
+        if self.task_callback:
+            for description in ("entender", "responder"):
+                self.task_callback(TaskOutput(description, f"{description} ok"))
+        return "resposta final"
+
+
+def test_event_sequence():
+    """started, tokens e tarefas na ordem, terminando no resultado"""
+    shared = StreamingCrew()
+    with fake_crewai():
+        events = list(run_crew_stream(shared, {"user_id": 7}))
+    kinds = [event["event"] for event in events]
+    assert kinds == ["started", "token", "token", "token", "task_completed", "task_completed", "result"], kinds
+    assert "".join(event["text"] for event in events if event["event"] == "token") == "Olá, 7"
+    assert [event["task"] for event in events if event["event"] == "task_completed"] == ["entender", "responder"]
+    assert events[-1]["result"] == "resposta final"
+    # O callback e o LLM vão para a cópia; a crew compartilhada não é alterada
+    assert len(shared.clones) == 1 and shared.task_callback is None
+    assert shared.agents[0].llm == "padrão"
+
+
+def test_tokens_only_on_streaming_path():
+    """Só run_crew_stream usa LLM(stream=True); sem streaming o LLM padrão é mantido"""
+    shared = StreamingCrew()
+    with fake_crewai():
+        list(run_crew_stream(shared, {"user_id": 1}))
+        stream_llm = shared.clones[0].agents[0].llm
+        assert isinstance(stream_llm, LLM) and stream_llm.kwargs["stream"] is True
+        assert stream_llm.kwargs["model"].startswith("anthropic/")
+        # Trechos de um LLM sem execução de streaming em andamento são ignorados
+        emit_tokens(stream_llm, ("atrasado",))
+
+        assert run_crew(shared, {"user_id": 1}) == "resposta final"
+        assert shared.agents[0].llm == "padrão"
+
+    with fake_crewai(stream_tokens="off"):
+        events = list(run_crew_stream(shared, {"user_id": 1}))
+    assert "token" not in [event["event"] for event in events]
+    assert shared.clones[-1].agents[0].llm == "padrão"
+
+
+def test_errors_become_events():
+    """Falhas da crew e crew ausente viram evento de erro"""
+    with fake_crewai():
+        events = list(run_crew_stream(StreamingCrew(fail=True), {"user_id": 1}))
+        assert events[-1]["event"] == "error" and "LLM indisponível" in events[-1]["error"]
+        assert [event["event"] for event in run_crew_stream(None)] == ["error"]
+
+
+class NodeCrew:
+    def __init__(self, task):
+        self.task = task
+
+    def kickoff(self, inputs=None):
+        if self.task.agent is not None:
+            emit_tokens(self.task.agent.llm, (self.task.description,))
+        return f"{self.task.description} pronto"
+
+
+class FakeTask:
+    def __init__(self, description, agent=None):
+        self.description = description
+        self.agent = agent
+
+
+def test_scheduled_crew_streams_each_task():
+    """No DAG, cada tarefa concluída gera um evento e os agentes copiados fazem streaming"""
+    configs = [{"description": "a"}, {"description": "b", "async_execution": True}, {"description": "c"}]
+    agent = Agent()
+    tasks = [FakeTask(c["description"], agent if c["description"] == "b" else None) for c in configs]
+    scheduled = ScheduledCrew([], tasks, configs, NodeCrew)
+    with fake_crewai():
+        events = list(run_crew_stream(scheduled, {"user_id": 1}))
+    completed = sorted(event["task"] for event in events if event["event"] == "task_completed")
+    assert completed == ["a", "b", "c"]
+    assert [event["text"] for event in events if event["event"] == "token"] == ["b"]
+    assert events[-1] == {"event": "result", "result": "c pronto"}
+    assert agent.llm == "padrão"
+
+
+def test_process_user_message_stream():
+    """A resposta final da mensagem sai como texto no último evento"""
+    with fake_crewai(), pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(main, "get_crew_for_context", lambda context: StreamingCrew())
+        events = list(main.process_user_message_stream(3, "Oi"))
+    assert events[0]["event"] == "started"
+    assert events[-1] == {"event": "result", "result": "resposta final"}
+
+
+if __name__ == "__main__":
+    failures = 0
+    for test in (test_event_sequence, test_tokens_only_on_streaming_path, test_errors_become_events,
+                 test_scheduled_crew_streams_each_task, test_process_user_message_stream):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+    sys.exit(1 if failures else 0)
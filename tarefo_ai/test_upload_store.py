@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Testes do store de uploads
+
+Confere tools/upload_store.py: formatos que o OCR não lê são recusados já no
+upload, uploads idênticos reaproveitam o arquivo, a deduplicação renova o prazo
+do arquivo antes que a limpeza o apague e uma única thread limpa todos os stores.
+"""
+import os
+import sys
+import base64
+import sqlite3
+import time
+import tempfile
+import threading
+from pathlib import Path
+
+from tools import upload_store
+from tools.upload_store import UploadStore, UnsupportedFormatError, get_upload_store, INDEX_NAME, TMP_DIR_NAME
+
+JPEG = b"\xff\xd8\xff\xe0" + b"jpeg" * 64
+PNG = b"\x89PNG\r\n\x1a\n" + b"png" * 64
+
+
+def test_supported_formats_are_stored():
+    """JPEG, PNG e PDF são gravados com a extensão dos magic bytes"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = UploadStore(tmp)
+        data_url = "data:image/png;base64," + base64.b64encode(JPEG).decode("ascii")
+        path, existed = store.put(data_url)
+        assert path.endswith(".jpg") and not existed
+        assert Path(path).read_bytes() == JPEG
+        assert store.put(b"%PDF-1.4 documento")[0].endswith(".pdf")
+
+
+def test_unsupported_formats_are_rejected():
+    """GIF, TIFF, WebP e conteúdos desconhecidos são recusados sem sobrar arquivo"""
+    samples = {
+        "GIF": b"GIF89a" + b"\x00" * 32,
+        "TIFF": b"II*\x00" + b"\x00" * 32,
+        "WEBP": b"RIFF\x00\x00\x00\x00WEBPVP8 " + b"\x00" * 32,
+        "desconhecido": b"texto qualquer",
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        store = UploadStore(tmp)
+        for name, data in samples.items():
+            try:
+                store.put(data)
+                assert False, f"{name} deveria ser recusado"
+            except UnsupportedFormatError as e:
+                assert name in str(e), str(e)
+        assert not list((Path(tmp) / TMP_DIR_NAME).iterdir())
+        assert store.stats()["files"] == 0
+
+
+def test_ocr_tool_reports_unsupported_format():
+    """O OCR devolve o motivo da recusa em vez de falhar ao ler o arquivo"""
+    from tools.ocr_tool import OCRTool
+    from tools.ocr_backends import StubBackend
+
+    gif = "data:image/gif;base64," + base64.b64encode(b"GIF89a" + b"\x00" * 32).decode("ascii")
+    with tempfile.TemporaryDirectory() as tmp:
+        previous = os.environ.get("TAREFO_UPLOAD_DIR")
+        os.environ["TAREFO_UPLOAD_DIR"] = tmp
+        try:
+            result = OCRTool(backend=StubBackend(), cache=False).run(gif)
+        finally:
+            upload_store._stores.pop(tmp, None)
+            if previous is None:
+                del os.environ["TAREFO_UPLOAD_DIR"]
+            else:
+                os.environ["TAREFO_UPLOAD_DIR"] = previous
+        assert "Formato não suportado: GIF" in result["error"], result
+
+
+def test_deduplication_renews_before_sweep():
+    """Um arquivo devolvido por deduplicação não é apagado pela limpeza seguinte"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = UploadStore(tmp, ttl=60)
+        path, _ = store.put(PNG)
+        expired, _ = store.put(JPEG)
+
+        # Os dois passam do prazo; o PNG é enviado de novo antes da limpeza
+        conn = sqlite3.connect(str(Path(tmp) / INDEX_NAME))
+        with conn:
+            conn.execute("UPDATE uploads SET last_access = last_access - 120")
+        conn.close()
+        again, existed = store.put(PNG)
+        assert existed and again == path
+
+        assert store.sweep()["files"] == 1
+        assert os.path.exists(path)
+        assert not os.path.exists(expired)
+
+
+class RenewingConnection:
+    """Conexão que, logo após a consulta da limpeza, renova os registros por outra conexão"""
+
+    def __init__(self, real, other):
+        self.real = real
+        self.other = other
+
+    def execute(self, sql, *args):
+        cursor = self.real.execute(sql, *args)
+        if sql.lstrip().startswith("SELECT hash, path, size"):
+            rows = cursor.fetchall()
+            with self.other:
+                self.other.execute("UPDATE uploads SET last_access = ?", (time.time(),))
+            return Rows(rows)
+        return cursor
+
+    def __getattr__(self, name):
+        return getattr(self.real, name)
+
+    def __enter__(self):
+        return self.real.__enter__()
+
+    def __exit__(self, *exc):
+        return self.real.__exit__(*exc)
+
+
+class Rows(list):
+    def fetchall(self):
+        return list(self)
+
+
+def test_sweep_skips_entries_renewed_after_select():
+    """A limpeza não apaga um arquivo renovado por outro processo depois da consulta"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = UploadStore(tmp, ttl=60)
+        path, _ = store.put(PNG)
+        other = sqlite3.connect(str(Path(tmp) / INDEX_NAME), timeout=10)
+        with other:
+            other.execute("UPDATE uploads SET last_access = last_access - 120")
+
+        store._conn = RenewingConnection(store._connection(), other)
+        try:
+            assert store.sweep()["files"] == 0
+        finally:
+            other.close()
+        assert os.path.exists(path)
+
+
+def test_single_sweeper_thread():
+    """Vários stores compartilham uma só thread de limpeza"""
+    upload_store.stop_sweeper()
+    with tempfile.TemporaryDirectory() as tmp:
+        roots = [str(Path(tmp) / f"raiz_{index}") for index in range(3)]
+        try:
+            stores = [get_upload_store(root) for root in roots]
+            assert len({id(store) for store in stores}) == 3
+            assert get_upload_store(roots[0]) is stores[0]
+            sweepers = [t for t in threading.enumerate() if t.name == "tarefo-upload-sweeper"]
+            assert len(sweepers) == 1
+        finally:
+            for root in roots:
+                upload_store._stores.pop(root, None)
+            upload_store.stop_sweeper()
+        assert not [t for t in threading.enumerate() if t.name == "tarefo-upload-sweeper"]
+
+
+if __name__ == "__main__":
+    failures = 0
+    for test in (test_supported_formats_are_stored, test_unsupported_formats_are_rejected,
+                 test_ocr_tool_reports_unsupported_format, test_deduplication_renews_before_sweep,
+                 test_sweep_skips_entries_renewed_after_select, test_single_sweeper_thread):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+    sys.exit(1 if failures else 0)
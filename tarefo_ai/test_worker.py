@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Testes do protocolo do modo worker
+
+Confere worker.py: serialização das mensagens, respostas de erro para linhas que
+não são objetos JSON (sem derrubar o laço do supervisor), o cancelamento de uma
+requisição em andamento, a leitura do stdout de cada worker por uma única thread
+e uma sessão completa com o supervisor em um subprocesso.
+"""
+import os
+import sys
+import json
+import threading
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from worker import Worker, WorkerProcess, WorkerSupervisor, encode_frame, decode_frame, invalid_request
+
+
+@pytest.fixture(autouse=True)
+def cache_off(monkeypatch):
+    """O cache de respostas fica desligado só durante os testes deste arquivo"""
+    monkeypatch.setenv("TAREFO_CACHE", "off")
+
+
+WORKER_SCRIPT = Path(__file__).parent / "worker.py"
+
+
+def test_frames():
+    """Cada mensagem ocupa uma linha, e linhas vazias são ignoradas"""
+    frame = encode_frame({"id": 1, "ok": True, "result": "linha 1\nlinha 2"})
+    assert frame.count("\n") == 1
+    assert decode_frame(frame) == {"id": 1, "ok": True, "result": "linha 1\nlinha 2"}
+    assert decode_frame("   \n") is None
+    assert invalid_request({"id": 1}) is None
+    for value in ([], "texto", 3, None):
+        assert invalid_request(value)["ok"] is False
+
+
+def test_worker_handle_errors():
+    """Métodos desconhecidos e requisições que não são objetos viram respostas de erro"""
+    handler = Worker()
+    assert handler.handle({"id": 7, "method": "ping"})["ok"]
+    unknown = handler.handle({"id": 8, "method": "desconhecido"})
+    assert unknown == {"id": 8, "ok": False, "error": "Método desconhecido: desconhecido"}
+    assert handler.handle([])["ok"] is False
+    assert handler.handle({"id": 9, "method": "cancel"})["result"] == {"cancelled": False}
+
+
+class BlockingWorker:
+    """Worker falso que só responde quando é cancelado"""
+
+    def __init__(self):
+        self.index = 0
+        self.restarts = 0
+        self.started = threading.Event()
+        self.killed = threading.Event()
+
+    def is_alive(self):
+        return not self.killed.is_set()
+
+    def call(self, request, timeout=None, on_event=None):
+        self.started.set()
+        if not self.killed.wait(timeout or 5):
+            return {"id": request["id"], "ok": True, "result": "pronto"}
+        raise RuntimeError("Worker 0 não respondeu")
+
+    def cancel(self):
+        self.killed.set()
+
+    def restart(self):
+        self.restarts += 1
+        self.killed.clear()
+
+
+def test_supervisor_cancel():
+    """cancel encerra o worker que executa a requisição, e ele é reiniciado"""
+    supervisor = WorkerSupervisor(workers=1)
+    fake = BlockingWorker()
+    supervisor.workers.append(fake)
+    supervisor.idle.put(fake)
+
+    responses = []
+    thread = threading.Thread(
+        target=lambda: responses.append(supervisor.dispatch({"id": 1, "method": "process_message"}))
+    )
+    thread.start()
+    assert fake.started.wait(5)
+
+    cancelled = supervisor.dispatch({"id": None, "method": "cancel", "params": {"request_id": 1}})
+    assert cancelled["result"] == {"cancelled": True}
+    thread.join(5)
+    assert responses[0]["ok"] is False and responses[0]["id"] == 1
+    assert fake.restarts == 1
+    assert not supervisor._inflight
+
+    again = supervisor.dispatch({"id": None, "method": "cancel", "params": {"request_id": 1}})
+    assert again["result"] == {"cancelled": False}
+    assert supervisor.dispatch([])["ok"] is False
+
+
+def test_single_reader_thread_per_worker():
+    """As respostas de um worker são lidas sempre pela mesma thread"""
+    process = WorkerProcess(0).start()
+    try:
+        before = threading.active_count()
+        for index in range(30):
+            response = process.call({"id": index, "method": "ping"}, timeout=30)
+            assert response["ok"] and response["id"] == index
+        assert threading.active_count() == before
+        readers = [t for t in threading.enumerate() if t.name == "tarefo-worker-0-reader"]
+        assert len(readers) == 1
+    finally:
+        process.stop()
+
+
+def test_supervisor_session():
+    """Linhas inválidas recebem erro e o supervisor continua atendendo"""
+    python = subprocess.Popen(
+        [sys.executable, str(WORKER_SCRIPT), "--supervise", "--workers", "1"],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        text=True, encoding="utf-8", env={**os.environ, "TAREFO_CACHE": "off"},
+    )
+
+    def request(line):
+        python.stdin.write(line + "\n")
+        python.stdin.flush()
+        return json.loads(python.stdout.readline())
+
+    try:
+        ready = json.loads(python.stdout.readline())
+        assert ready["ok"] and ready["result"]["workers"] == 1
+
+        assert request("[]") == {"id": None, "ok": False, "error": "A requisição deve ser um objeto JSON"}
+        assert request("{inválido")["ok"] is False
+        assert request('{"id": 2, "method": "desconhecido"}') == {
+            "id": 2, "ok": False, "error": "Método desconhecido: desconhecido"
+        }
+        pong = request('{"id": 3, "method": "ping"}')
+        assert pong["id"] == 3 and pong["result"]["workers"][0]["alive"]
+        assert request('{"id": 4, "method": "shutdown"}')["ok"]
+        assert python.wait(timeout=30) == 0
+    finally:
+        if python.poll() is None:
+            python.kill()
+
+
+if __name__ == "__main__":
+    # Processo próprio: desligar o cache aqui não afeta outros testes
+    os.environ["TAREFO_CACHE"] = "off"
+    failures = 0
+    for test in (test_frames, test_worker_handle_errors, test_supervisor_cancel,
+                 test_single_reader_thread_per_worker, test_supervisor_session):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+    sys.exit(1 if failures else 0)
@@ -2,11 +2,33 @@
 Ferramentas para os agentes do TarefoAI
 """
 
-# Importa as ferramentas para facilitar o acesso
-from .ocr_tool import ocr_tool, process_image
-from .telegram_tool import telegram_tool, telegram_action
-from .whatsapp_tool import whatsapp_tool, whatsapp_action
-from .compliance_checker_tool import compliance_checker, check_compliance
+import importlib
+
+# As ferramentas são importadas apenas quando acessadas, para que usar uma
+# ferramenta isolada (ex.: tools.ocr_tool) não carregue as demais
+_LAZY_EXPORTS = {
+    'ocr_tool': '.ocr_tool',
+    'process_image': '.ocr_tool',
+    'telegram_tool': '.telegram_tool',
+    'telegram_action': '.telegram_tool',
+    'whatsapp_tool': '.whatsapp_tool',
+    'whatsapp_action': '.whatsapp_tool',
+    'compliance_checker': '.compliance_checker_tool',
+    'check_compliance': '.compliance_checker_tool',
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_EXPORTS))
 
 # Exporta as ferramentas principais
 __all__ = [
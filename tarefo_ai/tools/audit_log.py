@@ -0,0 +1,224 @@
+"""
+Registro de auditoria das verificações de conformidade
+
+Mantém as últimas verificações em um buffer circular de tamanho fixo na memória
+(ler as k mais recentes custa O(k), sem ordenação, já que as entradas chegam em
+ordem de tempo) e grava todas em um arquivo JSONL só de acréscimo, que sobrevive
+ao reinício dos workers.
+
+Cada entrada é gravada com uma única chamada `write` em um arquivo aberto com
+O_APPEND, então vários processos podem compartilhar o arquivo sem misturar
+linhas. O `fsync` é agrupado: no máximo uma vez a cada TAREFO_AUDIT_FSYNC_INTERVAL
+segundos, além de ao fechar o registro e na saída do processo. O arquivo é
+rotacionado (`audit.jsonl.AAAAMMDD-HHMMSS-ffffff`) ao passar do tamanho máximo ou da
+idade máxima, mantendo as TAREFO_AUDIT_BACKUPS cópias mais recentes.
+
+Variáveis de ambiente:
+    TAREFO_AUDIT_LOG=off            mantém só o buffer em memória
+    TAREFO_AUDIT_LOG_PATH           arquivo JSONL (padrão: DATA_DIR/audit.jsonl)
+    TAREFO_AUDIT_MAX_ENTRIES        entradas mantidas em memória (padrão: 1000)
+    TAREFO_AUDIT_MAX_BYTES          tamanho para rotacionar (padrão: 10 MB)
+    TAREFO_AUDIT_ROTATE_SECONDS     idade para rotacionar (padrão: 86400)
+    TAREFO_AUDIT_FSYNC_INTERVAL     intervalo entre fsyncs em segundos (padrão: 1)
+    TAREFO_AUDIT_BACKUPS            arquivos rotacionados mantidos (padrão: 5)
+"""
+import os
+import json
+import time
+import atexit
+import threading
+from collections import deque
+from datetime import datetime
+from itertools import islice
+
+from config.config import DATA_DIR, ensure_private_dir
+
+# Arquivo padrão, no diretório privado de dados (0700), como os demais registros locais
+DEFAULT_AUDIT_LOG_PATH = DATA_DIR / "audit.jsonl"
+
+
+def default_audit_log_path():
+    return os.fspath(DEFAULT_AUDIT_LOG_PATH)
+
+
+def audit_log_enabled():
+    return os.environ.get("TAREFO_AUDIT_LOG", "on").lower() != "off"
+
+
+class AuditLog:
+    """Buffer circular de verificações com arquivo JSONL persistente"""
+
+    def __init__(self, path=None, max_entries=None, max_bytes=None, rotate_seconds=None,
+                 fsync_interval=None, backups=None):
+        """
+        Args:
+            path: Arquivo JSONL; None usa TAREFO_AUDIT_LOG_PATH, False desativa o arquivo
+            max_entries: Entradas mantidas em memória
+            max_bytes: Tamanho do arquivo que dispara a rotação
+            rotate_seconds: Idade do arquivo que dispara a rotação
+            fsync_interval: Intervalo mínimo entre fsyncs em segundos
+            backups: Número de arquivos rotacionados mantidos
+        """
+        if path is None and audit_log_enabled():
+            path = os.environ.get("TAREFO_AUDIT_LOG_PATH") or True
+        # True: caminho padrão, resolvido na primeira gravação
+        self.path = os.fspath(path) if path and path is not True else None
+        self._default_path = path is True
+        self.max_entries = max_entries or int(os.environ.get("TAREFO_AUDIT_MAX_ENTRIES", "1000"))
+        self.max_bytes = max_bytes or int(os.environ.get("TAREFO_AUDIT_MAX_BYTES", str(10 * 1024 * 1024)))
+        self.rotate_seconds = rotate_seconds or float(os.environ.get("TAREFO_AUDIT_ROTATE_SECONDS", "86400"))
+        self.fsync_interval = (
+            fsync_interval if fsync_interval is not None
+            else float(os.environ.get("TAREFO_AUDIT_FSYNC_INTERVAL", "1"))
+        )
+        self.backups = backups if backups is not None else int(os.environ.get("TAREFO_AUDIT_BACKUPS", "5"))
+
+        self._entries = deque(maxlen=self.max_entries)
+        self._lock = threading.Lock()
+        self._fd = None
+        self._size = 0
+        self._started_at = 0.0
+        self._last_fsync = 0.0
+        self._pending = 0
+        self._atexit_registered = False
+
+    def __len__(self):
+        return len(self._entries)
+
+    def append(self, entry):
+        """
+        Registra uma entrada na memória e no arquivo
+
+        Args:
+            entry: Dicionário serializável em JSON
+        """
+        line = (json.dumps(entry, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+        with self._lock:
+            self._entries.append(entry)
+            if self.path is None:
+                if not self._default_path:
+                    return
+                self.path = default_audit_log_path()
+            try:
+                self._write(line)
+            except OSError as e:
+                print(f"⚠️ Falha ao gravar o registro de auditoria em {self.path}: {e}")
+
+    def recent(self, limit=10):
+        """
+        Entradas mais recentes, da mais nova para a mais antiga
+
+        Args:
+            limit: Número máximo de entradas
+
+        Returns:
+            list: Até `limit` entradas
+        """
+        with self._lock:
+            return list(islice(reversed(self._entries), max(0, limit)))
+
+    def flush(self):
+        """Força o fsync das entradas ainda não sincronizadas"""
+        with self._lock:
+            self._sync()
+
+    def close(self):
+        """Sincroniza e fecha o arquivo (reaberto no próximo append)"""
+        with self._lock:
+            self._sync()
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if self.path == default_audit_log_path():
+            ensure_private_dir(directory)
+        elif directory:
+            os.makedirs(directory, exist_ok=True)
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        self._size = os.fstat(self._fd).st_size
+        self._started_at = self._first_timestamp() or time.time()
+        self._last_fsync = time.monotonic()
+        if not self._atexit_registered:
+            atexit.register(self.close)
+            self._atexit_registered = True
+
+    def _first_timestamp(self):
+        """Momento da primeira entrada do arquivo, para a rotação por idade"""
+        if not self._size:
+            return None
+        try:
+            with open(self.path, "rb") as f:
+                first = json.loads(f.readline())
+            return datetime.fromisoformat(first["timestamp"]).timestamp()
+        except (OSError, ValueError, KeyError, TypeError):
+            return os.stat(self.path).st_mtime
+
+    def _write(self, line):
+        if self._fd is None:
+            self._open()
+        if self._size and (self._size + len(line) > self.max_bytes
+                           or time.time() - self._started_at >= self.rotate_seconds):
+            self._rotate()
+        if not self._size:
+            self._started_at = time.time()
+        os.write(self._fd, line)
+        self._size += len(line)
+        self._pending += 1
+        if time.monotonic() - self._last_fsync >= self.fsync_interval:
+            self._sync()
+
+    def _sync(self):
+        if self._fd is None or not self._pending:
+            return
+        os.fsync(self._fd)
+        self._pending = 0
+        self._last_fsync = time.monotonic()
+        # Outro processo pode ter rotacionado o arquivo: passa a gravar no novo
+        try:
+            if os.stat(self.path).st_ino != os.fstat(self._fd).st_ino:
+                self._reopen()
+        except FileNotFoundError:
+            self._reopen()
+
+    def _reopen(self):
+        os.close(self._fd)
+        self._fd = None
+        self._open()
+
+    def _rotate(self):
+        """Renomeia o arquivo atual com a data e descarta as cópias mais antigas"""
+        self._sync()
+        os.close(self._fd)
+        self._fd = None
+        suffix = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        try:
+            os.replace(self.path, f"{self.path}.{suffix}")
+        except FileNotFoundError:
+            pass
+        directory, name = os.path.split(self.path)
+        directory = directory or "."
+        rotated = sorted(entry for entry in os.listdir(directory) if entry.startswith(f"{name}."))
+        for old in rotated[:max(0, len(rotated) - self.backups)]:
+            try:
+                os.remove(os.path.join(directory, old))
+            except OSError:
+                pass
+        self._open()
+
+
+_audit_log = None
+_audit_log_lock = threading.Lock()
+
+
+def get_audit_log():
+    """Registro de auditoria compartilhado pelo processo"""
+    global _audit_log
+    with _audit_log_lock:
+        if _audit_log is None:
+            _audit_log = AuditLog()
+        return _audit_log
+
+
+__all__ = ['AuditLog', 'get_audit_log', 'audit_log_enabled', 'default_audit_log_path']
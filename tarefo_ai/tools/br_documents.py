@@ -0,0 +1,41 @@
+"""
+Dígitos verificadores de documentos brasileiros
+
+Validação de CPF e CNPJ usada pela extração de recibos e notas fiscais
+(tools/receipt_parser.py, tools/invoice_parser.py) e pela detecção de dados
+pessoais (tools/pii_detector.py). Recebe só os dígitos, sem pontuação.
+"""
+
+
+def cpf_is_valid(digits):
+    """Valida os dígitos verificadores de um CPF (11 dígitos)"""
+    if len(digits) != 11 or not digits.isdigit() or digits == digits[0] * 11:
+        return False
+    numbers = [int(d) for d in digits]
+    for position in (9, 10):
+        total = sum(n * w for n, w in zip(numbers, range(position + 1, 1, -1)))
+        check = total * 10 % 11 % 10
+        if numbers[position] != check:
+            return False
+    return True
+
+
+def cnpj_is_valid(digits):
+    """Valida os dígitos verificadores de um CNPJ (14 dígitos)"""
+    if len(digits) != 14 or not digits.isdigit() or digits == digits[0] * 14:
+        return False
+    numbers = [int(d) for d in digits]
+    for position in (12, 13):
+        weights = list(range(position - 7, 1, -1)) + list(range(9, 1, -1))
+        remainder = sum(n * w for n, w in zip(numbers, weights)) % 11
+        check = 0 if remainder < 2 else 11 - remainder
+        if numbers[position] != check:
+            return False
+    return True
+
+
+def format_cnpj(digits):
+    return f"{digits[:2]}.{digits[2:5]}.{digits[5:8]}/{digits[8:12]}-{digits[12:]}"
+
+
+__all__ = ['cpf_is_valid', 'cnpj_is_valid', 'format_cnpj']
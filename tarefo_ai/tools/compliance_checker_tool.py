@@ -6,6 +6,12 @@ import json
 import logging
 from datetime import datetime
 
+from metrics import timed_tool
+from .sensitive_scanner import format_path, MAX_REPORTED_PATHS
+from .pii_detector import scan_strings
+from .audit_log import get_audit_log
+from .compliance_policy import get_policy_store
+
 # Configuração de logging
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -13,6 +19,11 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def pii_scan_enabled():
+    """Busca de dados pessoais nos valores (TAREFO_PII_SCAN=off desativa)"""
+    return os.environ.get("TAREFO_PII_SCAN", "on").lower() != "off"
+
+
 class ComplianceCheckerTool:
     """Ferramenta para verificação de conformidade com LGPD/GDPR"""
     
@@ -21,44 +32,72 @@ class ComplianceCheckerTool:
         self.name = "Compliance Checker Tool"
         self.description = "Verificação de conformidade com regulamentos de privacidade como LGPD e GDPR"
         
-        # Registros de verificações
-        self.check_history = []
-        
-        # Regras de verificação
-        self.rules = {
-            "store": [
-                "consent_obtained",
-                "necessary_data_only",
-                "secure_storage",
-                "data_retention_policy"
-            ],
-            "process": [
-                "consent_obtained",
-                "legitimate_purpose",
-                "necessary_data_only",
-                "data_minimization",
-                "access_controls"
-            ],
-            "share": [
-                "consent_obtained",
-                "explicit_consent_for_sharing",
-                "legitimate_purpose",
-                "recipient_compliance",
-                "data_transfer_agreement"
-            ],
-            "delete": [
-                "identity_verified",
-                "complete_erasure",
-                "third_party_notification"
-            ]
-        }
+        # Registros de verificações (buffer circular + arquivo JSONL)
+        self.audit_log = get_audit_log()
         
-        # Verificações sensíveis por tipo de dado
-        self.sensitive_data_types = [
-            "cpf", "rg", "id", "passport", "credit_card", "health", "religion", 
-            "political", "sexual_orientation", "biometric", "genetic", "location"
-        ]
+        # Regras, tipos sensíveis e textos vêm da política compilada
+        # (config/compliance_policy.json), recarregada quando o arquivo muda
+        self.policy_store = get_policy_store()
+
+    @property
+    def policy(self):
+        """Política de conformidade atual"""
+        return self.policy_store.get()
+
+    @property
+    def rules(self):
+        """Regras exigidas por operação"""
+        return self.policy.operations
+
+    @property
+    def sensitive_data_types(self):
+        """Tipos de dados sensíveis da política"""
+        return list(self.policy.sensitive_types)
+
+    @property
+    def sensitive_scanner(self):
+        return self.policy.scanner
     
+    def find_sensitive_data(self, data, personal_data=None, policy=None):
+        """
+        Localiza os campos sensíveis do payload
+
+        Os nomes dos campos são comparados por tokens (`user_id` contém `id`,
+        `video` não), em uma única passada pela estrutura. Os valores de texto
+        passam pelo pii_detector: um CPF ou cartão em qualquer campo também conta
+        como dado sensível.
+
+        Args:
+            data: Dicionário com os dados a serem verificados
+            personal_data: Lista opcional que recebe cada dado pessoal encontrado
+                nos valores ({"path", "type", "value" mascarado})
+            policy: Política já obtida pela verificação (padrão: a atual)
+
+        Returns:
+            tuple: (lista_de_tipos_sensíveis, lista de {"path", "type"})
+        """
+        if not data or not isinstance(data, dict):
+            return [], []
+        policy = policy or self.policy
+        if not pii_scan_enabled():
+            return policy.scanner.scan(data)
+
+        strings = []
+        sensitive_types, sensitive_paths = policy.scanner.scan(data, strings=strings)
+        found = set(sensitive_types)
+        for index, hit in scan_strings([value for _, _, value in strings]):
+            path = strings[index][:2]
+            if personal_data is not None and len(personal_data) < MAX_REPORTED_PATHS:
+                personal_data.append({"path": format_path(path), "type": hit["type"], "value": hit["value"]})
+            if hit["type"] in policy.sensitive_set:
+                found.add(hit["type"])
+                if len(sensitive_paths) < MAX_REPORTED_PATHS:
+                    sensitive_paths.append({"path": format_path(path), "type": hit["type"]})
+        if len(found) > len(sensitive_types):
+            sensitive_types = [data_type for data_type in policy.sensitive_types if data_type in found]
+            sensitive_paths.sort(key=lambda hit: hit["path"])
+        return sensitive_types, sensitive_paths
+
     def is_sensitive_data_present(self, data):
         """
         Verifica se há dados sensíveis presentes na requisição
@@ -69,27 +108,18 @@ class ComplianceCheckerTool:
         Returns:
             tuple: (há_dados_sensíveis, lista_de_tipos_sensíveis)
         """
-        if not data or not isinstance(data, dict):
-            return False, []
-        
-        sensitive_types_found = []
-        
-        # Converter o dicionário para string para facilitar a procura
-        data_str = json.dumps(data, ensure_ascii=False).lower()
-        
-        for data_type in self.sensitive_data_types:
-            if data_type in data_str:
-                sensitive_types_found.append(data_type)
-        
+        sensitive_types_found, _ = self.find_sensitive_data(data)
         return bool(sensitive_types_found), sensitive_types_found
     
-    def check_operation_compliance(self, operation, data):
+    def check_operation_compliance(self, operation, data, audit=True):
         """
         Verifica a conformidade de uma operação com as regras de privacidade
         
         Args:
             operation: Tipo de operação (store, process, share, delete)
             data: Dicionário com os dados e configurações da operação
+            audit: Se False, não grava a verificação no registro de auditoria
+                (o lote grava um resumo no fim)
             
         Returns:
             dict: Resultado da verificação de conformidade
@@ -102,67 +132,46 @@ class ComplianceCheckerTool:
                 "checks": [],
                 "sensitive_data": False,
                 "sensitive_types": [],
+                "sensitive_paths": [],
+                "personal_data": [],
                 "recommendations": []
             }
             
+            # Uma única versão da política vale para toda a verificação
+            policy = self.policy
+
             # Verifica se a operação é suportada
-            if operation not in self.rules:
-                result["reason"] = f"Operação desconhecida: {operation}"
-                result["recommendations"].append("Use uma das operações suportadas: store, process, share, delete")
+            if operation not in policy.operations:
+                result["reason"] = policy.unknown_reason(operation)
+                result["recommendations"].append(policy.unknown_recommendation)
                 return result
             
             # Verifica dados sensíveis
-            is_sensitive, sensitive_types = self.is_sensitive_data_present(data)
+            sensitive_types, sensitive_paths = self.find_sensitive_data(data, result["personal_data"], policy)
+            is_sensitive = bool(sensitive_types)
             result["sensitive_data"] = is_sensitive
             result["sensitive_types"] = sensitive_types
+            result["sensitive_paths"] = sensitive_paths
             
-            # Obtém as regras aplicáveis
-            required_checks = self.rules[operation]
-            
-            # Inicializa verificações
-            all_passed = True
-            for check in required_checks:
-                check_result = {
-                    "rule": check,
-                    "passed": check in data and data[check] == True,
-                    "description": self.get_rule_description(check)
-                }
-                
-                result["checks"].append(check_result)
-                
-                if not check_result["passed"]:
-                    all_passed = False
-                    result["recommendations"].append(self.get_recommendation(check))
-            
-            # Verificações adicionais para dados sensíveis
-            if is_sensitive:
-                sensitive_check = {
-                    "rule": "sensitive_data_handling",
-                    "passed": "sensitive_data_handling" in data and data["sensitive_data_handling"] == True,
-                    "description": "Dados sensíveis requerem tratamento especial conforme LGPD/GDPR"
-                }
-                
-                result["checks"].append(sensitive_check)
-                
-                if not sensitive_check["passed"]:
-                    all_passed = False
-                    result["recommendations"].append(
-                        "Implemente tratamento especial para dados sensíveis, "
-                        "incluindo consentimento explícito e medidas de segurança reforçadas"
-                    )
+            # Veredito memoizado pela combinação de regras atendidas
+            verdict = policy.evaluate(operation, data, is_sensitive)
+            result["checks"] = [dict(check) for check in verdict.checks]
+            result["recommendations"] = list(verdict.recommendations)
             
             # Define o resultado final
-            result["compliant"] = all_passed
-            if not all_passed:
+            result["compliant"] = verdict.compliant
+            if not verdict.compliant:
                 result["reason"] = "Nem todas as verificações de conformidade foram aprovadas"
             
             # Registra a verificação
-            self.check_history.append({
-                "operation": operation,
-                "timestamp": result["timestamp"],
-                "compliant": result["compliant"],
-                "sensitive_data": result["sensitive_data"]
-            })
+            if audit:
+                self.audit_log.append({
+                    "operation": operation,
+                    "timestamp": result["timestamp"],
+                    "compliant": result["compliant"],
+                    "sensitive_data": result["sensitive_data"],
+                    "sensitive_types": result["sensitive_types"]
+                })
             
             return result
             
@@ -177,44 +186,11 @@ class ComplianceCheckerTool:
     
     def get_rule_description(self, rule):
         """Retorna uma descrição para a regra especificada"""
-        descriptions = {
-            "consent_obtained": "Consentimento explícito do usuário para o tratamento dos dados",
-            "necessary_data_only": "Apenas dados necessários para a finalidade declarada",
-            "secure_storage": "Armazenamento seguro com criptografia e controles de acesso",
-            "data_retention_policy": "Política de retenção de dados definida e aplicada",
-            "legitimate_purpose": "Finalidade legítima e declarada para o processamento",
-            "data_minimization": "Minimização de dados, processando apenas o necessário",
-            "access_controls": "Controles de acesso implementados e auditados",
-            "explicit_consent_for_sharing": "Consentimento específico para compartilhamento",
-            "recipient_compliance": "Destinatário em conformidade com LGPD/GDPR",
-            "data_transfer_agreement": "Acordo de transferência de dados em vigor",
-            "identity_verified": "Identidade do titular dos dados verificada",
-            "complete_erasure": "Exclusão completa dos dados de todos os sistemas",
-            "third_party_notification": "Notificação aos terceiros sobre a exclusão",
-            "sensitive_data_handling": "Tratamento especial para dados sensíveis conforme regulamentos"
-        }
-        
-        return descriptions.get(rule, f"Regra: {rule}")
+        return self.policy.describe(rule)
     
     def get_recommendation(self, rule):
         """Retorna uma recomendação para a regra que falhou"""
-        recommendations = {
-            "consent_obtained": "Implemente um mecanismo de consentimento explícito antes do tratamento dos dados",
-            "necessary_data_only": "Revise os dados coletados para garantir que apenas os necessários sejam solicitados",
-            "secure_storage": "Implemente criptografia e controles de acesso adequados para armazenamento",
-            "data_retention_policy": "Estabeleça uma política clara de retenção de dados e mecanismos de exclusão",
-            "legitimate_purpose": "Documente e comunique claramente o propósito do processamento de dados",
-            "data_minimization": "Processe apenas os dados necessários para atingir o objetivo declarado",
-            "access_controls": "Implemente controles de acesso baseados em papéis e registre todos os acessos",
-            "explicit_consent_for_sharing": "Obtenha consentimento específico para compartilhamento antes de transferir dados",
-            "recipient_compliance": "Verifique se o destinatário está em conformidade com LGPD/GDPR",
-            "data_transfer_agreement": "Estabeleça um acordo formal de transferência de dados",
-            "identity_verified": "Implemente um processo robusto de verificação de identidade",
-            "complete_erasure": "Garanta que a exclusão seja completa em todos os sistemas e backups",
-            "third_party_notification": "Notifique todos os terceiros que receberam os dados sobre a exclusão"
-        }
-        
-        return recommendations.get(rule, f"Implemente a regra: {rule}")
+        return self.policy.recommend(rule)
     
     def get_audit_log(self, limit=10):
         """
@@ -224,15 +200,11 @@ class ComplianceCheckerTool:
             limit: Número máximo de registros a retornar
             
         Returns:
-            list: Lista de verificações recentes
+            list: Lista de verificações recentes, da mais nova para a mais antiga
         """
-        return sorted(
-            self.check_history,
-            key=lambda x: x["timestamp"],
-            reverse=True
-        )[:limit]
+        return self.audit_log.recent(limit)
     
-    def run(self, operation, data, return_recommendations=True):
+    def run(self, operation, data, return_recommendations=True, audit=True):
         """
         Método principal para execução da ferramenta
         
@@ -240,13 +212,14 @@ class ComplianceCheckerTool:
             operation: Tipo de operação (store, process, share, delete)
             data: Dicionário com os dados e configurações da operação
             return_recommendations: Se True, inclui recomendações no resultado
+            audit: Se False, não grava a verificação no registro de auditoria
             
         Returns:
             dict: Resultado da verificação
         """
         try:
             # Executa a verificação
-            result = self.check_operation_compliance(operation, data)
+            result = self.check_operation_compliance(operation, data, audit)
             
             # Remove recomendações se não solicitadas
             if not return_recommendations:
@@ -266,6 +239,7 @@ class ComplianceCheckerTool:
 compliance_checker = ComplianceCheckerTool()
 
 # Função auxiliar para interface com o CrewAI
+@timed_tool("compliance", action_arg=True)
 def check_compliance(operation, data, return_recommendations=True):
     """
     Verifica a conformidade de uma operação
@@ -281,6 +255,186 @@ def check_compliance(operation, data, return_recommendations=True):
     result = compliance_checker.run(operation, data, return_recommendations)
     return json.dumps(result)
 
+def _iter_batch_records(records):
+    """Itera os registros do lote: um iterável ou o caminho de um arquivo JSONL"""
+    if isinstance(records, (str, bytes, os.PathLike)):
+        # As linhas são lidas sob demanda e decodificadas nos processos do pool
+        with open(records, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield line
+    else:
+        yield from records
+
+
+def _check_batch_chunk(start, records, operation, return_recommendations):
+    """
+    Verifica um bloco de registros (executado nos processos do pool)
+
+    Returns:
+        tuple: (resultados por registro, resumo parcial do bloco)
+    """
+    outcomes = []
+    summary = _new_batch_summary()
+    for offset, record in enumerate(records):
+        index = start + offset
+        try:
+            if isinstance(record, str):
+                record = json.loads(record)
+            if not isinstance(record, dict):
+                raise ValueError("O registro deve ser um objeto JSON")
+            if "data" in record and isinstance(record["data"], dict):
+                record_operation, data = record.get("operation", operation), record["data"]
+            else:
+                record_operation, data = operation, record
+            if not record_operation:
+                raise ValueError("Operação não informada no registro nem no lote")
+            result = compliance_checker.run(record_operation, data, return_recommendations, audit=False)
+        except Exception as e:
+            outcomes.append({"index": index, "ok": False, "error": str(e)})
+            summary["records"] += 1
+            summary["errors"] += 1
+            continue
+        outcomes.append({"index": index, "ok": True, "result": result})
+        _add_to_batch_summary(summary, record_operation, result)
+    return outcomes, summary
+
+
+def _new_batch_summary():
+    return {
+        "records": 0, "compliant": 0, "non_compliant": 0, "errors": 0, "sensitive_records": 0,
+        "operations": {}, "failed_rules": {}, "sensitive_types": {}, "personal_data": {},
+    }
+
+
+def _count(counter, key, amount=1):
+    counter[key] = counter.get(key, 0) + amount
+
+
+def _add_to_batch_summary(summary, operation, result):
+    summary["records"] += 1
+    _count(summary["operations"], operation)
+    if "error" in result:
+        summary["errors"] += 1
+        return
+    summary["compliant" if result.get("compliant") else "non_compliant"] += 1
+    if result.get("sensitive_data"):
+        summary["sensitive_records"] += 1
+    for check in result.get("checks", []):
+        if not check["passed"]:
+            _count(summary["failed_rules"], check["rule"])
+    for data_type in result.get("sensitive_types", []):
+        _count(summary["sensitive_types"], data_type)
+    for data_type in {item["type"] for item in result.get("personal_data", [])}:
+        _count(summary["personal_data"], data_type)
+
+
+def _merge_batch_summary(total, partial):
+    for key, value in partial.items():
+        if isinstance(value, dict):
+            for name, amount in value.items():
+                _count(total[key], name, amount)
+        else:
+            total[key] += value
+
+
+def check_compliance_batch(records, operation=None, chunk_size=None, max_workers=None,
+                           return_recommendations=False, ordered=False):
+    """
+    Verifica a conformidade de muitos registros (exportações inteiras para auditorias)
+
+    Os registros são lidos sob demanda, divididos em blocos e verificados em um pool
+    de processos, com no máximo dois blocos por processo em andamento ou, com
+    ordered=True, concluídos à espera dos anteriores: a memória não cresce com o
+    tamanho da entrada.
+
+    Args:
+        records: Iterável de registros ou caminho de um arquivo JSONL. Cada registro
+            é {"operation", "data"} ou só o dict de dados (usa `operation`)
+        operation: Operação padrão dos registros sem "operation"
+        chunk_size: Registros por bloco (padrão: TAREFO_COMPLIANCE_BATCH_CHUNK ou 500)
+        max_workers: Processos do pool (padrão: TAREFO_COMPLIANCE_BATCH_WORKERS ou o
+            número de núcleos); com 1, os blocos são verificados no próprio processo
+        return_recommendations: Se True, inclui recomendações em cada resultado
+        ordered: True para devolver na ordem de entrada; False, na ordem de conclusão
+
+    Yields:
+        dict: {"index", "ok", "result"} ou {"index", "ok", "error"} por registro e,
+            por fim, {"summary": {...}} com os totais, as contagens por regra
+            reprovada (failed_rules), por tipo sensível (sensitive_types) e por dado
+            pessoal encontrado nos valores (personal_data)
+    """
+    from itertools import islice
+    from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+    chunk_size = chunk_size or int(os.environ.get("TAREFO_COMPLIANCE_BATCH_CHUNK", "500"))
+    max_workers = max_workers or int(
+        os.environ.get("TAREFO_COMPLIANCE_BATCH_WORKERS", str(os.cpu_count() or 1))
+    )
+    items = _iter_batch_records(records)
+    summary = _new_batch_summary()
+
+    def chunks():
+        start = 0
+        while True:
+            chunk = list(islice(items, chunk_size))
+            if not chunk:
+                return
+            yield start, chunk
+            start += len(chunk)
+
+    def collect(outcomes, partial):
+        _merge_batch_summary(summary, partial)
+        return outcomes
+
+    if max_workers <= 1:
+        for start, chunk in chunks():
+            yield from collect(*_check_batch_chunk(start, chunk, operation, return_recommendations))
+    else:
+        window = max_workers * 2
+        pending = {}
+        buffered = {}
+        next_start = 0
+        source = chunks()
+        exhausted = False
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            while True:
+                # Blocos concluídos à espera dos anteriores também ocupam a janela
+                while not exhausted and len(pending) + len(buffered) < window:
+                    try:
+                        start, chunk = next(source)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    future = pool.submit(_check_batch_chunk, start, chunk, operation, return_recommendations)
+                    pending[future] = start
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in sorted(done, key=pending.get):
+                    start = pending.pop(future)
+                    outcomes = collect(*future.result())
+                    if not ordered:
+                        yield from outcomes
+                    else:
+                        buffered[start] = outcomes
+                while next_start in buffered:
+                    outcomes = buffered.pop(next_start)
+                    next_start += len(outcomes)
+                    yield from outcomes
+
+    compliance_checker.audit_log.append({
+        "operation": "batch",
+        "timestamp": datetime.now().isoformat(),
+        "compliant": summary["records"] > 0 and summary["compliant"] == summary["records"],
+        "sensitive_data": summary["sensitive_records"] > 0,
+        "sensitive_types": sorted(summary["sensitive_types"]),
+        "records": summary["records"],
+        "errors": summary["errors"],
+    })
+    yield {"summary": summary}
+
 # Teste simples se executado diretamente
 if __name__ == "__main__":
     # Exemplo de verificação para armazenamento de dados
@@ -0,0 +1,253 @@
+"""
+Política de conformidade compilada
+
+As regras de cada operação, os tipos de dados sensíveis, as descrições e as
+recomendações ficam em um único arquivo (config/compliance_policy.json, ou YAML),
+lido uma vez e compilado em uma estrutura imutável. O veredito de cada combinação
+de operação + regras atendidas + dados sensíveis é montado uma única vez e
+reaproveitado: uma verificação custa algumas consultas a dicts.
+
+O arquivo é recarregado quando muda (mtime ou tamanho), conferido no máximo a cada
+TAREFO_COMPLIANCE_POLICY_CHECK_INTERVAL segundos. Uma política inválida é
+rejeitada e a anterior continua valendo.
+
+Variáveis de ambiente:
+    TAREFO_COMPLIANCE_POLICY                  arquivo da política, JSON ou YAML
+                                              (padrão: config/compliance_policy.json)
+    TAREFO_COMPLIANCE_POLICY_CHECK_INTERVAL   segundos entre verificações do arquivo
+                                              (padrão: 1)
+"""
+import os
+import json
+import time
+import threading
+from collections import namedtuple
+from types import MappingProxyType
+
+from .sensitive_scanner import SensitiveScanner
+
+DEFAULT_POLICY_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "compliance_policy.json"
+)
+
+# Vereditos guardados por política; acima disso o memo é esvaziado
+MAX_VERDICTS = 4096
+
+# Resultado memoizado de uma combinação (operação, regras atendidas, dados sensíveis)
+Verdict = namedtuple("Verdict", "compliant checks recommendations")
+
+
+class PolicyError(ValueError):
+    """Arquivo de política ausente ou inválido"""
+
+
+def policy_path():
+    return os.environ.get("TAREFO_COMPLIANCE_POLICY") or DEFAULT_POLICY_PATH
+
+
+def load_policy_file(path):
+    """
+    Lê o arquivo de política (JSON ou, pela extensão, YAML)
+
+    Returns:
+        dict: Conteúdo do arquivo
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            if path.endswith((".yaml", ".yml")):
+                # O YAML só é importado para políticas em YAML
+                import yaml
+
+                return yaml.safe_load(f)
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        raise PolicyError(f"Não foi possível ler a política de conformidade {path}: {e}") from e
+
+
+class CompiledPolicy:
+    """Política validada, com tabelas imutáveis e vereditos memoizados"""
+
+    def __init__(self, raw, source=None):
+        if not isinstance(raw, dict):
+            raise PolicyError("A política deve ser um objeto")
+        operations = raw.get("operations")
+        if not isinstance(operations, dict) or not operations:
+            raise PolicyError("A política deve definir as regras de cada operação em 'operations'")
+        rules = raw.get("rules") or {}
+        if not isinstance(rules, dict) or not all(isinstance(spec, dict) for spec in rules.values()):
+            raise PolicyError("'rules' deve mapear cada regra para {description, recommendation}")
+        for operation, operation_rules in operations.items():
+            if not isinstance(operation_rules, list) or not all(isinstance(rule, str) for rule in operation_rules):
+                raise PolicyError(f"As regras da operação '{operation}' devem ser uma lista de nomes")
+
+        self.source = source
+        self.version = raw.get("version")
+        self.operations = MappingProxyType({
+            operation: tuple(operation_rules) for operation, operation_rules in operations.items()
+        })
+        self.descriptions = MappingProxyType({
+            rule: spec["description"] for rule, spec in rules.items() if spec.get("description")
+        })
+        self.recommendations = MappingProxyType({
+            rule: spec["recommendation"] for rule, spec in rules.items() if spec.get("recommendation")
+        })
+        self.sensitive_types = tuple(raw.get("sensitive_types") or ())
+        self.sensitive_set = frozenset(self.sensitive_types)
+        self.scanner = SensitiveScanner(self.sensitive_types)
+
+        sensitive_rule = raw.get("sensitive_data_rule") or {}
+        self.sensitive_rule = sensitive_rule.get("rule", "sensitive_data_handling")
+        self.sensitive_description = sensitive_rule.get("description") or self.describe(self.sensitive_rule)
+
+        unknown = raw.get("unknown_operation") or {}
+        supported = ", ".join(self.operations)
+        self._unknown_reason = unknown.get("reason", "Operação desconhecida: {operation}")
+        self.unknown_recommendation = unknown.get(
+            "recommendation", "Use uma das operações suportadas: {operations}"
+        ).format(operations=supported)
+
+        self._verdicts = {}
+
+    def describe(self, rule):
+        """Descrição da regra"""
+        return self.descriptions.get(rule) or f"Regra: {rule}"
+
+    def recommend(self, rule):
+        """Recomendação para a regra que falhou"""
+        return self.recommendations.get(rule) or f"Implemente a regra: {rule}"
+
+    def unknown_reason(self, operation):
+        return self._unknown_reason.format(operation=operation)
+
+    def evaluate(self, operation, data, sensitive):
+        """
+        Veredito da operação para as flags de `data`
+
+        Apenas as flags que a operação exige (e a de dados sensíveis, quando há
+        dados sensíveis) entram na chave do memo; cada uma conta como atendida
+        quando vale True.
+
+        Args:
+            operation: Operação conhecida pela política
+            data: Dicionário com as flags da operação
+            sensitive: Se há dados sensíveis no payload
+
+        Returns:
+            Verdict: compliant, checks ({"rule", "passed", "description"}) e recommendations
+        """
+        mask = 0
+        if sensitive:
+            mask = 1 | (2 if data.get(self.sensitive_rule) == True else 0)
+        bit = 4
+        for rule in self.operations[operation]:
+            if data.get(rule) == True:
+                mask |= bit
+            bit <<= 1
+
+        key = (operation, mask)
+        verdict = self._verdicts.get(key)
+        if verdict is None:
+            verdict = self._build_verdict(operation, mask)
+            if len(self._verdicts) >= MAX_VERDICTS:
+                self._verdicts.clear()
+            self._verdicts[key] = verdict
+        return verdict
+
+    def _build_verdict(self, operation, mask):
+        checks = []
+        recommendations = []
+        bit = 4
+        for rule in self.operations[operation]:
+            passed = bool(mask & bit)
+            checks.append(MappingProxyType({"rule": rule, "passed": passed, "description": self.describe(rule)}))
+            if not passed:
+                recommendations.append(self.recommend(rule))
+            bit <<= 1
+        if mask & 1:
+            passed = bool(mask & 2)
+            checks.append(MappingProxyType({
+                "rule": self.sensitive_rule, "passed": passed, "description": self.sensitive_description
+            }))
+            if not passed:
+                recommendations.append(self.recommend(self.sensitive_rule))
+        compliant = all(check["passed"] for check in checks)
+        return Verdict(compliant, tuple(checks), tuple(recommendations))
+
+
+class PolicyStore:
+    """Mantém a política compilada e a recarrega quando o arquivo muda"""
+
+    def __init__(self, path=None, check_interval=None):
+        self.path = os.fspath(path) if path else policy_path()
+        self.check_interval = (
+            check_interval if check_interval is not None
+            else float(os.environ.get("TAREFO_COMPLIANCE_POLICY_CHECK_INTERVAL", "1"))
+        )
+        self.reloads = 0
+        self._lock = threading.Lock()
+        self._policy = None
+        self._stat = None
+        self._next_check = 0.0
+
+    def get(self):
+        """
+        Política atual; o arquivo só é conferido a cada check_interval segundos
+
+        Returns:
+            CompiledPolicy: Política compilada
+        """
+        policy = self._policy
+        if policy is not None and time.monotonic() < self._next_check:
+            return policy
+        with self._lock:
+            self._refresh()
+            return self._policy
+
+    def reload(self):
+        """Relê o arquivo imediatamente"""
+        with self._lock:
+            self._stat = None
+            self._refresh()
+            return self._policy
+
+    def _refresh(self):
+        self._next_check = time.monotonic() + self.check_interval
+        try:
+            st = os.stat(self.path)
+            stat = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            stat = None
+        if stat == self._stat and self._policy is not None:
+            return
+        try:
+            policy = CompiledPolicy(load_policy_file(self.path), source=self.path)
+        except PolicyError as e:
+            if self._policy is None:
+                raise
+            print(f"⚠️ {e}; mantendo a política anterior")
+            self._stat = stat
+            return
+        if self._policy is not None:
+            print(f"🔄 Política de conformidade alterada, recarregada de {self.path}")
+            self.reloads += 1
+        self._policy = policy
+        self._stat = stat
+
+
+_policy_store = None
+_policy_store_lock = threading.Lock()
+
+
+def get_policy_store():
+    """Política de conformidade compartilhada pelo processo"""
+    global _policy_store
+    with _policy_store_lock:
+        if _policy_store is None:
+            _policy_store = PolicyStore()
+        return _policy_store
+
+
+__all__ = [
+    'CompiledPolicy', 'PolicyStore', 'PolicyError', 'Verdict', 'get_policy_store', 'load_policy_file',
+    'policy_path', 'DEFAULT_POLICY_PATH'
+]
@@ -0,0 +1,154 @@
+"""
+Extração de dados de NF-e a partir do texto da DANFE
+
+Localiza a chave de acesso de 44 dígitos (com dígito verificador conferido),
+decodifica UF, ano/mês de emissão, CNPJ do emitente, modelo, série e número, e lê
+os totais do quadro "Cálculo do imposto". Na DANFE os rótulos costumam ficar em
+uma linha e os valores na linha seguinte, na mesma ordem; os dois formatos são
+aceitos.
+"""
+import re
+import unicodedata
+
+from .br_documents import cnpj_is_valid, format_cnpj
+from .receipt_parser import AMOUNT, find_date, parse_amount
+
+# 44 dígitos, em bloco único ou em grupos de 4 separados por espaço/ponto
+ACCESS_KEY_PATTERN = re.compile(r"(?<!\d)((?:\d{4}[ .]?){10}\d{4})(?!\d)")
+AMOUNT_PATTERN = re.compile(AMOUNT)
+ACCESS_KEY_LABEL_PATTERN = re.compile(r"CHAVE\s+DE\s+ACESSO", re.IGNORECASE)
+
+# Rótulos dos totais (texto sem acentos, em maiúsculas)
+TOTAL_LABELS = (
+    ("invoice_total", re.compile(r"V(?:ALOR|\.)\s*TOTAL\s+DA\s+NOTA")),
+    ("products_total", re.compile(r"V(?:ALOR|\.)\s*TOTAL\s+(?:DOS\s+)?PRODUTOS")),
+    ("icms_st_base", re.compile(r"BASE\s+DE\s+CALC(?:ULO|\.)?\s+(?:DO\s+)?ICMS\s+(?:S\.?T\.?|SUBST)")),
+    ("icms_base", re.compile(r"BASE\s+DE\s+CALC(?:ULO|\.)?\s+(?:DO\s+)?ICMS(?!\s+(?:S\.?T|SUBST))")),
+    ("icms_st", re.compile(r"V(?:ALOR|\.)\s*(?:DO\s+)?ICMS\s+(?:S\.?T\.?|SUBST)")),
+    ("icms", re.compile(r"V(?:ALOR|\.)\s*(?:DO\s+)?ICMS(?!\s+(?:S\.?T|SUBST))")),
+    ("freight", re.compile(r"V(?:ALOR|\.)\s*(?:DO\s+)?FRETE")),
+    ("insurance", re.compile(r"V(?:ALOR|\.)\s*(?:DO\s+)?SEGURO")),
+    ("discount", re.compile(r"DESCONTO")),
+    ("ipi", re.compile(r"V(?:ALOR|\.)\s*(?:DO\s+)?IPI")),
+)
+
+# Códigos IBGE das UFs usados na chave de acesso
+UF_CODES = {
+    "11": "RO", "12": "AC", "13": "AM", "14": "RR", "15": "PA", "16": "AP", "17": "TO",
+    "21": "MA", "22": "PI", "23": "CE", "24": "RN", "25": "PB", "26": "PE", "27": "AL",
+    "28": "SE", "29": "BA", "31": "MG", "32": "ES", "33": "RJ", "35": "SP", "41": "PR",
+    "42": "SC", "43": "RS", "50": "MS", "51": "MT", "52": "GO", "53": "DF",
+}
+
+MODELS = {"55": "NF-e", "65": "NFC-e"}
+
+
+def access_key_is_valid(key):
+    """Confere o dígito verificador (módulo 11) da chave de acesso"""
+    if len(key) != 44 or not key.isdigit():
+        return False
+    total = sum(int(digit) * (2 + index % 8) for index, digit in enumerate(reversed(key[:43])))
+    check = 11 - total % 11
+    return int(key[43]) == (0 if check >= 10 else check)
+
+
+def parse_access_key(key):
+    """
+    Decodifica os campos da chave de acesso
+
+    Returns:
+        dict: uf, issue_month (AAAA-MM), issuer_cnpj, model, series, number, emission_type
+    """
+    cnpj = key[6:20]
+    return {
+        "uf": UF_CODES.get(key[0:2], key[0:2]),
+        "issue_month": f"20{key[2:4]}-{key[4:6]}",
+        "issuer_cnpj": format_cnpj(cnpj) if cnpj_is_valid(cnpj) else cnpj,
+        "model": MODELS.get(key[20:22], key[20:22]),
+        "series": int(key[22:25]),
+        "number": int(key[25:34]),
+        "emission_type": int(key[34]),
+    }
+
+
+def find_access_key(text):
+    """Chave de acesso válida, preferindo a que vem depois do rótulo CHAVE DE ACESSO"""
+    label = ACCESS_KEY_LABEL_PATTERN.search(text)
+    candidates = list(ACCESS_KEY_PATTERN.finditer(text))
+    if label:
+        candidates.sort(key=lambda match: match.start() < label.start())
+    for match in candidates:
+        key = re.sub(r"\D", "", match.group(1))
+        if access_key_is_valid(key):
+            return key
+    return ""
+
+
+def _plain(text):
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in text if not unicodedata.combining(char)).upper()
+
+
+def find_totals(text):
+    """
+    Lê os totais da DANFE
+
+    Aceita o valor na mesma linha do rótulo ou a linha de rótulos seguida de uma
+    linha de valores na mesma ordem.
+
+    Returns:
+        dict: Campo -> valor (somente os encontrados)
+    """
+    lines = _plain(text).splitlines()
+    totals = {}
+    for index, line in enumerate(lines):
+        labels = []
+        for field, pattern in TOTAL_LABELS:
+            for match in pattern.finditer(line):
+                # Rótulos sobrepostos (ICMS dentro de BASE DE CALCULO DO ICMS) contam uma vez
+                if not any(start <= match.start() < end for start, end, _ in labels):
+                    labels.append((match.start(), match.end(), field))
+        if not labels:
+            continue
+        labels.sort()
+
+        same_line = AMOUNT_PATTERN.findall(line[labels[0][1]:])
+        next_line = AMOUNT_PATTERN.findall(lines[index + 1]) if index + 1 < len(lines) else []
+        if len(labels) == 1 and same_line:
+            values = same_line[:1]
+        elif len(same_line) == len(labels):
+            values = same_line
+        elif len(next_line) == len(labels) or (len(labels) == 1 and next_line):
+            values = next_line[:len(labels)]
+        else:
+            continue
+        for (_, _, field), value in zip(labels, values):
+            totals.setdefault(field, parse_amount(value))
+    return totals
+
+
+def parse_invoice(text):
+    """
+    Extrai os dados de uma NF-e a partir do texto da DANFE
+
+    Returns:
+        dict: access_key, campos da chave, issue_date, totals, total e confidence
+    """
+    text = text or ""
+    key = find_access_key(text)
+    totals = find_totals(text)
+    invoice = {
+        "access_key": key,
+        **(parse_access_key(key) if key else {}),
+        "issue_date": find_date(text),
+        "totals": totals,
+        "total": totals.get("invoice_total", totals.get("products_total", 0.0)),
+    }
+    # Chave válida e total da nota são o que importa para lançar a despesa
+    invoice["confidence"] = round(
+        0.5 * bool(key) + 0.3 * ("invoice_total" in totals) + 0.2 * bool(invoice["issue_date"]), 2
+    )
+    return invoice
+
+
+__all__ = ['parse_invoice', 'find_access_key', 'access_key_is_valid', 'parse_access_key', 'find_totals']
@@ -0,0 +1,287 @@
+"""
+Backends de OCR para o TarefoAI
+
+Cada backend sabe contar as páginas de um documento e reconhecer o texto de uma
+página. Documentos com várias páginas (PDFs digitalizados) são reconhecidos em
+paralelo em um pool de processos e remontados na ordem original.
+
+Backends disponíveis:
+- tesseract: pytesseract + Pillow (e pdf2image para PDFs)
+- stub: determinístico e sem dependências, para testes e desenvolvimento
+
+O backend padrão vem de TAREFO_OCR_BACKEND (padrão: tesseract). O stub só é usado
+quando selecionado explicitamente (TAREFO_OCR_BACKEND=stub): sem o pytesseract,
+o tesseract falha em vez de devolver texto falso.
+"""
+import os
+import re
+import hashlib
+import threading
+from collections import deque
+
+from config.config import OCR_CONFIG
+from .ocr_preprocess import preprocess_image, preprocess_settings, settings_tag
+
+PDF_PAGE_PATTERN = re.compile(rb"/Type\s*/Page(?![a-zA-Z])")
+
+# Leitura do PDF em blocos na contagem de páginas; a sobra entre blocos cobre um
+# marcador /Type /Page dividido na fronteira
+PDF_SCAN_CHUNK = 1024 * 1024
+PDF_SCAN_OVERLAP = 64
+
+
+def default_language():
+    """Idiomas do Tesseract a partir do OCR_CONFIG (ex.: por+eng)"""
+    return os.environ.get("TAREFO_OCR_LANG") or "+".join(OCR_CONFIG.get("languages", ["por"]))
+
+
+def is_pdf(path):
+    """Indica se o arquivo é um PDF pela extensão"""
+    return str(path).lower().endswith(".pdf")
+
+
+def count_pdf_pages(path):
+    """
+    Conta as páginas de um PDF sem dependências externas (estimativa pelo /Type /Page)
+
+    O arquivo é lido em blocos de PDF_SCAN_CHUNK, sem carregá-lo inteiro na memória.
+    """
+    count = 0
+    tail = b""
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(PDF_SCAN_CHUNK)
+            buffer = tail + chunk
+            if not chunk:
+                count += len(PDF_PAGE_PATTERN.findall(buffer))
+                break
+            # Marcadores que começam na sobra são contados no próximo bloco
+            limit = len(buffer) - PDF_SCAN_OVERLAP
+            if limit > 0:
+                count += sum(1 for match in PDF_PAGE_PATTERN.finditer(buffer) if match.start() < limit)
+                tail = buffer[limit:]
+            else:
+                tail = buffer
+    return max(1, count)
+
+
+class OCRBackend:
+    """Interface dos backends de OCR"""
+
+    name = "base"
+
+    def is_available(self):
+        """Indica se as dependências do backend estão instaladas"""
+        return True
+
+    @property
+    def cache_tag(self):
+        """Identifica o backend e suas opções na chave do cache de OCR"""
+        return self.name
+
+    def page_count(self, path):
+        """Número de páginas do documento (1 para imagens)"""
+        return count_pdf_pages(path) if is_pdf(path) else 1
+
+    def recognize_page(self, path, page_index, lang=None):
+        """
+        Reconhece o texto de uma página
+
+        Args:
+            path: Caminho do documento
+            page_index (int): Índice da página, a partir de 0
+            lang (str): Idiomas do OCR (ex.: por+eng)
+
+        Returns:
+            str: Texto reconhecido
+        """
+        raise NotImplementedError
+
+
+class TesseractBackend(OCRBackend):
+    """
+    OCR com Tesseract; PDFs são rasterizados página a página com pdf2image
+
+    As imagens passam pelo pipeline de tools/ocr_preprocess.py antes do
+    reconhecimento (redução, tons de cinza, binarização, inclinação).
+    """
+
+    name = "tesseract"
+
+    def __init__(self, dpi=None, preprocessing=None):
+        self.dpi = dpi or int(os.environ.get("TAREFO_OCR_DPI", "300"))
+        self.preprocessing = preprocessing or preprocess_settings()
+
+    @property
+    def cache_tag(self):
+        return f"{self.name}:{settings_tag(self.preprocessing)}"
+
+    def is_available(self):
+        try:
+            import pytesseract  # noqa: F401
+            from PIL import Image  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def page_count(self, path):
+        if not is_pdf(path):
+            return 1
+        try:
+            from pdf2image import pdfinfo_from_path
+            return int(pdfinfo_from_path(str(path))["Pages"])
+        except ImportError:
+            return count_pdf_pages(path)
+
+    def recognize_page(self, path, page_index, lang=None):
+        import pytesseract
+        from PIL import Image
+
+        lang = lang or default_language()
+        if is_pdf(path):
+            from pdf2image import convert_from_path
+            # Rasteriza somente a página pedida
+            pages = convert_from_path(
+                str(path), dpi=self.dpi, first_page=page_index + 1, last_page=page_index + 1
+            )
+            image = pages[0]
+            image.info["dpi"] = (self.dpi, self.dpi)
+        else:
+            # Aberta sem decodificar, para que o draft reduza o JPEG na leitura
+            image = Image.open(path)
+        try:
+            image, _ = preprocess_image(image, self.preprocessing)
+            dpi = image.info.get("dpi", (self.dpi,))[0]
+            return pytesseract.image_to_string(image, lang=lang, config=f"--dpi {int(dpi)}")
+        finally:
+            image.close()
+
+
+class StubBackend(OCRBackend):
+    """Backend determinístico: o texto depende apenas do conteúdo e da página"""
+
+    name = "stub"
+
+    def recognize_page(self, path, page_index, lang=None):
+        with open(path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()[:12]
+        return f"[ocr-stub {digest}] página {page_index + 1}"
+
+
+BACKENDS = {
+    "tesseract": TesseractBackend,
+    "stub": StubBackend,
+}
+
+
+def register_backend(name, backend_class):
+    """Registra um backend adicional (ex.: um serviço de OCR em nuvem)"""
+    BACKENDS[name] = backend_class
+
+
+def get_backend(name=None):
+    """
+    Cria o backend pelo nome (padrão: TAREFO_OCR_BACKEND ou tesseract)
+
+    Raises:
+        ValueError: Se o backend não estiver registrado
+        RuntimeError: Se as dependências do backend não estiverem instaladas; o
+            stub só é usado quando pedido pelo nome (TAREFO_OCR_BACKEND=stub)
+    """
+    name = name or os.environ.get("TAREFO_OCR_BACKEND", "tesseract")
+    if name not in BACKENDS:
+        raise ValueError(f"Backend de OCR desconhecido: {name}. Use: {', '.join(BACKENDS)}")
+    backend = BACKENDS[name]()
+    if not backend.is_available():
+        raise RuntimeError(
+            f"Backend de OCR '{name}' indisponível: instale as dependências "
+            f"ou use TAREFO_OCR_BACKEND=stub em testes e desenvolvimento"
+        )
+    return backend
+
+
+_page_pool = None
+_page_pool_lock = threading.Lock()
+
+
+def get_page_pool():
+    """Pool de processos para páginas, dimensionado pelos núcleos disponíveis"""
+    global _page_pool
+    with _page_pool_lock:
+        if _page_pool is None:
+            from concurrent.futures import ProcessPoolExecutor
+            workers = int(os.environ.get("TAREFO_OCR_WORKERS", "0")) or os.cpu_count() or 1
+            _page_pool = ProcessPoolExecutor(max_workers=workers)
+        return _page_pool
+
+
+def _recognize_page_task(args):
+    backend, path, page_index, lang = args
+    return backend.recognize_page(path, page_index, lang)
+
+
+def recognize_document(path, backend=None, lang=None, parallel=True):
+    """
+    Reconhece todas as páginas de um documento
+
+    Páginas são processadas em paralelo no pool de processos; documentos de uma
+    página (ou com parallel=False, quando já se está em um processo do lote) são
+    reconhecidos no próprio processo.
+
+    Returns:
+        list: Texto de cada página, na ordem do documento
+    """
+    backend = backend or get_backend()
+    lang = lang or default_language()
+    pages = backend.page_count(path)
+    if pages <= 1:
+        return [backend.recognize_page(path, 0, lang)]
+    if not parallel:
+        return [backend.recognize_page(path, index, lang) for index in range(pages)]
+
+    tasks = [(backend, str(path), index, lang) for index in range(pages)]
+    # map preserva a ordem das páginas independentemente da ordem de conclusão
+    return list(get_page_pool().map(_recognize_page_task, tasks))
+
+
+def iter_document(path, backend=None, lang=None, parallel=True, window=None):
+    """
+    Reconhece as páginas de um documento uma a uma, na ordem
+
+    Cada página é rasterizada e reconhecida isoladamente; com parallel=True, no
+    máximo `window` páginas ficam em andamento no pool, então a memória não cresce
+    com o número de páginas e a primeira página sai antes da última terminar.
+
+    Yields:
+        tuple: (índice da página, texto)
+    """
+    backend = backend or get_backend()
+    lang = lang or default_language()
+    pages = backend.page_count(path)
+    if pages <= 1 or not parallel:
+        for index in range(pages):
+            yield index, backend.recognize_page(path, index, lang)
+        return
+
+    pool = get_page_pool()
+    window = window or int(os.environ.get("TAREFO_OCR_WORKERS", "0")) or os.cpu_count() or 1
+    pending = deque()
+    next_index = 0
+    try:
+        while next_index < pages or pending:
+            while next_index < pages and len(pending) < window:
+                task = (backend, str(path), next_index, lang)
+                pending.append((next_index, pool.submit(_recognize_page_task, task)))
+                next_index += 1
+            index, future = pending.popleft()
+            yield index, future.result()
+    finally:
+        # Consumidor parou no meio: não processa as páginas restantes
+        for _, future in pending:
+            future.cancel()
+
+
+__all__ = [
+    'OCRBackend', 'TesseractBackend', 'StubBackend', 'BACKENDS',
+    'register_backend', 'get_backend', 'recognize_document', 'iter_document'
+]
@@ -0,0 +1,238 @@
+"""
+Cache de resultados de OCR endereçado por conteúdo
+
+A chave é o hash SHA-256 dos bytes da imagem mais o tipo de extração e o backend,
+de modo que a mesma foto reenviada (ou o mesmo payload base64 repetido por
+retentativas) não passe de novo pela decodificação nem pelo OCR.
+
+Dois níveis:
+- memória: LRU com número máximo de entradas, incluindo apelidos (payload base64
+  ou caminho + mtime + tamanho) que levam direto à chave do conteúdo;
+- disco: um arquivo JSON por resultado, em subdiretórios pelo prefixo do hash,
+  com descarte dos menos usados quando o tamanho total passa do limite.
+
+Os resultados contêm o texto dos documentos dos usuários: o diretório em disco
+fica nos dados do aplicativo (DATA_DIR), com permissão 0700, e cada arquivo é
+criado com permissão 0600.
+
+Variáveis de ambiente:
+    TAREFO_OCR_CACHE=off            desativa o cache
+    TAREFO_OCR_CACHE_DIR            diretório do nível em disco (padrão: DATA_DIR/ocr_cache)
+    TAREFO_OCR_CACHE_ENTRIES        entradas do nível em memória (padrão: 256)
+    TAREFO_OCR_CACHE_MAX_MB         tamanho máximo em disco (padrão: 256)
+"""
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from config.config import DATA_DIR, ensure_private_dir
+
+DEFAULT_CACHE_DIR = DATA_DIR / "ocr_cache"
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_bytes(data):
+    """SHA-256 de um bloco de bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path):
+    """SHA-256 do conteúdo de um arquivo, lido em blocos"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def make_key(content_hash, extract_type, backend=""):
+    """Chave do resultado: conteúdo + tipo de extração + backend"""
+    return f"{content_hash}-{extract_type}-{backend}"
+
+
+class OCRCache:
+    """Cache de dois níveis (memória LRU + disco com limite de tamanho)"""
+
+    def __init__(self, cache_dir=None, memory_entries=None, max_disk_bytes=None):
+        self.cache_dir = Path(cache_dir or os.environ.get("TAREFO_OCR_CACHE_DIR", DEFAULT_CACHE_DIR))
+        self.memory_entries = memory_entries or int(os.environ.get("TAREFO_OCR_CACHE_ENTRIES", "256"))
+        self.max_disk_bytes = max_disk_bytes or int(
+            float(os.environ.get("TAREFO_OCR_CACHE_MAX_MB", "256")) * 1024 * 1024
+        )
+        self._memory = OrderedDict()
+        self._aliases = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes = None
+        self._dir_ready = False
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    # Nível em memória -------------------------------------------------------
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def alias(self, alias_key, key):
+        """Associa um apelido barato de calcular (ex.: hash do base64) à chave"""
+        with self._lock:
+            self._aliases[alias_key] = key
+            self._aliases.move_to_end(alias_key)
+            while len(self._aliases) > self.memory_entries * 2:
+                self._aliases.popitem(last=False)
+
+    def resolve(self, alias_key):
+        """Retorna a chave associada ao apelido, se houver"""
+        with self._lock:
+            return self._aliases.get(alias_key)
+
+    # Nível em disco ---------------------------------------------------------
+
+    def _disk_path(self, key):
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def _write_disk(self, path, value):
+        """
+        Grava o arquivo de forma atômica, com permissão 0600
+
+        Returns:
+            int: Tamanho do arquivo substituído (0 se a chave era nova)
+        """
+        if not self._dir_ready:
+            ensure_private_dir(self.cache_dir)
+            self._dir_ready = True
+        path.parent.mkdir(mode=0o700, exist_ok=True)
+        # Nome temporário único: gravações concorrentes da mesma chave (outros
+        # processos) não escrevem no mesmo arquivo
+        tmp = tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=path.parent, prefix=f".{path.stem}-", suffix=".tmp", delete=False
+        )
+        try:
+            with tmp:
+                tmp.write(value)
+            try:
+                replaced = path.stat().st_size
+            except OSError:
+                replaced = 0
+            os.replace(tmp.name, path)
+            return replaced
+        except BaseException:
+            try:
+                os.unlink(tmp.name)
+            except OSError:
+                pass
+            raise
+
+    def _disk_usage(self):
+        """Tamanho total do nível em disco (calculado uma vez, depois incremental)"""
+        if self._disk_bytes is None:
+            total = 0
+            if self.cache_dir.exists():
+                for path in self.cache_dir.glob("*/*.json"):
+                    try:
+                        total += path.stat().st_size
+                    except OSError:
+                        pass
+            self._disk_bytes = total
+        return self._disk_bytes
+
+    def _evict_disk(self):
+        """Remove os arquivos usados há mais tempo até caber no limite"""
+        entries = []
+        for path in self.cache_dir.glob("*/*.json"):
+            try:
+                st = path.stat()
+                entries.append((st.st_mtime, st.st_size, path))
+            except OSError:
+                pass
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        # Libera até 90% do limite para não varrer o diretório a cada gravação
+        target = self.max_disk_bytes * 0.9
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                path.unlink()
+                total -= size
+            except OSError:
+                pass
+        self._disk_bytes = total
+
+    # API --------------------------------------------------------------------
+
+    def get(self, key):
+        """Busca um resultado; retorna None se não estiver em cache"""
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return json.loads(value)
+
+            path = self._disk_path(key)
+            try:
+                value = path.read_text(encoding="utf-8")
+                os.utime(path)
+            except OSError:
+                self.misses += 1
+                return None
+            self._remember(key, value)
+            self.hits += 1
+            self.disk_hits += 1
+            return json.loads(value)
+
+    def set(self, key, result):
+        """Armazena um resultado nos dois níveis"""
+        value = json.dumps(result, ensure_ascii=False, default=str)
+        with self._lock:
+            self._remember(key, value)
+            path = self._disk_path(key)
+            try:
+                replaced = self._write_disk(path, value)
+            except OSError as e:
+                print(f"⚠️ Falha ao gravar cache de OCR em disco: {e}")
+                return
+            if self._disk_bytes is None:
+                # A primeira varredura já conta o arquivo recém-gravado
+                self._disk_usage()
+            else:
+                self._disk_bytes += len(value.encode("utf-8")) - replaced
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict_disk()
+
+    def stats(self):
+        """Contadores do cache"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+                "disk_bytes": self._disk_usage(),
+            }
+
+
+_ocr_cache = None
+_ocr_cache_lock = threading.Lock()
+
+
+def get_ocr_cache():
+    """Retorna o cache compartilhado do processo, ou None se estiver desativado"""
+    global _ocr_cache
+    if os.environ.get("TAREFO_OCR_CACHE", "on").lower() == "off":
+        return None
+    with _ocr_cache_lock:
+        if _ocr_cache is None:
+            _ocr_cache = OCRCache()
+        return _ocr_cache
+
+
+__all__ = ['OCRCache', 'get_ocr_cache', 'hash_bytes', 'hash_file', 'make_key']
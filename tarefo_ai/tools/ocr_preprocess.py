@@ -0,0 +1,269 @@
+"""
+Pré-processamento de imagens antes do OCR
+
+Fotos de recibos tiradas no celular têm 12+ megapixels; o Tesseract não precisa de
+tudo isso e fica bem mais lento. O pipeline reduz a imagem o quanto antes e a
+prepara para o reconhecimento:
+
+- draft: decodifica JPEGs já em escala reduzida (modo draft do Pillow)
+- grayscale: converte para tons de cinza
+- normalize_dpi: redimensiona para a resolução alvo (limitada por max_pixels)
+- binarize: limiarização global pelo método de Otsu
+- deskew: corrige a inclinação pelo perfil de projeção das linhas
+
+Cada etapa pode ser ligada ou desligada (OCR_CONFIG["preprocessing"] ou
+TAREFO_OCR_PREPROCESS) e tem o tempo registrado em
+tarefo_ocr_preprocess_seconds{step}.
+
+Variáveis de ambiente:
+    TAREFO_OCR_PREPROCESS       etapas ativas, separadas por vírgula, ou "off"
+    TAREFO_OCR_TARGET_DPI       resolução alvo (padrão: 300)
+    TAREFO_OCR_MAX_PIXELS       limite de pixels após a redução (padrão: 4000000)
+"""
+import os
+import time
+
+from config.config import OCR_CONFIG
+from metrics import observe
+
+# Ordem fixa de execução das etapas
+STEPS = ("draft", "grayscale", "normalize_dpi", "binarize", "deskew")
+
+# Ângulos testados na correção de inclinação (graus)
+DESKEW_MAX_ANGLE = 5.0
+DESKEW_STEP = 0.5
+
+# Fração linear abaixo de max_pixels aceita pelo draft
+DRAFT_SLACK = 0.75
+
+# Resoluções até este valor são o padrão gravado por câmeras, não a real
+PLACEHOLDER_DPI = 72
+
+# Largura da miniatura usada para estimar a inclinação
+DESKEW_SAMPLE_WIDTH = 600
+
+
+def preprocess_settings():
+    """
+    Configuração do pipeline a partir do OCR_CONFIG e das variáveis de ambiente
+
+    Returns:
+        dict: steps (tupla de etapas ativas), target_dpi e max_pixels
+    """
+    config = OCR_CONFIG.get("preprocessing", {})
+    env_steps = os.environ.get("TAREFO_OCR_PREPROCESS")
+    if env_steps is not None:
+        requested = {step.strip() for step in env_steps.split(",") if step.strip()}
+        if requested & {"off", "none"}:
+            requested = set()
+        unknown = requested - set(STEPS)
+        if unknown:
+            raise ValueError(
+                f"Etapas de pré-processamento desconhecidas: {', '.join(sorted(unknown))}. "
+                f"Use: {', '.join(STEPS)}"
+            )
+        steps = tuple(step for step in STEPS if step in requested)
+    else:
+        steps = tuple(step for step in STEPS if config.get(step, True))
+    return {
+        "steps": steps,
+        "target_dpi": int(os.environ.get("TAREFO_OCR_TARGET_DPI", config.get("target_dpi", 300))),
+        "max_pixels": int(os.environ.get("TAREFO_OCR_MAX_PIXELS", config.get("max_pixels", 4_000_000))),
+    }
+
+
+def settings_tag(settings):
+    """Identificador curto da configuração (entra na chave do cache de OCR)"""
+    if not settings["steps"]:
+        return "raw"
+    return "+".join(settings["steps"]) + f"@{settings['target_dpi']}dpi/{settings['max_pixels']}px"
+
+
+def _scale_for(size, max_pixels):
+    """Fator de escala (<= 1) para que a imagem caiba em max_pixels"""
+    pixels = size[0] * size[1]
+    if pixels <= max_pixels:
+        return 1.0
+    return (max_pixels / pixels) ** 0.5
+
+
+def _source_dpi(image):
+    """Resolução declarada no arquivo; 72 dpi ou menos é o padrão de câmeras e é ignorado"""
+    dpi = image.info.get("dpi")
+    if not dpi:
+        return None
+    try:
+        value = float(dpi[0])
+    except (TypeError, ValueError, IndexError):
+        return None
+    return value if value > PLACEHOLDER_DPI else None
+
+
+def otsu_threshold(image):
+    """Limiar de Otsu calculado sobre o histograma de uma imagem em tons de cinza"""
+    histogram = image.histogram()[:256]
+    total = sum(histogram)
+    if not total:
+        return 128
+    sum_all = sum(level * count for level, count in enumerate(histogram))
+    sum_background = 0.0
+    weight_background = 0
+    best_threshold, best_variance = 128, -1.0
+    for level, count in enumerate(histogram):
+        weight_background += count
+        if not weight_background:
+            continue
+        weight_foreground = total - weight_background
+        if not weight_foreground:
+            break
+        sum_background += level * count
+        mean_background = sum_background / weight_background
+        mean_foreground = (sum_all - sum_background) / weight_foreground
+        variance = weight_background * weight_foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_threshold, best_variance = level, variance
+    return best_threshold
+
+
+def estimate_skew(image):
+    """
+    Estima a inclinação do texto em graus
+
+    Gira uma miniatura em tons de cinza e escolhe o ângulo em que as somas das
+    linhas variam mais (linhas de texto alinhadas com o eixo horizontal). As somas
+    das linhas vêm de um resize para 1 pixel de largura, sem depender do numpy.
+    """
+    from PIL import Image, ImageOps
+
+    sample = image if image.mode == "L" else image.convert("L")
+    if sample.width > DESKEW_SAMPLE_WIDTH:
+        ratio = DESKEW_SAMPLE_WIDTH / sample.width
+        sample = sample.resize((DESKEW_SAMPLE_WIDTH, max(1, int(sample.height * ratio))), Image.BILINEAR)
+    # Texto escuro vira "tinta" clara; o preenchimento da rotação fica em 0
+    sample = ImageOps.invert(sample)
+
+    best_angle, best_score = 0.0, -1.0
+    steps = int(DESKEW_MAX_ANGLE / DESKEW_STEP)
+    for index in range(-steps, steps + 1):
+        angle = index * DESKEW_STEP
+        rotated = sample.rotate(angle, resample=Image.NEAREST, expand=False, fillcolor=0)
+        rows = list(rotated.resize((1, rotated.height), Image.BOX).tobytes())
+        mean = sum(rows) / len(rows)
+        score = sum((value - mean) ** 2 for value in rows)
+        if score > best_score:
+            best_angle, best_score = angle, score
+    return best_angle
+
+
+def _draft(image, settings):
+    # Só tem efeito em JPEGs ainda não decodificados; reduz por potências de 2
+    if getattr(image, "format", None) != "JPEG":
+        return image
+    scale = _scale_for(image.size, settings["max_pixels"])
+    if scale >= 1.0:
+        return image
+    mode = "L" if "grayscale" in settings["steps"] else image.mode
+    original_width = image.width
+    # O draft só escolhe escalas 1/2, 1/4, 1/8: aceita ficar um pouco abaixo do
+    # limite para não perder a redução quando a imagem passa dele por pouco
+    scale *= DRAFT_SLACK
+    requested = (max(1, int(image.width * scale)), max(1, int(image.height * scale)))
+    image.draft(mode, requested)
+    # O draft não ajusta a resolução declarada; corrige pela redução real
+    source_dpi = _source_dpi(image)
+    if source_dpi and image.width != original_width:
+        dpi = source_dpi * image.width / original_width
+        image.info["dpi"] = (dpi, dpi)
+    return image
+
+
+def _grayscale(image, settings):
+    return image if image.mode == "L" else image.convert("L")
+
+
+def _normalize_dpi(image, settings):
+    from PIL import Image
+
+    target_dpi = settings["target_dpi"]
+    source_dpi = _source_dpi(image)
+    scale = target_dpi / source_dpi if source_dpi else 1.0
+    # Nunca passa do limite de pixels, mesmo que a resolução de origem seja baixa
+    scale = min(scale, (settings["max_pixels"] / (image.width * image.height)) ** 0.5)
+    if abs(scale - 1.0) > 0.01:
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        resample = Image.LANCZOS if scale < 1.0 else Image.BICUBIC
+        image = image.resize(size, resample)
+    image.info["dpi"] = (target_dpi, target_dpi)
+    return image
+
+
+def _binarize(image, settings):
+    gray = image if image.mode == "L" else image.convert("L")
+    threshold = otsu_threshold(gray)
+    binary = gray.point(lambda value: 255 if value > threshold else 0, mode="L")
+    binary.info = dict(image.info)
+    return binary
+
+
+def _deskew(image, settings):
+    from PIL import Image
+
+    angle = estimate_skew(image)
+    if not angle:
+        return image
+    fill = 255 if image.mode in ("L", "1") else (255,) * len(image.getbands())
+    rotated = image.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=fill)
+    rotated.info = dict(image.info)
+    return rotated
+
+
+_STEP_FUNCTIONS = {
+    "draft": _draft,
+    "grayscale": _grayscale,
+    "normalize_dpi": _normalize_dpi,
+    "binarize": _binarize,
+    "deskew": _deskew,
+}
+
+
+def preprocess_image(image, settings=None):
+    """
+    Aplica as etapas ativas a uma imagem do Pillow
+
+    Args:
+        image: Imagem aberta (de preferência ainda não carregada, para o draft)
+        settings (dict): Resultado de preprocess_settings() (padrão: configuração atual)
+
+    Returns:
+        tuple: (imagem processada, dict etapa -> segundos)
+    """
+    settings = settings or preprocess_settings()
+    timings = {}
+    for step in settings["steps"]:
+        start = time.perf_counter()
+        image = _STEP_FUNCTIONS[step](image, settings)
+        if step == "draft":
+            # O draft só configura o decodificador; a decodificação conta nesta etapa
+            image.load()
+        elapsed = time.perf_counter() - start
+        timings[step] = elapsed
+        observe("tarefo_ocr_preprocess_seconds", elapsed, step=step)
+    return image, timings
+
+
+def open_for_ocr(path, settings=None):
+    """
+    Abre e pré-processa uma imagem do disco
+
+    Returns:
+        tuple: (imagem processada, dict etapa -> segundos)
+    """
+    from PIL import Image
+
+    return preprocess_image(Image.open(path), settings)
+
+
+__all__ = [
+    'STEPS', 'preprocess_settings', 'settings_tag', 'preprocess_image', 'open_for_ocr',
+    'otsu_threshold', 'estimate_skew'
+]
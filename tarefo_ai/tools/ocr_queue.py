@@ -0,0 +1,460 @@
+"""
+Fila persistente de jobs de OCR
+
+O OCR de um documento lento não deve bloquear o worker do chat nem estourar o
+timeout do adaptador Node. `submit()` grava o job em um banco SQLite local e
+devolve o ID na hora; um pool de workers de OCR independente (processos) consome a
+fila, e o resultado é consultado com `get()`/`wait()` ou entregue a um callback.
+
+- prioridade: jobs interativos (chat) passam na frente dos lotes de recibos e
+  notas; sem prioridade explícita, ela vem do tipo de extração
+  (default_priority);
+- visibilidade: um job em execução fica reservado por um prazo renovado pelo
+  worker; se o worker morrer, o job volta para a fila ao fim do prazo;
+- tentativas: falhas são reenfileiradas com espera exponencial até max_attempts.
+
+Uso do pool:
+    python -m tools.ocr_queue --workers 4
+
+Variáveis de ambiente:
+    TAREFO_OCR_QUEUE_PATH           caminho do banco SQLite
+                                    (padrão: DATA_DIR/ocr_jobs.sqlite3)
+    TAREFO_OCR_QUEUE_VISIBILITY     prazo de reserva de um job em segundos (padrão: 120)
+    TAREFO_OCR_QUEUE_MAX_ATTEMPTS   tentativas por job (padrão: 3)
+    TAREFO_OCR_QUEUE_RETENTION      tempo em segundos que jobs concluídos ficam no banco
+                                    (padrão: 86400)
+    TAREFO_OCR_QUEUE_WORKERS        processos do pool (padrão: número de núcleos)
+"""
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+
+from config.config import DATA_DIR, ensure_private_dir
+
+# O banco guarda o texto dos documentos dos usuários: fica no diretório privado de dados
+DEFAULT_QUEUE_PATH = DATA_DIR / "ocr_jobs.sqlite3"
+
+# Prioridades (maior sai primeiro)
+PRIORITY_INTERACTIVE = 10
+PRIORITY_NORMAL = 5
+PRIORITY_BULK = 0
+
+PRIORITY_NAMES = {
+    "interactive": PRIORITY_INTERACTIVE,
+    "normal": PRIORITY_NORMAL,
+    "bulk": PRIORITY_BULK,
+}
+
+# Tipos de extração que chegam em lote (importação de recibos e notas)
+BULK_EXTRACT_TYPES = frozenset({"receipt", "invoice", "bulk"})
+
+# Espera antes de uma nova tentativa: RETRY_BACKOFF * 2^(tentativa - 1) segundos
+RETRY_BACKOFF = 2.0
+
+# Intervalo entre consultas de workers ociosos, de wait() e do notificador
+POLL_SECONDS = 0.5
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+def default_priority(extract_type):
+    """Prioridade de um job sem prioridade explícita: lotes de documentos não passam na frente do chat"""
+    return PRIORITY_BULK if extract_type in BULK_EXTRACT_TYPES else PRIORITY_INTERACTIVE
+
+
+def resolve_priority(priority, extract_type="full"):
+    """
+    Converte a prioridade informada pelo chamador
+
+    Args:
+        priority: Número, nome (interactive, normal, bulk) ou None para derivar
+            do tipo de extração
+
+    Returns:
+        int: Prioridade do job
+    """
+    if priority is None:
+        return default_priority(extract_type)
+    if isinstance(priority, str) and not priority.lstrip("-").isdigit():
+        if priority not in PRIORITY_NAMES:
+            raise ValueError(f"Prioridade desconhecida: {priority}")
+        return PRIORITY_NAMES[priority]
+    return int(priority)
+
+
+class OCRJobQueue:
+    """Fila de jobs de OCR persistida em SQLite (segura entre processos)"""
+
+    def __init__(self, path=None, visibility_timeout=None, max_attempts=None, retention=None):
+        self.path = str(path or os.environ.get("TAREFO_OCR_QUEUE_PATH", DEFAULT_QUEUE_PATH))
+        self.visibility_timeout = visibility_timeout or float(
+            os.environ.get("TAREFO_OCR_QUEUE_VISIBILITY", "120")
+        )
+        self.max_attempts = max_attempts or int(os.environ.get("TAREFO_OCR_QUEUE_MAX_ATTEMPTS", "3"))
+        self.retention = retention if retention is not None else float(
+            os.environ.get("TAREFO_OCR_QUEUE_RETENTION", "86400")
+        )
+        self._lock = threading.Lock()
+        self._conn = None
+        self._callbacks = {}
+        self._notifier = None
+
+    def _connection(self):
+        """Abre o banco na primeira utilização"""
+        if self._conn is None:
+            self._create_private_file()
+            self._conn = sqlite3.connect(
+                self.path, timeout=30, check_same_thread=False, isolation_level=None
+            )
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    image_path TEXT NOT NULL,
+                    extract_type TEXT NOT NULL,
+                    priority INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL,
+                    visible_at REAL NOT NULL,
+                    owner TEXT,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, priority DESC, visible_at, created_at)"
+            )
+        return self._conn
+
+    def _create_private_file(self):
+        """Cria o banco com permissão 0600 (o SQLite usa a mesma para o WAL)"""
+        directory = os.path.dirname(self.path)
+        if self.path == str(DEFAULT_QUEUE_PATH):
+            ensure_private_dir(directory)
+        elif directory:
+            os.makedirs(directory, exist_ok=True)
+        os.close(os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600))
+
+    def submit(self, image_path, extract_type="full", priority=None, max_attempts=None, callback=None):
+        """
+        Enfileira um documento para OCR
+
+        Args:
+            image_path: Caminho do arquivo (payloads base64/bytes devem ser salvos
+                antes, ex.: com OCRTool.save_image_from_base64)
+            extract_type: Tipo de extração (full, receipt, invoice)
+            priority: PRIORITY_INTERACTIVE, PRIORITY_NORMAL, PRIORITY_BULK, o nome
+                de uma delas ou None (padrão: default_priority do tipo de extração)
+            max_attempts (int): Tentativas antes de marcar como falho
+            callback: Função chamada com o job (dict) quando ele terminar
+
+        Returns:
+            str: ID do job
+        """
+        job_id = uuid.uuid4().hex
+        priority = resolve_priority(priority, extract_type)
+        now = time.time()
+        with self._lock:
+            self._connection().execute(
+                "INSERT INTO jobs (id, image_path, extract_type, priority, status, max_attempts, "
+                "visible_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, os.fspath(image_path), extract_type, priority, QUEUED,
+                 max_attempts or self.max_attempts, now, now, now),
+            )
+            if callback is not None:
+                self._callbacks[job_id] = callback
+                self._start_notifier()
+        return job_id
+
+    def claim(self, owner):
+        """
+        Reserva o próximo job pronto (maior prioridade, mais antigo)
+
+        Jobs em execução cujo prazo de visibilidade venceu (worker morto ou
+        travado) voltam a ser elegíveis; se já esgotaram as tentativas, são
+        marcados como falhos.
+
+        Returns:
+            dict: Job reservado ou None se a fila estiver vazia
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, owner = NULL, updated_at = ? "
+                    "WHERE status = ? AND visible_at <= ? AND attempts >= max_attempts",
+                    (FAILED, "Prazo de visibilidade esgotado em todas as tentativas", now, RUNNING, now),
+                )
+                row = conn.execute(
+                    "SELECT id FROM jobs WHERE status IN (?, ?) AND visible_at <= ? "
+                    "ORDER BY priority DESC, created_at LIMIT 1",
+                    (QUEUED, RUNNING, now),
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                conn.execute(
+                    "UPDATE jobs SET status = ?, owner = ?, attempts = attempts + 1, "
+                    "visible_at = ?, updated_at = ? WHERE id = ?",
+                    (RUNNING, owner, now + self.visibility_timeout, now, row[0]),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return self.get(row[0])
+
+    def heartbeat(self, job_id, owner):
+        """Renova a reserva de um job em execução; False se ele foi perdido"""
+        now = time.time()
+        with self._lock:
+            cursor = self._connection().execute(
+                "UPDATE jobs SET visible_at = ?, updated_at = ? WHERE id = ? AND owner = ? AND status = ?",
+                (now + self.visibility_timeout, now, job_id, owner, RUNNING),
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id, owner, result):
+        """Grava o resultado; ignorado se a reserva já passou para outro worker"""
+        now = time.time()
+        with self._lock:
+            cursor = self._connection().execute(
+                "UPDATE jobs SET status = ?, result = ?, error = NULL, owner = NULL, updated_at = ? "
+                "WHERE id = ? AND owner = ? AND status = ?",
+                (DONE, json.dumps(result, ensure_ascii=False, default=str), now, job_id, owner, RUNNING),
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id, owner, error):
+        """Reenfileira com espera exponencial ou marca como falho na última tentativa"""
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            # Leitura e escrita na mesma transação: outro worker não age sobre a
+            # mesma contagem de tentativas entre as duas
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND owner = ? AND status = ?",
+                    (job_id, owner, RUNNING),
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return False
+                attempts, max_attempts = row
+                if attempts >= max_attempts:
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, error = ?, owner = NULL, updated_at = ? WHERE id = ?",
+                        (FAILED, str(error), now, job_id),
+                    )
+                else:
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, error = ?, owner = NULL, visible_at = ?, updated_at = ? "
+                        "WHERE id = ?",
+                        (QUEUED, str(error), now + RETRY_BACKOFF * 2 ** (attempts - 1), now, job_id),
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return True
+
+    def get(self, job_id):
+        """
+        Estado de um job
+
+        Returns:
+            dict: id, status, priority, attempts, result/error... ou None se não existir
+        """
+        with self._lock:
+            cursor = self._connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+            row = cursor.fetchone()
+            columns = [column[0] for column in cursor.description]
+        if row is None:
+            return None
+        job = dict(zip(columns, row))
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def wait(self, job_id, timeout=None, poll=POLL_SECONDS):
+        """Espera o job terminar (done ou failed) e retorna seu estado"""
+        deadline = time.monotonic() + timeout if timeout else None
+        while True:
+            job = self.get(job_id)
+            if job is None or job["status"] in (DONE, FAILED):
+                return job
+            if deadline is not None and time.monotonic() >= deadline:
+                return job
+            time.sleep(poll)
+
+    def purge(self):
+        """Remove jobs concluídos ou falhos mais antigos que a retenção"""
+        with self._lock:
+            cursor = self._connection().execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (DONE, FAILED, time.time() - self.retention),
+            )
+        return cursor.rowcount
+
+    def stats(self):
+        """Quantidade de jobs por estado"""
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+            ).fetchall()
+        counts = dict.fromkeys((QUEUED, RUNNING, DONE, FAILED), 0)
+        counts.update(dict(rows))
+        return counts
+
+    def _start_notifier(self):
+        """Thread que entrega os callbacks quando os jobs terminam (chamada com o lock)"""
+        if self._notifier is not None and self._notifier.is_alive():
+            return
+
+        def loop():
+            while True:
+                time.sleep(POLL_SECONDS)
+                with self._lock:
+                    pending = list(self._callbacks)
+                    if not pending:
+                        self._notifier = None
+                        return
+                for job_id in pending:
+                    job = self.get(job_id)
+                    if job is not None and job["status"] not in (DONE, FAILED):
+                        continue
+                    with self._lock:
+                        callback = self._callbacks.pop(job_id, None)
+                    if callback is None:
+                        continue
+                    try:
+                        callback(job)
+                    except Exception as e:
+                        print(f"⚠️ Erro no callback do job de OCR {job_id}: {e}")
+
+        self._notifier = threading.Thread(target=loop, name="tarefo-ocr-notifier", daemon=True)
+        self._notifier.start()
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_ocr_queue():
+    """Retorna a fila compartilhada do processo"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = OCRJobQueue()
+        return _queue
+
+
+def run_worker(queue_path=None, stop_event=None, idle_poll=POLL_SECONDS):
+    """
+    Consome a fila até stop_event ser acionado (um processo do pool)
+
+    Enquanto o OCR roda, uma thread renova a reserva do job a cada terço do
+    prazo de visibilidade. Ao reservar um job, o prazo do upload também é
+    renovado, para que a limpeza do store não apague o arquivo de um job que
+    esperou na fila.
+    """
+    from .ocr_tool import OCRTool
+    from .upload_store import touch_upload
+
+    queue = OCRJobQueue(queue_path)
+    tool = OCRTool(parallel_pages=False)
+    owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    stop_event = stop_event or threading.Event()
+    last_purge = 0.0
+
+    while not stop_event.is_set():
+        job = queue.claim(owner)
+        if job is None:
+            if time.monotonic() - last_purge > 3600:
+                queue.purge()
+                last_purge = time.monotonic()
+            stop_event.wait(idle_poll)
+            continue
+
+        touch_upload(job["image_path"])
+        done = threading.Event()
+
+        def keep_alive(job_id=job["id"]):
+            while not done.wait(queue.visibility_timeout / 3):
+                if not queue.heartbeat(job_id, owner):
+                    return
+
+        threading.Thread(target=keep_alive, name="tarefo-ocr-heartbeat", daemon=True).start()
+        try:
+            result = tool.run(job["image_path"], job["extract_type"])
+            if "error" in result:
+                queue.fail(job["id"], owner, result["error"])
+            else:
+                queue.complete(job["id"], owner, result)
+        except Exception as e:
+            print(f"❌ Erro no job de OCR {job['id']}: {e}")
+            queue.fail(job["id"], owner, str(e))
+        finally:
+            done.set()
+
+
+def _worker_process(queue_path):
+    try:
+        run_worker(queue_path)
+    except KeyboardInterrupt:
+        pass
+
+
+def start_worker_pool(workers=None, queue_path=None):
+    """
+    Inicia o pool de workers de OCR em processos separados
+
+    Returns:
+        list: Processos iniciados
+    """
+    import multiprocessing
+
+    workers = workers or int(os.environ.get("TAREFO_OCR_QUEUE_WORKERS", "0")) or os.cpu_count() or 1
+    processes = []
+    for index in range(workers):
+        process = multiprocessing.Process(
+            target=_worker_process, args=(queue_path,), name=f"tarefo-ocr-worker-{index}", daemon=True
+        )
+        process.start()
+        processes.append(process)
+    print(f"🚀 {workers} worker(s) de OCR consumindo a fila")
+    return processes
+
+
+__all__ = [
+    'OCRJobQueue', 'get_ocr_queue', 'run_worker', 'start_worker_pool', 'default_priority',
+    'resolve_priority', 'PRIORITY_INTERACTIVE', 'PRIORITY_NORMAL', 'PRIORITY_BULK',
+]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Pool de workers da fila de OCR")
+    parser.add_argument("--workers", type=int, default=None, help="Processos do pool")
+    parser.add_argument("--queue", default=None, help="Caminho do banco SQLite da fila")
+    args = parser.parse_args()
+
+    pool = start_worker_pool(args.workers, args.queue)
+    try:
+        for process in pool:
+            process.join()
+    except KeyboardInterrupt:
+        print("\n👋 Encerrando workers de OCR")
+        for process in pool:
+            process.terminate()
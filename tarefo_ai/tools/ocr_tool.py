@@ -3,21 +3,120 @@ Ferramenta de OCR para o TarefoAI
 """
 import os
 import json
+import time
 from pathlib import Path
-from PIL import Image
-import base64
 
-# Esta ferramenta simula funcionalidade OCR sem dependências externas
-# Em um ambiente de produção, usaríamos bibliotecas como OpenCV, Tesseract, etc.
+from metrics import timed_tool
+
+# Intervalo máximo entre verificações de cancelamento/prazo no lote
+BATCH_POLL_SECONDS = 0.1
+
+# Tag do cache para resultados lidos da camada de texto de PDFs (sem OCR)
+TEXT_LAYER_CACHE_TAG = "text-layer"
+
+# O reconhecimento é delegado a um backend (tools/ocr_backends.py): Tesseract em
+# produção ou o stub determinístico em testes e desenvolvimento
 
 class OCRTool:
     """Ferramenta para extrair texto de imagens"""
     
-    def __init__(self):
+    def __init__(self, backend=None, cache=None, parallel_pages=True):
         # Configurações da ferramenta
         self.supported_formats = ['.jpg', '.jpeg', '.png', '.pdf']
         self.name = "OCR Tool"
         self.description = "Extração de texto e dados de imagens e documentos"
+        self._backend = backend
+        self._cache = cache
+        # Desligado nos processos do lote, que já ocupam todos os núcleos
+        self.parallel_pages = parallel_pages
+    
+    @property
+    def cache(self):
+        """Cache de resultados por hash do conteúdo (None se desativado)"""
+        if self._cache is None:
+            from .ocr_cache import get_ocr_cache
+            self._cache = get_ocr_cache() or False
+        return self._cache or None
+    
+    def _input_alias(self, image_path, extract_type, tag):
+        """
+        Apelido barato da entrada para o cache em memória
+        
+        Payloads base64 usam o hash do texto (sem decodificar); caminhos usam
+        caminho + mtime + tamanho (sem ler o arquivo).
+        """
+        from .ocr_cache import hash_bytes
+        
+        if isinstance(image_path, str) and image_path.startswith(('data:image', 'data:application')):
+            source = "b64:" + hash_bytes(image_path.encode("utf-8"))
+        elif isinstance(image_path, (bytes, bytearray, memoryview)):
+            source = "bytes:" + hash_bytes(image_path)
+        elif hasattr(image_path, "read"):
+            return None
+        else:
+            try:
+                st = os.stat(image_path)
+            except (OSError, TypeError, ValueError):
+                return None
+            source = f"path:{os.path.abspath(image_path)}:{st.st_mtime_ns}:{st.st_size}"
+        return f"{source}|{extract_type}|{tag}"
+    
+    def _cache_tags(self, pdf=True):
+        """
+        Tags do cache a consultar, sem exigir o backend de OCR
+        
+        Resultados lidos da camada de texto de PDFs não dependem do backend e usam
+        uma tag fixa; a tag do backend só entra se ele estiver disponível.
+        """
+        from .pdf_text import text_layer_enabled
+        
+        tags = [TEXT_LAYER_CACHE_TAG] if pdf and text_layer_enabled() else []
+        try:
+            tags.append(self.backend.cache_tag)
+        except RuntimeError:
+            # Backend indisponível: só a camada de texto pode ter sido usada
+            pass
+        return tags
+    
+    @property
+    def backend(self):
+        """Backend de OCR, criado no primeiro uso"""
+        if self._backend is None:
+            from .ocr_backends import get_backend
+            self._backend = get_backend()
+        return self._backend
+    
+    def read_document(self, image_path):
+        """
+        Lê o texto de cada página do documento
+        
+        PDFs digitais usam a camada de texto embutida, sem OCR; imagens e PDFs
+        digitalizados passam pelo backend (páginas em paralelo).
+        
+        Returns:
+            tuple: (lista com o texto de cada página, "text_layer" ou "ocr")
+        """
+        from .ocr_backends import is_pdf, recognize_document
+        
+        self._check_image_file(image_path)
+        if is_pdf(image_path):
+            from .pdf_text import read_text_layer
+            pages = read_text_layer(image_path)
+            if pages is not None:
+                print(f"📄 Texto lido da camada de texto do PDF: {image_path}")
+                return pages, "text_layer"
+        
+        print(f"🔍 Processando OCR na imagem: {image_path} (backend: {self.backend.name})")
+        return recognize_document(image_path, self.backend, parallel=self.parallel_pages), "ocr"
+    
+    def extract_pages(self, image_path):
+        """
+        Extrai o texto de cada página do documento
+        
+        Returns:
+            list: Texto de cada página, na ordem do documento
+        """
+        return self.read_document(image_path)[0]
     
     def _check_image_file(self, image_path):
         """Valida se o arquivo é uma imagem em formato suportado"""
@@ -41,16 +140,7 @@ class OCRTool:
             str: Texto extraído da imagem
         """
         try:
-            self._check_image_file(image_path)
-            
-            # Em produção, usaríamos algo como:
-            # return pytesseract.image_to_string(Image.open(image_path), lang='por')
-            
-            # Simulação para desenvolvimento
-            print(f"🔍 Processando OCR na imagem: {image_path}")
-            
-            # Retornamos um placeholder para desenvolvimento
-            return "[Texto extraído da imagem seria mostrado aqui]"
+            return "\n\n".join(self.extract_pages(image_path))
             
         except Exception as e:
             print(f"❌ Erro ao extrair texto: {str(e)}")
@@ -60,31 +150,27 @@ class OCRTool:
         """
         Processa um recibo para extrair informações estruturadas
         
+        Os campos saem do texto do OCR por regras (tools/receipt_parser.py). Com
+        confiança abaixo de TAREFO_RECEIPT_MIN_CONFIDENCE, o resultado vem com
+        needs_review=True para ser revisado pelo Document Processing Specialist.
+        
         Args:
             image_path: Caminho para o arquivo de imagem do recibo
             
         Returns:
             dict: Dados estruturados do recibo
         """
+        from .receipt_parser import min_confidence, parse_receipt
+        
         try:
-            self._check_image_file(image_path)
-            
-            # Em produção, usaríamos algoritmos específicos para recibos
             print(f"🧾 Processando recibo na imagem: {image_path}")
+            pages, source = self.read_document(image_path)
+            text = "\n".join(pages)
             
-            # Retornamos dados estruturados para desenvolvimento
-            receipt_data = {
-                "establishment": "",
-                "date": "",
-                "time": "",
-                "total": 0.0,
-                "items": [],
-                "payment_method": "",
-                "tax": 0.0
-            }
-            
-            # TODO: Implementar extração real dos dados
-            # receipt_data = extract_receipt_data(image_path)
+            receipt_data = parse_receipt(text)
+            receipt_data["needs_review"] = receipt_data["confidence"] < min_confidence()
+            receipt_data["text"] = text
+            receipt_data["text_source"] = source
             
             return receipt_data
             
@@ -92,6 +178,34 @@ class OCRTool:
             print(f"❌ Erro ao processar recibo: {str(e)}")
             return {"error": str(e)}
     
+    def process_invoice(self, image_path):
+        """
+        Processa uma NF-e (DANFE) para extrair chave de acesso e totais
+        
+        Args:
+            image_path: Caminho para o PDF ou imagem da DANFE
+            
+        Returns:
+            dict: Dados da nota (tools/invoice_parser.py), needs_review e a
+                origem do texto (text_layer ou ocr)
+        """
+        from .invoice_parser import parse_invoice
+        from .receipt_parser import min_confidence
+        
+        try:
+            print(f"🧾 Processando nota fiscal: {image_path}")
+            pages, source = self.read_document(image_path)
+            
+            invoice_data = parse_invoice("\n".join(pages))
+            invoice_data["needs_review"] = invoice_data["confidence"] < min_confidence()
+            invoice_data["text_source"] = source
+            
+            return invoice_data
+            
+        except Exception as e:
+            print(f"❌ Erro ao processar nota fiscal: {str(e)}")
+            return {"error": str(e)}
+    
     def extract_data_by_type(self, image_path, extract_type="full"):
         """
         Extrai dados de uma imagem com base no tipo de extração
@@ -107,49 +221,50 @@ class OCRTool:
             if extract_type == "receipt":
                 return self.process_receipt(image_path)
             elif extract_type == "invoice":
-                # TODO: Implementar processamento específico para faturas
-                return {"message": "Processamento de faturas não implementado ainda"}
+                return self.process_invoice(image_path)
             else:  # full
                 # Extração de texto completa
-                text = self.extract_text(image_path)
-                return {"text": text}
+                pages, source = self.read_document(image_path)
+                return {"text": "\n\n".join(pages), "pages": len(pages), "text_source": source}
                 
         except Exception as e:
             print(f"❌ Erro na extração de dados: {str(e)}")
             return {"error": str(e)}
     
-    def save_image_from_base64(self, base64_data, output_dir="uploads"):
+    def save_image_from_base64(self, base64_data, output_dir=None, max_bytes=None):
         """
-        Salva uma imagem a partir de dados base64
+        Salva uma imagem a partir de dados base64, bytes ou um arquivo aberto
+        
+        O conteúdo é decodificado em blocos direto para o disco e guardado no store
+        de uploads (tools/upload_store.py), em subdiretórios pelo hash; uploads
+        idênticos reaproveitam o mesmo arquivo.
         
         Args:
-            base64_data: String base64 da imagem
-            output_dir: Diretório para salvar a imagem
+            base64_data: Data URL/string base64, bytes ou objeto com read()
+                (binário ou texto base64)
+            output_dir: Diretório raiz dos uploads (padrão: TAREFO_UPLOAD_DIR/UPLOAD_DIR)
+            max_bytes: Tamanho máximo do arquivo decodificado
+                (padrão: TAREFO_UPLOAD_MAX_BYTES ou 25 MB)
             
         Returns:
-            str: Caminho do arquivo salvo
+            str: Caminho do arquivo salvo (None em caso de falha)
+            
+        Raises:
+            UnsupportedFormatError: Se o conteúdo não for JPEG, PNG ou PDF
         """
+        from .upload_store import UnsupportedFormatError, get_upload_store
+        
         try:
-            # Cria o diretório se não existir
-            os.makedirs(output_dir, exist_ok=True)
-            
-            # Remove o cabeçalho se houver (data:image/jpeg;base64,)
-            if ',' in base64_data:
-                base64_data = base64_data.split(',')[1]
-            
-            # Decodifica o base64
-            image_data = base64.b64decode(base64_data)
-            
-            # Gera um nome de arquivo único
-            file_path = os.path.join(output_dir, f"image_{os.urandom(8).hex()}.jpg")
-            
-            # Salva o arquivo
-            with open(file_path, 'wb') as f:
-                f.write(image_data)
-            
-            print(f"✅ Imagem salva em: {file_path}")
+            file_path, existed = get_upload_store(output_dir).put(base64_data, max_bytes)
+            if existed:
+                print(f"♻️ Upload já armazenado: {file_path}")
+            else:
+                print(f"✅ Imagem salva em: {file_path}")
             return file_path
             
+        except UnsupportedFormatError as e:
+            print(f"❌ Upload recusado: {e}")
+            raise
         except Exception as e:
             print(f"❌ Erro ao salvar imagem: {str(e)}")
             return None
@@ -166,12 +281,37 @@ class OCRTool:
             dict: Resultados da extração
         """
         try:
-            # Verifica se é uma string base64
-            if isinstance(image_path, str) and image_path.startswith(('data:image', 'data:application')):
+            cache = self.cache
+            aliases = {}
+            if cache is not None:
+                # Entrada repetida: resposta direta da memória, sem decodificar nem ler
+                for tag in self._cache_tags():
+                    aliases[tag] = alias = self._input_alias(image_path, extract_type, tag)
+                    key = cache.resolve(alias) if alias else None
+                    cached = cache.get(key) if key else None
+                    if cached is not None:
+                        return cached
+            
+            # Verifica se é uma string base64, bytes ou um arquivo aberto
+            if (isinstance(image_path, str) and image_path.startswith(('data:image', 'data:application'))) \
+                    or isinstance(image_path, (bytes, bytearray, memoryview)) or hasattr(image_path, "read"):
                 image_path = self.save_image_from_base64(image_path)
                 if not image_path:
                     return {"error": "Falha ao processar dados da imagem"}
             
+            content_hash = None
+            if cache is not None and os.path.exists(image_path):
+                from .ocr_backends import is_pdf
+                from .ocr_cache import hash_file, make_key
+                content_hash = hash_file(image_path)
+                for tag in self._cache_tags(pdf=is_pdf(image_path)):
+                    key = make_key(content_hash, extract_type, tag)
+                    cached = cache.get(key)
+                    if cached is not None:
+                        if aliases.get(tag):
+                            cache.alias(aliases[tag], key)
+                        return cached
+            
             # Executa a extração apropriada
             result = self.extract_data_by_type(image_path, extract_type)
             
@@ -179,16 +319,263 @@ class OCRTool:
             result["processed_by"] = self.name
             result["extract_type"] = extract_type
             
+            if content_hash and "error" not in result:
+                if result.get("text_source") == "text_layer":
+                    tag = TEXT_LAYER_CACHE_TAG
+                else:
+                    tag = self.backend.cache_tag
+                key = make_key(content_hash, extract_type, tag)
+                cache.set(key, result)
+                if aliases.get(tag):
+                    cache.alias(aliases[tag], key)
+            
             return result
             
         except Exception as e:
             print(f"❌ Erro ao executar ferramenta OCR: {str(e)}")
             return {"error": str(e), "processed_by": self.name}
 
+    def iter_pages(self, image_path, extract_type="full"):
+        """
+        Extrai o documento página a página, entregando cada página assim que fica pronta
+        
+        PDFs digitais são lidos pela camada de texto (páginas sem texto passam pelo
+        OCR); imagens e PDFs digitalizados são rasterizados e reconhecidos uma página
+        por vez. A memória não cresce com o número de páginas.
+        
+        Args:
+            image_path: Caminho, dados base64 ou bytes do documento
+            extract_type: Tipo de extração (full, receipt, invoice); em receipt e
+                invoice, cada página traz também os campos extraídos
+            
+        Yields:
+            dict: page (a partir de 1), pages, text, text_source e, se for o caso,
+                fields; em caso de falha, um último dict com error
+        """
+        from .ocr_backends import default_language, is_pdf, iter_document
+        
+        try:
+            if not isinstance(image_path, (str, os.PathLike)) or str(image_path).startswith('data:'):
+                image_path = self.save_image_from_base64(image_path)
+                if not image_path:
+                    raise ValueError("Falha ao processar dados da imagem")
+            self._check_image_file(image_path)
+            
+            texts = first = None
+            if is_pdf(image_path):
+                from .pdf_text import iter_pdf_text, page_has_text, pdf_page_count, text_layer_enabled
+                if text_layer_enabled():
+                    try:
+                        texts = iter_pdf_text(image_path)
+                        first = next(texts, None) if texts is not None else None
+                    except Exception as e:
+                        print(f"⚠️ Não foi possível ler o texto do PDF {image_path}: {e}")
+            
+            if first is None or not page_has_text(first):
+                # Imagem ou PDF digitalizado: OCR página a página (em paralelo, com janela)
+                print(f"🔍 Processando OCR por página: {image_path} (backend: {self.backend.name})")
+                total = self.backend.page_count(image_path)
+                for index, text in iter_document(image_path, self.backend, parallel=self.parallel_pages):
+                    yield self._page_result(index, total, text, "ocr", extract_type)
+                return
+            
+            # PDF digital: o backend de OCR só é criado se alguma página for digitalizada
+            print(f"📄 Lendo a camada de texto do PDF por página: {image_path}")
+            total = pdf_page_count(image_path)
+            lang = default_language()
+            yield self._page_result(0, total, first, "text_layer", extract_type)
+            for index, text in enumerate(texts, start=1):
+                source = "text_layer"
+                if not page_has_text(text):
+                    # Página digitalizada dentro de um PDF digital
+                    text, source = self.backend.recognize_page(image_path, index, lang), "ocr"
+                yield self._page_result(index, total, text, source, extract_type)
+                
+        except Exception as e:
+            print(f"❌ Erro na extração por página: {str(e)}")
+            yield {"error": str(e), "processed_by": self.name}
+    
+    def _page_result(self, index, total, text, source, extract_type):
+        """Resultado estruturado de uma página"""
+        result = {
+            "page": index + 1,
+            "pages": total,
+            "text": text,
+            "text_source": source,
+            "extract_type": extract_type,
+        }
+        if extract_type == "receipt":
+            from .receipt_parser import parse_receipt
+            result["fields"] = parse_receipt(text)
+        elif extract_type == "invoice":
+            from .invoice_parser import parse_invoice
+            result["fields"] = parse_invoice(text)
+        return result
+    
+    def run_batch(self, items, extract_type="full", max_workers=None, timeout=None, cancel_event=None):
+        """
+        Processa várias imagens em um pool de processos limitado
+        
+        Bytes e payloads base64 são gravados em disco antes do envio, e apenas o
+        caminho vai para o processo. No máximo max_workers itens ficam em
+        execução; o restante do iterável só é lido quando há vaga.
+        
+        Args:
+            items: Iterável de caminhos, bytes, payloads base64 ou arquivos abertos
+            extract_type: Tipo de extração (full, receipt, invoice)
+            max_workers (int): Processos do pool
+                (padrão: TAREFO_OCR_BATCH_WORKERS ou número de núcleos)
+            timeout (float): Tempo máximo de cada item em segundos
+                (padrão: TAREFO_OCR_ITEM_TIMEOUT; 0 ou ausente = sem limite)
+            cancel_event: threading.Event que, quando acionado, interrompe o lote
+            
+        Yields:
+            dict: {"index", "ok", "result"} ou {"index", "ok", "error"}, na ordem
+                de conclusão; um item com erro não interrompe o lote
+        """
+        from concurrent.futures import FIRST_COMPLETED, wait
+        
+        max_workers = max_workers or int(os.environ.get("TAREFO_OCR_BATCH_WORKERS", "0")) or os.cpu_count() or 1
+        if timeout is None:
+            timeout = float(os.environ.get("TAREFO_OCR_ITEM_TIMEOUT", "0")) or None
+        try:
+            backend = self.backend
+        except RuntimeError:
+            # Sem backend de OCR só os PDFs digitais são lidos; os demais itens falham
+            # um a um no processo do lote
+            backend = None
+        source = enumerate(items)
+        pending = {}  # future -> (índice, prazo, pool)
+        retired = []  # pools com um item vencido, aguardando os demais itens
+        exhausted = False
+        pool = _BatchPool(max_workers)
+        
+        try:
+            while True:
+                if cancel_event is not None and cancel_event.is_set():
+                    for future in sorted(pending, key=lambda f: pending[f][0]):
+                        future.cancel()
+                        yield {"index": pending[future][0], "ok": False, "error": "Cancelado"}
+                    return
+                
+                while not exhausted and len(pending) < max_workers:
+                    try:
+                        index, item = next(source)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    if isinstance(item, (str, os.PathLike)) and not str(item).startswith('data:'):
+                        path = os.fspath(item)
+                    else:
+                        try:
+                            path = self.save_image_from_base64(item)
+                        except ValueError as e:
+                            yield {"index": index, "ok": False, "error": str(e)}
+                            continue
+                        if not path:
+                            yield {"index": index, "ok": False, "error": "Falha ao processar dados da imagem"}
+                            continue
+                    deadline = time.monotonic() + timeout if timeout else None
+                    future = pool.executor.submit(_run_batch_item, backend, path, extract_type, self.supported_formats)
+                    pending[future] = (index, deadline, pool)
+                
+                if not pending:
+                    return
+                
+                # Acorda periodicamente para verificar cancelamento e prazos
+                deadlines = [deadline for _, deadline, _ in pending.values() if deadline]
+                wait_for = BATCH_POLL_SECONDS
+                if deadlines:
+                    wait_for = max(0.0, min(wait_for, min(deadlines) - time.monotonic()))
+                done, _ = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+                
+                for future in sorted(done, key=lambda f: pending[f][0]):
+                    index, _, _ = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        print(f"❌ Erro ao processar imagem {index} do lote: {e}")
+                        yield {"index": index, "ok": False, "error": str(e)}
+                        continue
+                    if "error" in result:
+                        yield {"index": index, "ok": False, "error": result["error"]}
+                    else:
+                        yield {"index": index, "ok": True, "result": result}
+                
+                now = time.monotonic()
+                expired = [f for f, (_, deadline, _) in pending.items() if deadline and deadline <= now]
+                for future in sorted(expired, key=lambda f: pending[f][0]):
+                    index, _, owner = pending.pop(future)
+                    yield {"index": index, "ok": False, "error": f"Tempo limite de {timeout}s excedido"}
+                    # O processo travado só é liberado encerrando o pool dele: os
+                    # itens novos vão para outro pool, e os que já estão em
+                    # execução no antigo continuam até terminar
+                    if owner is pool:
+                        retired.append(pool)
+                        pool = _BatchPool(max_workers)
+                
+                for old in [old for old in retired if not any(p is old for _, _, p in pending.values())]:
+                    old.close(terminate=True)
+                    retired.remove(old)
+        finally:
+            # Também executado quando o consumidor fecha o gerador no meio do lote
+            busy = {id(owner) for _, _, owner in pending.values()}
+            for old in retired + [pool]:
+                old.close(terminate=old in retired or id(old) in busy)
+
+class _BatchPool:
+    """
+    Pool de processos do lote que conhece os processos que criou
+    
+    O ProcessPoolExecutor não encerra um processo em execução; o contexto passado
+    em mp_context registra cada processo criado para que um item travado possa
+    ser encerrado sem depender dos atributos internos do executor.
+    """
+    
+    def __init__(self, max_workers):
+        from concurrent.futures import ProcessPoolExecutor
+        self.context = _TrackingContext()
+        self.executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=self.context)
+    
+    def close(self, terminate=False):
+        """Encerra o pool; com terminate, sem esperar pelos itens em execução"""
+        if not terminate:
+            self.executor.shutdown(wait=True)
+            return
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        for process in self.context.processes:
+            if process.is_alive():
+                process.terminate()
+        for process in self.context.processes:
+            process.join(1)
+
+class _TrackingContext:
+    """Contexto de multiprocessing que guarda os processos criados"""
+    
+    def __init__(self):
+        import multiprocessing
+        self._base = multiprocessing.get_context()
+        self.processes = []
+    
+    def Process(self, *args, **kwargs):
+        process = self._base.Process(*args, **kwargs)
+        self.processes.append(process)
+        return process
+    
+    def __getattr__(self, name):
+        return getattr(self._base, name)
+
+def _run_batch_item(backend, image_path, extract_type, supported_formats):
+    """Executa um item do lote no processo do pool"""
+    tool = OCRTool(backend=backend, parallel_pages=False)
+    tool.supported_formats = supported_formats
+    return tool.run(image_path, extract_type)
+
 # Cria uma instância da ferramenta para uso
 ocr_tool = OCRTool()
 
 # Função auxiliar para interface com o CrewAI
+@timed_tool("ocr")
 def process_image(image_path, extract_type="full"):
     """
     Processa uma imagem usando a ferramenta OCR
@@ -0,0 +1,136 @@
+"""
+Leitura da camada de texto de PDFs
+
+PDFs gerados digitalmente (como a maioria das DANFEs de NF-e) já trazem o texto
+embutido; lê-lo leva milissegundos, contra segundos de rasterização + OCR. Só os
+PDFs digitalizados, sem texto suficiente, precisam passar pelo OCR.
+
+A extração usa o pypdf; sem ele, o pdftotext do poppler (o mesmo pacote de que o
+pdf2image depende). Sem nenhum dos dois, o PDF é tratado como digitalizado.
+
+Variáveis de ambiente:
+    TAREFO_PDF_TEXT_LAYER=off       sempre usa o OCR
+    TAREFO_PDF_MIN_TEXT_CHARS       caracteres alfanuméricos por página para
+                                    considerar que há texto (padrão: 40)
+"""
+import os
+import shutil
+import subprocess
+
+# Tempo máximo do pdftotext
+PDFTOTEXT_TIMEOUT = 30
+
+
+def text_layer_enabled():
+    return os.environ.get("TAREFO_PDF_TEXT_LAYER", "on").lower() != "off"
+
+
+def _pypdf_pages(path):
+    from pypdf import PdfReader
+
+    reader = PdfReader(str(path))
+    return [page.extract_text() or "" for page in reader.pages]
+
+
+def _pdftotext_pages(path):
+    executable = shutil.which("pdftotext")
+    if executable is None:
+        return None
+    completed = subprocess.run(
+        [executable, "-layout", "-enc", "UTF-8", str(path), "-"],
+        capture_output=True,
+        timeout=PDFTOTEXT_TIMEOUT,
+        check=True,
+    )
+    # As páginas saem separadas por form feed
+    pages = completed.stdout.decode("utf-8", errors="replace").split("\f")
+    if len(pages) > 1 and not pages[-1].strip():
+        pages.pop()
+    return pages
+
+
+def extract_pdf_text(path):
+    """
+    Lê o texto embutido de cada página do PDF
+
+    Returns:
+        list: Texto de cada página, ou None se não houver leitor disponível
+    """
+    try:
+        return _pypdf_pages(path)
+    except ImportError:
+        pass
+    try:
+        return _pdftotext_pages(path)
+    except (OSError, subprocess.SubprocessError) as e:
+        print(f"⚠️ Falha ao ler o texto do PDF com pdftotext: {e}")
+        return None
+
+
+def iter_pdf_text(path):
+    """
+    Lê o texto embutido página a página, sem carregar o documento inteiro
+
+    Com o pypdf, cada página é lida só quando pedida; com o pdftotext, o texto é
+    extraído uma vez e devolvido por página.
+
+    Returns:
+        iterator: Texto de cada página, ou None se não houver leitor disponível
+    """
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        pages = extract_pdf_text(path)
+        return iter(pages) if pages is not None else None
+
+    reader = PdfReader(str(path))
+    return (page.extract_text() or "" for page in reader.pages)
+
+
+def pdf_page_count(path):
+    """Número de páginas do PDF pelo pypdf; sem ele, pela contagem de /Type /Page"""
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        from .ocr_backends import count_pdf_pages
+        return count_pdf_pages(path)
+    return len(PdfReader(str(path)).pages)
+
+
+def page_has_text(text):
+    """Indica se uma página tem texto suficiente para dispensar o OCR"""
+    min_chars = int(os.environ.get("TAREFO_PDF_MIN_TEXT_CHARS", "40"))
+    return sum(char.isalnum() for char in text or "") >= min_chars
+
+
+def has_text_layer(pages):
+    """Indica se as páginas têm texto suficiente para dispensar o OCR"""
+    if not pages:
+        return False
+    min_chars = int(os.environ.get("TAREFO_PDF_MIN_TEXT_CHARS", "40"))
+    chars = sum(sum(char.isalnum() for char in page) for page in pages)
+    return chars >= min_chars * len(pages)
+
+
+def read_text_layer(path):
+    """
+    Texto das páginas de um PDF digital
+
+    Returns:
+        list: Texto de cada página, ou None se o PDF for digitalizado (sem texto),
+            ilegível ou se a camada de texto estiver desativada
+    """
+    if not text_layer_enabled():
+        return None
+    try:
+        pages = extract_pdf_text(path)
+    except Exception as e:
+        print(f"⚠️ Não foi possível ler o texto do PDF {path}: {e}")
+        return None
+    return pages if has_text_layer(pages) else None
+
+
+__all__ = [
+    'extract_pdf_text', 'iter_pdf_text', 'pdf_page_count', 'page_has_text', 'has_text_layer',
+    'read_text_layer', 'text_layer_enabled'
+]
@@ -0,0 +1,223 @@
+"""
+Detecção de dados pessoais nos valores de texto
+
+Procura CPF e CNPJ (com dígitos verificadores conferidos), números de cartão
+(prefixo de bandeira + Luhn), telefones brasileiros e e-mails em qualquer texto,
+independentemente do nome do campo: um CPF guardado em `"notes"` também é achado.
+
+Para ficar no caminho de toda verificação de conformidade, a busca é feita em
+poucas passadas sobre o texto:
+
+- e-mails só são procurados ao redor de cada `@`, localizado com `str.find`;
+- números são achados por uma única expressão de sequências de dígitos e
+  separadores, e só os candidatos com a quantidade certa de dígitos passam pela
+  validação completa;
+- várias strings são unidas em um único buffer (`scan_strings`), e o buffer só é
+  percorrido pela expressão de números se tiver algum dígito.
+
+Os valores encontrados são devolvidos mascarados.
+"""
+import re
+from bisect import bisect_right
+from itertools import accumulate
+
+from .br_documents import cnpj_is_valid, cpf_is_valid
+
+# Sequências de dígitos com separadores comuns (123.456.789-09, (11) 98765-4321,
+# 4111 1111 1111 1111); a classificação é feita pelo número de dígitos
+NUMBER_PATTERN = re.compile(r"[0-9][0-9 .()/-]{7,40}[0-9]")
+NON_DIGIT_PATTERN = re.compile(r"[^0-9]")
+TOKEN_PATTERN = re.compile(r"[^ ]+")
+
+# Formatos aceitos de cada tipo, conferidos antes dos dígitos verificadores (o DDD
+# do telefone é comparado sem os parênteses)
+CPF_SHAPE = re.compile(r"[0-9]{3}\.?[0-9]{3}\.?[0-9]{3}-?[0-9]{2}")
+CNPJ_SHAPE = re.compile(r"[0-9]{2}\.?[0-9]{3}\.?[0-9]{3}/?[0-9]{4}-?[0-9]{2}")
+CARD_SHAPE = re.compile(
+    r"[0-9]{13,19}|[0-9]{4}(?:([ -])[0-9]{4}){2}(?:\1[0-9]{4})?(?:\1[0-9]{1,3})?|[0-9]{4}([ -])[0-9]{6}\2[0-9]{4,5}"
+)
+PHONE_SHAPE = re.compile(
+    r"(?:\+?55[ -]?)?[1-9]{2}[ -]?(?:9[ .-]?[0-9]{4}|[2-5][0-9]{3})[ .-]?[0-9]{4}"
+)
+EMAIL_PATTERN = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}")
+
+# Tamanho máximo da parte local e do domínio de um e-mail (RFC 5321)
+EMAIL_LOCAL_MAX = 64
+EMAIL_DOMAIN_MAX = 255
+
+# Primeiro dígito das bandeiras de cartão (Visa, Master, Amex, Diners, Elo, Hipercard...)
+CARD_PREFIXES = frozenset("23456")
+
+# Separa as strings unidas por scan_strings; não é dígito, separador de número
+# nem parte de e-mail, então nenhuma ocorrência atravessa duas strings
+STRING_SEPARATOR = "\x00"
+
+DIGITS = "0123456789"
+PII_TYPES = ("cpf", "cnpj", "credit_card", "phone", "email")
+
+
+def luhn_is_valid(digits):
+    """Confere o dígito verificador de Luhn de um número de cartão"""
+    total = 0
+    for index, digit in enumerate(reversed(digits)):
+        n = ord(digit) - 48
+        if index % 2:
+            n *= 2
+            if n > 9:
+                n -= 9
+        total += n
+    return total % 10 == 0
+
+
+def classify_number(candidate):
+    """
+    Tipo do número candidato, conferindo o formato e os dígitos verificadores
+
+    Args:
+        candidate: Trecho com dígitos e separadores
+
+    Returns:
+        str: cpf, cnpj, credit_card, phone ou None
+    """
+    digits = NON_DIGIT_PATTERN.sub("", candidate)
+    length = len(digits)
+    # O número de dígitos descarta a maior parte dos candidatos sem nenhuma validação
+    if length == 11 and CPF_SHAPE.fullmatch(candidate) and cpf_is_valid(digits):
+        return "cpf"
+    if length == 14 and CNPJ_SHAPE.fullmatch(candidate) and cnpj_is_valid(digits):
+        return "cnpj"
+    if (13 <= length <= 19 and digits[0] in CARD_PREFIXES and CARD_SHAPE.fullmatch(candidate)
+            and luhn_is_valid(digits)):
+        return "credit_card"
+    if 10 <= length <= 13 and PHONE_SHAPE.fullmatch(candidate.replace("(", "").replace(")", "")):
+        # Fixos sem nenhum separador são indistinguíveis de outros códigos de 10 dígitos
+        if candidate != digits or length != 10:
+            return "phone"
+    return None
+
+
+def mask_value(value):
+    """Mascara um valor encontrado, mantendo só o final"""
+    if "@" in value:
+        local, _, domain = value.partition("@")
+        return f"{local[:1]}***@{domain}"
+    keep = 2 if len(value) <= 14 else 4
+    return "*" * (len(value) - keep) + value[-keep:]
+
+
+def _iter_emails(text):
+    at = text.find("@")
+    while at != -1:
+        match = EMAIL_PATTERN.search(text, max(0, at - EMAIL_LOCAL_MAX), at + EMAIL_DOMAIN_MAX)
+        if match and match.start() <= at < match.end():
+            yield match.start(), match.end()
+            at = text.find("@", match.end())
+        else:
+            at = text.find("@", at + 1)
+
+
+def _iter_numbers(text):
+    for match in NUMBER_PATTERN.finditer(text):
+        candidate = match.group()
+        pii_type = classify_number(candidate)
+        if pii_type is not None:
+            yield pii_type, match.start(), match.end()
+        elif " " in candidate:
+            # Números vizinhos ("123.456.789-09 (11) 98765-4321") viram um candidato só
+            yield from _split_candidate(candidate, match.start())
+
+
+def _split_candidate(candidate, offset):
+    """Procura, da esquerda para a direita, o menor trecho de palavras que é um dado pessoal"""
+    tokens = [(token.start(), token.end()) for token in TOKEN_PATTERN.finditer(candidate)]
+    first = 0
+    while first < len(tokens):
+        for last in range(first, len(tokens)):
+            start, end = tokens[first][0], tokens[last][1]
+            pii_type = classify_number(candidate[start:end].strip("()"))
+            if pii_type is not None:
+                yield pii_type, offset + start, offset + end
+                first = last + 1
+                break
+        else:
+            first += 1
+
+
+def _has_digit(text):
+    return any(digit in text for digit in DIGITS)
+
+
+def detect_pii(text):
+    """
+    Procura dados pessoais em um texto
+
+    Args:
+        text: Texto a ser verificado
+
+    Returns:
+        list: {"type", "value" (mascarado), "start", "end"} na ordem do texto
+    """
+    hits = []
+    if not text:
+        return hits
+    if "@" in text:
+        for start, end in _iter_emails(text):
+            hits.append({"type": "email", "value": mask_value(text[start:end]), "start": start, "end": end})
+    if _has_digit(text):
+        for pii_type, start, end in _iter_numbers(text):
+            hits.append({"type": pii_type, "value": mask_value(text[start:end]), "start": start, "end": end})
+    hits.sort(key=lambda hit: hit["start"])
+    return hits
+
+
+def scan_strings(strings):
+    """
+    Procura dados pessoais em várias strings de uma vez
+
+    As strings são unidas em um único buffer, percorrido uma vez por cada
+    detector; as posições são convertidas de volta para o índice de cada string.
+
+    Args:
+        strings: Sequência de textos
+
+    Returns:
+        list: (índice da string, {"type", "value", "start", "end"}) na ordem das strings
+    """
+    strings = strings if isinstance(strings, list) else list(strings)
+    if not strings:
+        return []
+    buffer = STRING_SEPARATOR.join(map(str, strings))
+    hits = detect_pii(buffer)
+    if not hits:
+        return []
+
+    results = []
+    if buffer.count(STRING_SEPARATOR) == len(strings) - 1:
+        # O separador só aparece entre as strings: o índice é a contagem de
+        # separadores antes de cada ocorrência, feita de forma incremental
+        index, position, base = 0, 0, 0
+        for hit in hits:
+            skipped = buffer.count(STRING_SEPARATOR, position, hit["start"])
+            if skipped:
+                index += skipped
+                base = buffer.rfind(STRING_SEPARATOR, position, hit["start"]) + 1
+            position = hit["start"]
+            hit["start"] -= base
+            hit["end"] -= base
+            results.append((index, hit))
+        return results
+
+    # Alguma string contém o separador: usa a tabela de posições
+    offsets = list(accumulate((len(str(text)) + 1 for text in strings[:-1]), initial=0))
+    for hit in hits:
+        index = bisect_right(offsets, hit["start"]) - 1
+        hit["start"] -= offsets[index]
+        hit["end"] -= offsets[index]
+        results.append((index, hit))
+    return results
+
+
+__all__ = [
+    'detect_pii', 'scan_strings', 'classify_number', 'cpf_is_valid', 'luhn_is_valid', 'mask_value',
+    'PII_TYPES'
+]
@@ -0,0 +1,228 @@
+"""
+Extração determinística de campos de recibos brasileiros
+
+Lê o texto do OCR de cupons fiscais / NFC-e e extrai estabelecimento, data, hora,
+total, tributos, CNPJ, forma de pagamento e itens com expressões regulares
+pré-compiladas. Cada recibo recebe uma confiança entre 0 e 1; só os recibos com
+confiança baixa precisam passar pelo Document Processing Specialist (LLM).
+
+Variáveis de ambiente:
+    TAREFO_RECEIPT_MIN_CONFIDENCE   confiança mínima para dispensar o LLM (padrão: 0.6)
+"""
+import os
+import re
+import unicodedata
+from datetime import date
+
+from .br_documents import cnpj_is_valid, format_cnpj
+
+# Valores monetários: 1.234,56 | 1234,56 | 24.90 (OCR às vezes troca a vírgula)
+AMOUNT = r"(?<![\d.,])(\d{1,3}(?:\.\d{3})+,\d{2}|\d+[,.]\d{2})(?![\d.,]?\d)"
+
+CNPJ_PATTERN = re.compile(r"(?<!\d)(\d{2})\.?(\d{3})\.?(\d{3})\s?/?\s?(\d{4})\s?-?\s?(\d{2})(?!\d)")
+CNPJ_LABEL_PATTERN = re.compile(r"CNPJ", re.IGNORECASE)
+DATE_PATTERN = re.compile(r"(?<!\d)(\d{2})[/.-](\d{2})[/.-](\d{4}|\d{2})(?!\d)")
+TIME_PATTERN = re.compile(r"(?<![\d:])([01]\d|2[0-3]):([0-5]\d)(?::([0-5]\d))?(?![\d:])")
+
+# Linhas de total, da mais para a menos específica
+TOTAL_PATTERNS = (
+    re.compile(r"(?:VALOR\s+(?:TOTAL|A\s+PAGAR|PAGO)|TOTAL\s+A\s+PAGAR)\s*(?:R\$)?\s*:?\s*" + AMOUNT, re.IGNORECASE),
+    re.compile(r"(?<!SUB-)(?<!SUB )\bTOTAL\b(?!\s+(?:DE\s+ITENS|DOS\s+TRIBUTOS))[^\d\n]{0,12}" + AMOUNT, re.IGNORECASE),
+)
+TAX_PATTERNS = (
+    re.compile(r"TRIB(?:UTOS|\.)?[^\n]*?(?:R\$)?\s*" + AMOUNT + r"(?!\s*%)", re.IGNORECASE),
+    re.compile(r"(?:IMPOSTOS|ICMS)[^\n]*?(?:R\$)?\s*" + AMOUNT + r"(?!\s*%)", re.IGNORECASE),
+)
+
+# Item de NFC-e: 001 7891234567890 DESCRICAO 2 UN X 4,99 9,98
+ITEM_PATTERN = re.compile(
+    r"^[ \t]*(?:\d{1,3}[ \t]+)?(?:\d{4,14}[ \t]+)?"
+    r"(?P<description>[A-Za-zÀ-ÿ][^\n]*?)[ \t]+"
+    r"(?P<quantity>\d+(?:[,.]\d{1,3})?)[ \t]*(?P<unit>UN|UND|KG|G|L|LT|ML|CX|PC|PCT|M)?[ \t]*[xX*][ \t]*"
+    r"(?P<unit_price>\d+[,.]\d{2})[ \t]+(?P<total>\d+[,.]\d{2})[ \t]*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+# Formas de pagamento, da mais para a menos específica (texto sem acentos)
+PAYMENT_PATTERNS = (
+    ("credit_card", re.compile(r"CART[AO]{1,2}\s+(?:DE\s+)?CREDITO|\bCREDITO\b", re.IGNORECASE)),
+    ("debit_card", re.compile(r"CART[AO]{1,2}\s+(?:DE\s+)?DEBITO|\bDEBITO\b", re.IGNORECASE)),
+    ("pix", re.compile(r"\bPIX\b", re.IGNORECASE)),
+    ("meal_voucher", re.compile(r"VALE[\s-]+(?:REFEICAO|ALIMENTACAO)|\b(?:TICKET|SODEXO|ALELO|VR\s+BENEFICIOS)\b", re.IGNORECASE)),
+    ("cash", re.compile(r"\bDINHEIRO\b", re.IGNORECASE)),
+)
+
+# Linhas do cabeçalho que não são o nome do estabelecimento
+HEADER_NOISE_PATTERN = re.compile(
+    r"CNPJ|\bIE\b|INSCRI|CUPOM|NFC-?E|DOCUMENTO|AUXILIAR|EXTRATO|CONSUMIDOR|SAT\b|"
+    r"\bRUA\b|\bAV\.?\b|AVENIDA|ROD\.?|ENDERE|\bCEP\b|BAIRRO|FONE|TEL\b|\d{5}-?\d{3}",
+    re.IGNORECASE,
+)
+COMPANY_SUFFIX_PATTERN = re.compile(r"\b(?:LTDA|EIRELI|S\.?/?A\.?|ME|EPP|MEI)\b", re.IGNORECASE)
+LETTERS_PATTERN = re.compile(r"[A-Za-zÀ-ÿ]{3,}")
+
+# Peso de cada campo na confiança (soma 1.0)
+FIELD_WEIGHTS = {
+    "total": 0.35,
+    "date": 0.2,
+    "establishment": 0.15,
+    "cnpj": 0.15,
+    "items": 0.1,
+    "payment_method": 0.05,
+}
+
+# Linhas do cabeçalho consideradas para o nome do estabelecimento
+HEADER_LINES = 6
+
+
+def min_confidence():
+    """Confiança mínima para aceitar a extração sem o LLM"""
+    return float(os.environ.get("TAREFO_RECEIPT_MIN_CONFIDENCE", "0.6"))
+
+
+def parse_amount(value):
+    """Converte '1.234,56' ou '24.90' em float"""
+    if "," in value:
+        value = value.replace(".", "").replace(",", ".")
+    return round(float(value), 2)
+
+
+def _strip_accents(text):
+    return "".join(
+        char for char in unicodedata.normalize("NFKD", text) if not unicodedata.combining(char)
+    )
+
+
+def _find_cnpj(text):
+    """CNPJ válido, preferindo o que aparece na linha com o rótulo CNPJ"""
+    candidates = []
+    for line in text.splitlines():
+        for match in CNPJ_PATTERN.finditer(line):
+            digits = "".join(match.groups())
+            if cnpj_is_valid(digits):
+                candidates.append((not CNPJ_LABEL_PATTERN.search(line), digits))
+    if not candidates:
+        return ""
+    return format_cnpj(min(candidates, key=lambda c: c[0])[1])
+
+
+def find_date(text):
+    """Primeira data válida (dd/mm/aaaa ou dd/mm/aa) em formato ISO"""
+    for match in DATE_PATTERN.finditer(text):
+        day, month, year = (int(part) for part in match.groups())
+        if year < 100:
+            year += 2000
+        try:
+            return date(year, month, day).isoformat()
+        except ValueError:
+            continue
+    return ""
+
+
+def _find_time(text):
+    match = TIME_PATTERN.search(text)
+    if not match:
+        return ""
+    hour, minute, second = match.groups()
+    return f"{hour}:{minute}:{second}" if second else f"{hour}:{minute}"
+
+
+def _find_amount(text, patterns):
+    for pattern in patterns:
+        matches = pattern.findall(text)
+        if matches:
+            # A última ocorrência costuma ser o valor final (após descontos)
+            return parse_amount(matches[-1])
+    return 0.0
+
+
+def _find_establishment(lines):
+    """Nome do estabelecimento a partir das primeiras linhas do cabeçalho"""
+    candidates = []
+    for position, line in enumerate(lines[:HEADER_LINES]):
+        line = line.strip()
+        if not line or HEADER_NOISE_PATTERN.search(line) or not LETTERS_PATTERN.search(line):
+            continue
+        # Razão social (LTDA, S/A...) tem prioridade; depois, a primeira linha válida
+        candidates.append((not COMPANY_SUFFIX_PATTERN.search(line), position, line))
+    if not candidates:
+        return ""
+    # Remove o ruído de OCR nas bordas (~~, .., **)
+    return " ".join(min(candidates)[2].split()).strip(" .,~*=_-#|")
+
+
+def _find_payment_method(plain_text):
+    for method, pattern in PAYMENT_PATTERNS:
+        if pattern.search(plain_text):
+            return method
+    return ""
+
+
+def _find_items(text):
+    items = []
+    for match in ITEM_PATTERN.finditer(text):
+        description = " ".join(match.group("description").split())
+        if HEADER_NOISE_PATTERN.search(description):
+            continue
+        items.append({
+            "description": description,
+            "quantity": float(match.group("quantity").replace(",", ".")),
+            "unit": (match.group("unit") or "").upper(),
+            "unit_price": parse_amount(match.group("unit_price")),
+            "total": parse_amount(match.group("total")),
+        })
+    return items
+
+
+def receipt_confidence(receipt):
+    """
+    Confiança da extração (0 a 1)
+
+    Soma os pesos dos campos encontrados. Os itens só contam inteiros quando a soma
+    deles bate com o total; caso contrário, contam pela metade.
+    """
+    score = 0.0
+    for field, weight in FIELD_WEIGHTS.items():
+        value = receipt.get(field)
+        if not value:
+            continue
+        if field == "items" and receipt.get("total"):
+            items_total = round(sum(item["total"] for item in value), 2)
+            if abs(items_total - receipt["total"]) > 0.05:
+                weight /= 2
+        score += weight
+    return round(score, 2)
+
+
+def parse_receipt(text):
+    """
+    Extrai os campos de um recibo a partir do texto do OCR
+
+    Args:
+        text (str): Texto reconhecido
+
+    Returns:
+        dict: establishment, cnpj, date (ISO), time, total, tax, items,
+            payment_method e confidence
+    """
+    text = text or ""
+    lines = [line for line in text.splitlines() if line.strip()]
+    plain_text = _strip_accents(text)
+    receipt = {
+        "establishment": _find_establishment(lines),
+        "cnpj": _find_cnpj(text),
+        "date": find_date(text),
+        "time": _find_time(text),
+        "total": _find_amount(plain_text, TOTAL_PATTERNS),
+        "items": _find_items(text),
+        "payment_method": _find_payment_method(plain_text),
+        "tax": _find_amount(plain_text, TAX_PATTERNS),
+    }
+    receipt["confidence"] = receipt_confidence(receipt)
+    return receipt
+
+
+__all__ = [
+    'parse_receipt', 'receipt_confidence', 'min_confidence', 'parse_amount',
+    'cnpj_is_valid', 'format_cnpj', 'find_date', 'FIELD_WEIGHTS'
+]
@@ -0,0 +1,148 @@
+"""
+Busca de campos sensíveis em payloads aninhados
+
+Percorre dicts e listas uma única vez, sem serializar o payload, e compara o nome
+de cada campo com os tipos sensíveis por uma única expressão regular compilada. A
+comparação é feita por tokens: o nome é quebrado em `_`, `-`, `.`, espaços e
+camelCase, então `user_id` e `userId` contêm `id`, mas `video` e `idade` não.
+Valores de texto que são exatamente o nome de um tipo (como em
+`"data_types": ["cpf", "health"]`) também contam.
+
+Cada ocorrência é devolvida com o caminho do campo, como `users[3].documents.cpf`.
+"""
+import re
+
+# Caminhos devolvidos por varredura; os tipos continuam sendo contados depois disso
+MAX_REPORTED_PATHS = 100
+
+# Nomes de campos normalizados guardados por scanner
+KEY_CACHE_SIZE = 4096
+
+_CAMEL_PATTERN = re.compile(r"(?<=[a-z0-9])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])")
+_SEPARATOR_PATTERN = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_name(name):
+    """Converte um nome de campo em tokens minúsculos separados por `_`"""
+    name = _CAMEL_PATTERN.sub("_", str(name)).lower()
+    return _SEPARATOR_PATTERN.sub("_", name).strip("_")
+
+
+class SensitiveScanner:
+    """Localiza campos sensíveis em uma estrutura de dicts e listas"""
+
+    def __init__(self, sensitive_types):
+        self.sensitive_types = list(sensitive_types)
+        self._terms = {normalize_name(data_type): data_type for data_type in self.sensitive_types}
+        # Termos mais longos primeiro, para `credit_card` ganhar de `card`
+        alternation = "|".join(
+            re.escape(term) for term in sorted(self._terms, key=len, reverse=True) if term
+        )
+        self._pattern = re.compile(rf"(?:^|_)({alternation})(?=_|$)") if alternation else None
+        self._order = {data_type: index for index, data_type in enumerate(self.sensitive_types)}
+        # Grafias aceitas para valores que nomeiam um tipo ("cpf", "CPF", "credit-card"...):
+        # uma consulta ao dict, sem normalizar cada texto do payload
+        self._value_terms = {}
+        for term, data_type in self._terms.items():
+            for separator in ("_", "-", " "):
+                spelled = term.replace("_", separator)
+                for variant in (spelled, spelled.upper(), spelled.title(), spelled.capitalize()):
+                    self._value_terms[variant] = data_type
+        self._key_cache = {}
+
+    def match_key(self, key):
+        """
+        Tipos sensíveis presentes nos tokens de um nome de campo
+
+        Returns:
+            tuple: Tipos encontrados (vazio se nenhum)
+        """
+        cached = self._key_cache.get(key)
+        if cached is not None:
+            return cached
+        found = ()
+        if self._pattern is not None:
+            normalized = normalize_name(key)
+            found = tuple(dict.fromkeys(
+                self._terms[match.group(1)] for match in self._pattern.finditer(normalized)
+            ))
+        if len(self._key_cache) >= KEY_CACHE_SIZE:
+            self._key_cache.clear()
+        self._key_cache[key] = found
+        return found
+
+    def match_value(self, value):
+        """Tipo sensível que o valor de texto nomeia por inteiro, ou None"""
+        return self._value_terms.get(value)
+
+    def scan(self, data, max_paths=MAX_REPORTED_PATHS, strings=None):
+        """
+        Percorre o payload uma vez e registra os campos sensíveis
+
+        Args:
+            data: Dict, lista ou valor escalar
+            max_paths: Máximo de caminhos devolvidos
+            strings: Lista opcional que recebe (pai, chave, texto) de cada valor de
+                texto, para a busca de dados pessoais nos valores (pii_detector);
+                format_path((pai, chave)) dá o caminho
+
+        Returns:
+            tuple: (tipos encontrados na ordem de sensitive_types,
+                lista de {"path", "type"})
+        """
+        found = set()
+        hits = []
+        # Pilha explícita: payloads muito aninhados não esbarram no limite de recursão.
+        # O caminho é guardado como (pai, trecho) e só vira texto quando há ocorrência.
+        stack = [(data, None)]
+        match_key = self.match_key
+        value_terms = self._value_terms
+        collect = strings.append if strings is not None else None
+
+        while stack:
+            node, path = stack.pop()
+            if isinstance(node, dict):
+                for key, value in node.items():
+                    data_types = match_key(key)
+                    if data_types:
+                        found.update(data_types)
+                        for data_type in data_types:
+                            if len(hits) < max_paths:
+                                hits.append({"path": format_path((path, key)), "type": data_type})
+                    if isinstance(value, str):
+                        data_type = value_terms.get(value)
+                        if data_type is not None:
+                            found.add(data_type)
+                            if len(hits) < max_paths:
+                                hits.append({"path": format_path((path, key)), "type": data_type})
+                        if collect:
+                            collect((path, key, value))
+                    elif isinstance(value, (dict, list, tuple)):
+                        stack.append((value, (path, key)))
+            elif isinstance(node, (list, tuple)):
+                for index, value in enumerate(node):
+                    if isinstance(value, str):
+                        data_type = value_terms.get(value)
+                        if data_type is not None:
+                            found.add(data_type)
+                            if len(hits) < max_paths:
+                                hits.append({"path": format_path((path, index)), "type": data_type})
+                        if collect:
+                            collect((path, index, value))
+                    elif isinstance(value, (dict, list, tuple)):
+                        stack.append((value, (path, index)))
+
+        hits.sort(key=lambda hit: hit["path"])
+        return sorted(found, key=self._order.__getitem__), hits
+
+
+def format_path(path):
+    """Converte o caminho guardado por scan em texto, como `users[3].cpf`"""
+    parts = []
+    while path is not None:
+        path, part = path
+        parts.append(f"[{part}]" if isinstance(part, int) else f".{part}")
+    return "".join(reversed(parts)).lstrip(".")
+
+
+__all__ = ['SensitiveScanner', 'normalize_name', 'format_path', 'MAX_REPORTED_PATHS']
@@ -8,6 +8,8 @@ import logging
 from pathlib import Path
 import time
 
+from metrics import timed_tool
+
 # Configuração de logging
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -228,6 +230,7 @@ class TelegramTool:
 telegram_tool = TelegramTool()
 
 # Função auxiliar para interface com o CrewAI
+@timed_tool("telegram", action_arg=True)
 def telegram_action(action, **kwargs):
     """
     Executa uma ação no Telegram
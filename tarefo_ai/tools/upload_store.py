@@ -0,0 +1,464 @@
+"""
+Armazenamento de uploads endereçado por conteúdo
+
+Os arquivos recebidos (base64, bytes ou streams) são gravados em
+uploads/<aa>/<bb>/<sha256><ext>, com dois níveis de subdiretórios pelo prefixo do
+hash, para que nenhum diretório acumule centenas de milhares de arquivos. Uploads
+idênticos apontam para o mesmo arquivo. Um índice SQLite guarda tamanho, criação e
+último uso de cada arquivo, e uma thread em segundo plano apaga os que passaram do
+TTL (incluindo os image_<hex>.* antigos, do diretório plano). Uma única thread
+faz a limpeza de todos os stores criados por get_upload_store.
+
+Só são aceitos os formatos que o OCR lê (JPEG, PNG e PDF); outros conteúdos (GIF,
+TIFF, WebP ou não identificados) são recusados com UnsupportedFormatError.
+
+Variáveis de ambiente:
+    TAREFO_UPLOAD_DIR               diretório raiz (padrão: UPLOAD_DIR do config)
+    TAREFO_UPLOAD_MAX_BYTES         tamanho máximo de um upload (padrão: 25 MB)
+    TAREFO_UPLOAD_TTL               validade desde o último uso, em segundos
+                                    (padrão: 86400; 0 = nunca expira)
+    TAREFO_UPLOAD_SWEEP_INTERVAL    intervalo da limpeza em segundos
+                                    (padrão: 600; 0 = sem thread de limpeza)
+"""
+import io
+import os
+import time
+import base64
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+
+from config.config import UPLOAD_DIR
+
+INDEX_NAME = "index.sqlite3"
+TMP_DIR_NAME = "tmp"
+
+# Arquivos temporários abandonados (ex.: processo encerrado no meio da gravação)
+TMP_MAX_AGE = 3600
+
+# Tamanho máximo padrão de um upload decodificado
+DEFAULT_UPLOAD_MAX_BYTES = 25 * 1024 * 1024
+
+# Tamanho dos blocos de leitura/decodificação (múltiplo de 4 para o base64)
+UPLOAD_CHUNK_SIZE = 256 * 1024
+
+# Formatos lidos pelo OCR (OCRTool.supported_formats)
+SUPPORTED_EXTENSIONS = (".jpg", ".png", ".pdf")
+
+# Assinaturas (magic bytes) dos formatos reconhecidos
+MAGIC_EXTENSIONS = (
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"%PDF", ".pdf"),
+    (b"GIF87a", ".gif"),
+    (b"GIF89a", ".gif"),
+    (b"II*\x00", ".tiff"),
+    (b"MM\x00*", ".tiff"),
+)
+
+MIME_EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/jpg": ".jpg",
+    "image/png": ".png",
+    "application/pdf": ".pdf",
+}
+
+_BASE64_WHITESPACE = str.maketrans("", "", " \t\r\n")
+
+
+class UnsupportedFormatError(ValueError):
+    """Upload em um formato que o OCR não lê"""
+
+    def __init__(self, extension):
+        self.extension = extension
+        name = extension.lstrip(".").upper() if extension != ".bin" else "desconhecido"
+        super().__init__(
+            f"Formato não suportado: {name}. Envie JPEG, PNG ou PDF"
+        )
+
+
+def detect_extension(head, mime=None):
+    """Extensão do arquivo pelos magic bytes; usa o MIME do data URL como alternativa"""
+    for magic, extension in MAGIC_EXTENSIONS:
+        if head.startswith(magic):
+            return extension
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    return MIME_EXTENSIONS.get(mime or "", ".bin")
+
+
+def _iter_base64_text(data):
+    """
+    Percorre um texto base64 (string ou stream de texto) em blocos
+
+    Yields:
+        str: Pedaços do texto, sem o cabeçalho do data URL
+    """
+    if isinstance(data, str):
+        # Evita split(): percorre a string original por fatias
+        start = data.find(',') + 1 if data.startswith('data:') else 0
+        for offset in range(start, len(data), UPLOAD_CHUNK_SIZE):
+            yield data[offset:offset + UPLOAD_CHUNK_SIZE]
+        return
+    
+    first = True
+    for chunk in iter(lambda: data.read(UPLOAD_CHUNK_SIZE), ""):
+        if first and chunk.startswith('data:'):
+            # O cabeçalho termina na primeira vírgula
+            while ',' not in chunk:
+                more = data.read(UPLOAD_CHUNK_SIZE)
+                if not more:
+                    break
+                chunk += more
+            chunk = chunk[chunk.find(',') + 1:]
+        first = False
+        yield chunk
+
+
+def _data_url_mime(data):
+    """MIME declarado em um data URL (data:image/png;base64,...)"""
+    if isinstance(data, str) and data.startswith('data:'):
+        return data[5:data.find(';', 0, 100)].lower() if ';' in data[:100] else None
+    return None
+
+
+def _write_upload(data, out, max_bytes):
+    """
+    Grava o conteúdo decodificado em `out`, limitado a max_bytes
+
+    Returns:
+        tuple: (primeiros bytes do arquivo, MIME do data URL ou None)
+    """
+    written = 0
+    head = b""
+
+    def write(block):
+        nonlocal written, head
+        written += len(block)
+        if written > max_bytes:
+            raise ValueError(f"Arquivo excede o tamanho máximo de {max_bytes} bytes")
+        if len(head) < 16:
+            head += block[:16 - len(head)]
+        out.write(block)
+
+    # Bytes já decodificados: grava sem cópia adicional
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        view = memoryview(data)
+        for offset in range(0, len(view), UPLOAD_CHUNK_SIZE):
+            write(view[offset:offset + UPLOAD_CHUNK_SIZE])
+        return bytes(head), None
+
+    if hasattr(data, "read"):
+        first = data.read(UPLOAD_CHUNK_SIZE)
+        if isinstance(first, (bytes, bytearray)):
+            # Arquivo binário: cópia direta em blocos
+            while first:
+                write(first)
+                first = data.read(UPLOAD_CHUNK_SIZE)
+            return bytes(head), None
+        # Stream de texto base64: recoloca o primeiro bloco na sequência
+        data = _ChainedText(first, data) if first else io.StringIO("")
+
+    mime = _data_url_mime(data)
+    pending = ""
+    for chunk in _iter_base64_text(data):
+        pending += chunk.translate(_BASE64_WHITESPACE)
+        usable = len(pending) - len(pending) % 4
+        if usable:
+            write(base64.b64decode(pending[:usable]))
+            pending = pending[usable:]
+    if pending:
+        # Completa o padding ausente no final
+        write(base64.b64decode(pending + "=" * (-len(pending) % 4)))
+    return bytes(head), mime
+
+
+class _ChainedText:
+    """Stream de texto que devolve um bloco já lido antes do restante"""
+
+    def __init__(self, first, stream):
+        self._first = first
+        self._stream = stream
+
+    def read(self, size=-1):
+        if self._first:
+            chunk, self._first = self._first, ""
+            return chunk
+        return self._stream.read(size)
+
+
+class _HashingWriter:
+    """Arquivo de saída que calcula o SHA-256 do que é gravado"""
+
+    def __init__(self, out):
+        self._out = out
+        self.digest = hashlib.sha256()
+
+    def write(self, block):
+        self.digest.update(block)
+        return self._out.write(block)
+
+
+class UploadStore:
+    """Uploads em subdiretórios pelo hash, com deduplicação e expiração por TTL"""
+
+    def __init__(self, root=None, ttl=None, max_bytes=None):
+        self.root = Path(root or os.environ.get("TAREFO_UPLOAD_DIR") or UPLOAD_DIR)
+        self.ttl = ttl if ttl is not None else float(os.environ.get("TAREFO_UPLOAD_TTL", "86400"))
+        self.max_bytes = max_bytes or int(
+            os.environ.get("TAREFO_UPLOAD_MAX_BYTES", str(DEFAULT_UPLOAD_MAX_BYTES))
+        )
+        self.deduplicated = 0
+        self.swept = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self):
+        """Abre o índice na primeira utilização"""
+        if self._conn is None:
+            self.root.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.root / INDEX_NAME), timeout=10, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS uploads (
+                    hash TEXT PRIMARY KEY,
+                    path TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    uploads INTEGER NOT NULL DEFAULT 1
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS uploads_last_access ON uploads (last_access)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def path_for(self, content_hash, extension):
+        """Caminho do arquivo: <raiz>/<aa>/<bb>/<hash><ext>"""
+        return self.root / content_hash[:2] / content_hash[2:4] / f"{content_hash}{extension}"
+
+    def put(self, data, max_bytes=None):
+        """
+        Grava um upload, reaproveitando o arquivo se o conteúdo já existir
+
+        Args:
+            data: Data URL/string base64, bytes ou objeto com read()
+            max_bytes (int): Tamanho máximo do arquivo decodificado
+
+        Returns:
+            tuple: (caminho do arquivo, True se o conteúdo já estava armazenado)
+
+        Raises:
+            UnsupportedFormatError: Se o conteúdo não for JPEG, PNG ou PDF
+            ValueError: Se o arquivo passar de max_bytes
+        """
+        tmp_dir = self.root / TMP_DIR_NAME
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = tmp_dir / f"{os.urandom(8).hex()}.part"
+        try:
+            with open(tmp_path, "wb") as f:
+                writer = _HashingWriter(f)
+                head, mime = _write_upload(data, writer, max_bytes or self.max_bytes)
+            extension = detect_extension(head, mime)
+            if extension not in SUPPORTED_EXTENSIONS:
+                raise UnsupportedFormatError(extension)
+            content_hash = writer.digest.hexdigest()
+            size = tmp_path.stat().st_size
+            path = self.path_for(content_hash, extension)
+
+            # O último uso é renovado antes de conferir o arquivo, na mesma
+            # transação: a limpeza (também com o índice bloqueado) não apaga um
+            # arquivo cujo caminho acabou de ser devolvido por deduplicação
+            now = time.time()
+            with self._lock:
+                conn = self._connection()
+                with conn:
+                    conn.execute("BEGIN IMMEDIATE")
+                    conn.execute(
+                        """
+                        INSERT INTO uploads (hash, path, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)
+                        ON CONFLICT(hash) DO UPDATE SET
+                            path = excluded.path, last_access = excluded.last_access, uploads = uploads + 1
+                        """,
+                        (content_hash, str(path), size, now, now),
+                    )
+                    existed = path.exists()
+                    if existed:
+                        tmp_path.unlink()
+                        self.deduplicated += 1
+                    else:
+                        path.parent.mkdir(parents=True, exist_ok=True)
+                        os.replace(tmp_path, path)
+        except BaseException:
+            if tmp_path.exists():
+                tmp_path.unlink()
+            raise
+        return str(path), existed
+
+    def touch(self, path):
+        """Renova o prazo de um arquivo ainda em uso"""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("UPDATE uploads SET last_access = ? WHERE path = ?", (time.time(), str(path)))
+            conn.commit()
+
+    def sweep(self, now=None):
+        """
+        Apaga os arquivos expirados, os temporários abandonados e os uploads
+        antigos do diretório plano
+
+        Returns:
+            dict: files e bytes removidos
+        """
+        now = now or time.time()
+        removed = freed = 0
+        if self.ttl:
+            with self._lock:
+                conn = self._connection()
+                cutoff = now - self.ttl
+                expired = conn.execute(
+                    "SELECT hash, path, size FROM uploads WHERE last_access < ?", (cutoff,)
+                ).fetchall()
+                for content_hash, path, size in expired:
+                    with conn:
+                        # Outro processo pode ter reaproveitado o arquivo depois
+                        # da consulta: só apaga se o registro ainda estiver vencido
+                        conn.execute("BEGIN IMMEDIATE")
+                        deleted = conn.execute(
+                            "DELETE FROM uploads WHERE hash = ? AND last_access < ?", (content_hash, cutoff)
+                        ).rowcount
+                        if not deleted:
+                            continue
+                        try:
+                            os.unlink(path)
+                        except FileNotFoundError:
+                            pass
+                        except OSError as e:
+                            print(f"⚠️ Não foi possível apagar o upload {path}: {e}")
+                            conn.rollback()
+                            continue
+                    removed += 1
+                    freed += size
+
+            # Arquivos do formato antigo (image_<hex>.*), fora do índice
+            for path in self.root.glob("image_*"):
+                removed, freed = self._unlink_if_older(path, now - self.ttl, removed, freed)
+
+        for path in (self.root / TMP_DIR_NAME).glob("*.part"):
+            removed, freed = self._unlink_if_older(path, now - TMP_MAX_AGE, removed, freed)
+
+        self.swept += removed
+        if removed:
+            print(f"🧹 {removed} upload(s) expirado(s) removido(s) ({freed} bytes)")
+        return {"files": removed, "bytes": freed}
+
+    @staticmethod
+    def _unlink_if_older(path, cutoff, removed, freed):
+        try:
+            st = path.stat()
+            if st.st_mtime < cutoff:
+                path.unlink()
+                return removed + 1, freed + st.st_size
+        except OSError:
+            pass
+        return removed, freed
+
+    def stats(self):
+        """Quantidade, tamanho e idade dos arquivos do índice"""
+        now = time.time()
+        with self._lock:
+            count, total, oldest, last_access = self._connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), MIN(created_at), MIN(last_access) FROM uploads"
+            ).fetchone()
+        return {
+            "files": count,
+            "bytes": total,
+            "oldest_age": now - oldest if oldest else 0.0,
+            "idle_age": now - last_access if last_access else 0.0,
+            "deduplicated": self.deduplicated,
+            "swept": self.swept,
+            "ttl": self.ttl,
+        }
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+_sweeper = None
+_sweeper_stop = threading.Event()
+
+
+def get_upload_store(root=None):
+    """Retorna o store compartilhado da raiz informada, com a limpeza já iniciada"""
+    key = str(root or os.environ.get("TAREFO_UPLOAD_DIR") or UPLOAD_DIR)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = UploadStore(key)
+            _stores[key] = store
+    start_sweeper()
+    return store
+
+
+def touch_upload(path, root=None):
+    """
+    Renova o prazo de um upload que ainda vai ser processado (ex.: job na fila)
+
+    Caminhos fora do store não têm registro no índice e não são afetados; uma
+    falha no índice só é avisada, sem interromper quem chamou.
+    """
+    try:
+        get_upload_store(root).touch(path)
+    except (OSError, sqlite3.Error) as e:
+        print(f"⚠️ Não foi possível renovar o upload {path}: {e}")
+
+
+def sweep_all():
+    """Executa a limpeza de todos os stores compartilhados"""
+    with _stores_lock:
+        stores = list(_stores.values())
+    for store in stores:
+        try:
+            store.sweep()
+        except Exception as e:
+            print(f"⚠️ Erro na limpeza de uploads em {store.root}: {e}")
+
+
+def start_sweeper(interval=None):
+    """Inicia a thread daemon de limpeza, uma só para todos os stores"""
+    global _sweeper
+    interval = interval if interval is not None else float(
+        os.environ.get("TAREFO_UPLOAD_SWEEP_INTERVAL", "600")
+    )
+    with _stores_lock:
+        if interval <= 0 or (_sweeper is not None and _sweeper.is_alive()):
+            return _sweeper
+
+        def loop():
+            while not _sweeper_stop.wait(interval):
+                sweep_all()
+
+        _sweeper_stop.clear()
+        _sweeper = threading.Thread(target=loop, name="tarefo-upload-sweeper", daemon=True)
+        _sweeper.start()
+        return _sweeper
+
+
+def stop_sweeper():
+    """Encerra a thread de limpeza"""
+    global _sweeper
+    with _stores_lock:
+        thread, _sweeper = _sweeper, None
+    _sweeper_stop.set()
+    if thread is not None:
+        thread.join()
+
+
+__all__ = [
+    'UploadStore', 'UnsupportedFormatError', 'get_upload_store', 'touch_upload', 'detect_extension',
+    'start_sweeper', 'stop_sweeper', 'sweep_all', 'SUPPORTED_EXTENSIONS', 'DEFAULT_UPLOAD_MAX_BYTES',
+]
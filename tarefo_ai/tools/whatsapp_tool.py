@@ -8,6 +8,8 @@ from pathlib import Path
 import time
 import base64
 
+from metrics import timed_tool
+
 # Configuração de logging
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -250,6 +252,7 @@ class WhatsAppTool:
 whatsapp_tool = WhatsAppTool()
 
 # Função auxiliar para interface com o CrewAI
+@timed_tool("whatsapp", action_arg=True)
 def whatsapp_action(action, **kwargs):
     """
     Executa uma ação no WhatsApp
@@ -0,0 +1,674 @@
+#!/usr/bin/env python3
+"""
+TarefoAI - Modo worker persistente
+
+Mantém o interpretador, os imports do CrewAI e a configuração YAML carregados
+entre requisições. Cada requisição é um objeto JSON por linha (JSON-lines):
+
+    {"id": 1, "method": "process_message", "params": {"user_id": 1, "message": "Oi"}}
+
+e cada resposta também ocupa exatamente uma linha:
+
+    {"id": 1, "ok": true, "result": "..."}
+    {"id": 1, "ok": false, "error": "..."}
+
+Uso:
+    python worker.py                          # um worker via stdin/stdout
+    python worker.py --socket /tmp/tarefo.sock  # um worker via Unix socket
+    python worker.py --supervise --workers 4  # supervisor com 4 workers pré-aquecidos
+"""
+import os
+import sys
+import json
+import time
+import queue
+import argparse
+import threading
+import subprocess
+import socketserver
+from pathlib import Path
+
+# Adiciona o diretório do pacote ao PYTHONPATH para importar os módulos
+sys.path.insert(0, str(Path(__file__).parent))
+
+import metrics
+
+WORKER_SCRIPT = Path(__file__).resolve()
+
+# Métodos aceitos pelo protocolo
+METHODS = (
+    "ping", "metrics", "process_message", "process_message_stream", "process_batch",
+    "process_image", "process_image_stream", "submit_image", "image_job", "check_compliance",
+    "check_compliance_batch", "cancel", "shutdown",
+)
+
+# Métodos que enviam eventos intermediários antes da resposta final:
+#     {"id": 1, "event": {"event": "task_completed", ...}}
+STREAM_METHODS = ("process_message_stream", "process_image_stream", "check_compliance_batch")
+
+
+def encode_frame(payload):
+    """Serializa uma mensagem do protocolo em uma única linha JSON"""
+    return json.dumps(payload, ensure_ascii=False, default=str) + "\n"
+
+
+def decode_frame(line):
+    """Desserializa uma linha do protocolo; retorna None para linhas vazias"""
+    line = line.strip()
+    if not line:
+        return None
+    return json.loads(line)
+
+
+def invalid_request(request):
+    """Resposta de erro para uma linha que não é um objeto JSON; None se for válida"""
+    if isinstance(request, dict):
+        return None
+    return {"id": None, "ok": False, "error": "A requisição deve ser um objeto JSON"}
+
+
+def _load_handlers():
+    """Importa as funções principais (e o CrewAI) uma única vez por processo"""
+    from main import (
+        process_user_message, process_user_message_stream, process_messages_batch,
+        process_image, process_image_stream, submit_image, get_image_job, check_compliance,
+        check_compliance_batch_stream,
+    )
+    from crew import load_crewai
+
+    # O crew.py carrega o CrewAI sob demanda; o worker paga esse custo no aquecimento
+    load_crewai()
+
+    return {
+        "process_message": lambda p: process_user_message(
+            p.get("user_id"), p.get("message", ""), p.get("platform", "app")
+        ),
+        "process_message_stream": lambda p: process_user_message_stream(
+            p.get("user_id"), p.get("message", ""), p.get("platform", "app")
+        ),
+        "process_batch": lambda p: list(process_messages_batch(
+            p.get("messages") or [], p.get("max_workers"), ordered=True
+        )),
+        "process_image": lambda p: process_image(
+            p.get("user_id"), p.get("image_path"), p.get("extract_type", "full")
+        ),
+        "process_image_stream": lambda p: process_image_stream(
+            p.get("user_id"), p.get("image_path"), p.get("extract_type", "full")
+        ),
+        "submit_image": lambda p: submit_image(
+            p.get("user_id"), p.get("image_path"), p.get("extract_type", "full"), p.get("priority")
+        ),
+        "image_job": lambda p: get_image_job(p.get("job_id")),
+        "check_compliance": lambda p: check_compliance(
+            p.get("operation"), p.get("data") or {}
+        ),
+        "check_compliance_batch": lambda p: check_compliance_batch_stream(
+            p.get("path") or p.get("records") or [], p.get("operation"), p.get("max_workers")
+        ),
+    }
+
+
+def _response_cache():
+    """Retorna o cache de respostas do processo, se ativo"""
+    try:
+        from cache import get_response_cache
+        return get_response_cache()
+    except Exception:
+        return None
+
+
+class Worker:
+    """Executa requisições do protocolo dentro de um processo já aquecido"""
+
+    def __init__(self):
+        self.handlers = None
+        self.started_at = time.time()
+        self.requests_served = 0
+
+    def warm_up(self):
+        """Carrega os módulos pesados antes da primeira requisição"""
+        if self.handlers is None:
+            self.handlers = _load_handlers()
+        return self
+
+    def handle(self, request):
+        """
+        Processa uma requisição do protocolo
+
+        Args:
+            request (dict): Requisição com id, method e params
+
+        Returns:
+            dict: Resposta com id, ok e result/error
+        """
+        invalid = invalid_request(request)
+        if invalid is not None:
+            return invalid
+        request_id = request.get("id")
+        try:
+            method = request.get("method")
+            if method not in METHODS:
+                raise ValueError(f"Método desconhecido: {method}")
+
+            if method == "ping":
+                result = {
+                    "pid": os.getpid(),
+                    "uptime": time.time() - self.started_at,
+                    "requests_served": self.requests_served,
+                }
+                cache = _response_cache()
+                if cache is not None:
+                    result["cache"] = cache.stats()
+                result["metrics"] = metrics.snapshot()
+            elif method == "metrics":
+                result = metrics.render_prometheus()
+            elif method == "shutdown":
+                result = {"pid": os.getpid()}
+            elif method == "cancel":
+                # Um worker executa uma requisição por vez: não há o que interromper
+                # aqui; o supervisor cancela reiniciando o worker ocupado
+                result = {"cancelled": False}
+            elif method in STREAM_METHODS:
+                return self.handle_stream(request, emit=None)
+            else:
+                with metrics.timer("tarefo_request_seconds", method=method):
+                    self.warm_up()
+                    result = self.handlers[method](request.get("params") or {})
+                self.requests_served += 1
+
+            return {"id": request_id, "ok": True, "result": result}
+
+        except Exception as e:
+            print(f"❌ Erro ao processar requisição {request_id}: {e}")
+            return {"id": request_id, "ok": False, "error": str(e)}
+
+
+    def handle_stream(self, request, emit=None):
+        """
+        Processa uma requisição de streaming
+
+        Cada evento intermediário é enviado por `emit` como {"id", "event"}; o
+        evento final (result/error) vira a resposta normal do protocolo.
+        """
+        if not isinstance(request, dict) or request.get("method") not in STREAM_METHODS:
+            return self.handle(request)
+
+        request_id = request.get("id")
+        try:
+            final = None
+            with metrics.timer("tarefo_request_seconds", method=request["method"]):
+                self.warm_up()
+                for event in self.handlers[request["method"]](request.get("params") or {}):
+                    if event.get("event") in ("result", "error"):
+                        final = event
+                    elif emit is not None:
+                        emit({"id": request_id, "event": event})
+            self.requests_served += 1
+
+            if final is None or final["event"] == "error":
+                error = final.get("error") if final else "Streaming encerrado sem resultado"
+                return {"id": request_id, "ok": False, "error": error}
+            return {"id": request_id, "ok": True, "result": final.get("result")}
+
+        except Exception as e:
+            print(f"❌ Erro ao processar requisição {request_id}: {e}")
+            return {"id": request_id, "ok": False, "error": str(e)}
+
+
+def serve_stdio(worker=None, protocol_out=None):
+    """
+    Atende requisições via stdin/stdout até EOF ou método shutdown
+
+    Todas as saídas de print do CrewAI são desviadas para stderr, de modo que
+    stdout transporte apenas as respostas do protocolo.
+    """
+    protocol_out = protocol_out or sys.stdout
+    sys.stdout = sys.stderr
+    worker = (worker or Worker()).warm_up()
+
+    protocol_out.write(encode_frame({"id": None, "ok": True, "result": {"ready": True, "pid": os.getpid()}}))
+    protocol_out.flush()
+
+    for line in sys.stdin:
+        try:
+            request = decode_frame(line)
+        except ValueError as e:
+            response = {"id": None, "ok": False, "error": f"JSON inválido: {e}"}
+        else:
+            if request is None:
+                continue
+
+            def emit(frame):
+                protocol_out.write(encode_frame(frame))
+                protocol_out.flush()
+
+            response = invalid_request(request) or worker.handle_stream(request, emit)
+
+        protocol_out.write(encode_frame(response))
+        protocol_out.flush()
+
+        if isinstance(request, dict) and request.get("method") == "shutdown":
+            break
+
+
+class _SocketHandler(socketserver.StreamRequestHandler):
+    """Atende uma conexão do Unix socket, uma requisição por linha"""
+
+    def handle(self):
+        for raw in self.rfile:
+            try:
+                request = decode_frame(raw.decode("utf-8"))
+            except ValueError as e:
+                response = {"id": None, "ok": False, "error": f"JSON inválido: {e}"}
+                request = None
+            else:
+                if request is None:
+                    continue
+
+                def emit(frame):
+                    self.wfile.write(encode_frame(frame).encode("utf-8"))
+                    self.wfile.flush()
+
+                response = invalid_request(request) or self.server.dispatch(request, emit)
+
+            self.wfile.write(encode_frame(response).encode("utf-8"))
+            self.wfile.flush()
+
+            if isinstance(request, dict) and request.get("method") == "shutdown":
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+                return
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, dispatch):
+        self.dispatch = dispatch
+        super().__init__(path, _SocketHandler)
+
+
+def serve_unix_socket(path, dispatch):
+    """
+    Atende requisições em um Unix socket
+
+    Args:
+        path: Caminho do socket
+        dispatch: Função (requisição, emit) que retorna a resposta; emit envia
+            eventos intermediários de streaming
+    """
+    if os.path.exists(path):
+        os.unlink(path)
+
+    sys.stdout = sys.stderr
+    with _UnixServer(path, dispatch) as server:
+        print(f"✅ Worker TarefoAI escutando em {path}")
+        try:
+            server.serve_forever()
+        finally:
+            if os.path.exists(path):
+                os.unlink(path)
+
+
+class WorkerProcess:
+    """Processo worker filho gerenciado pelo supervisor"""
+
+    def __init__(self, index, python=None):
+        self.index = index
+        self.python = python or sys.executable
+        self.process = None
+        self.restarts = 0
+        self.last_metrics = {}
+        self.lock = threading.Lock()
+        self._lines = None
+
+    def start(self, timeout=120):
+        """Inicia o processo e aguarda o sinal de pronto (pré-aquecimento)"""
+        # Os exportadores de métricas ficam no supervisor, não em cada worker
+        env = {k: v for k, v in os.environ.items() if k not in METRICS_EXPORT_VARS}
+        self.process = subprocess.Popen(
+            [self.python, str(WORKER_SCRIPT)],
+            env=env,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=None,
+            text=True,
+            encoding="utf-8",
+            bufsize=1,
+        )
+        # Uma única thread por processo lê o stdout do worker
+        self._lines = queue.Queue()
+        threading.Thread(
+            target=self._read_lines, args=(self.process, self._lines),
+            name=f"tarefo-worker-{self.index}-reader", daemon=True
+        ).start()
+        ready = self._read_frame(timeout)
+        if not ready or not ready.get("ok"):
+            raise RuntimeError(f"Worker {self.index} não ficou pronto")
+        print(f"✅ Worker {self.index} pronto (pid {self.process.pid})")
+        return self
+
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    @staticmethod
+    def _read_lines(process, lines):
+        """Repassa as linhas do worker para a fila até o fim do stdout"""
+        try:
+            for line in process.stdout:
+                lines.put(line)
+        except (OSError, ValueError):
+            pass
+        lines.put("")
+
+    def _read_frame(self, timeout):
+        """Lê uma linha do worker respeitando o timeout"""
+        try:
+            line = self._lines.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if not line:
+            return None
+        return decode_frame(line)
+
+    def call(self, request, timeout=None, on_event=None):
+        """
+        Envia uma requisição e aguarda a resposta correspondente
+
+        Eventos de streaming recebidos antes da resposta são repassados a on_event.
+        """
+        with self.lock:
+            if not self.is_alive():
+                raise RuntimeError(f"Worker {self.index} não está em execução")
+            self.process.stdin.write(encode_frame(request))
+            self.process.stdin.flush()
+            while True:
+                response = self._read_frame(timeout)
+                if response is None:
+                    raise RuntimeError(f"Worker {self.index} não respondeu")
+                if "event" in response and "ok" not in response:
+                    if on_event is not None:
+                        on_event(response)
+                    continue
+                return response
+
+    def stop(self, timeout=5):
+        """Encerra o processo de forma ordenada"""
+        if not self.is_alive():
+            return
+        try:
+            self.call({"id": None, "method": "shutdown"}, timeout=timeout)
+            self.process.wait(timeout=timeout)
+        except Exception:
+            self.process.kill()
+
+    def cancel(self):
+        """Interrompe a requisição em andamento encerrando o processo"""
+        if self.is_alive():
+            self.process.kill()
+
+    def restart(self):
+        """Reinicia o processo após uma falha"""
+        if self.process is not None and self.process.poll() is None:
+            self.process.kill()
+        self.restarts += 1
+        print(f"🔄 Reiniciando worker {self.index} (reinício #{self.restarts})")
+        return self.start()
+
+
+class WorkerSupervisor:
+    """
+    Gerencia N workers pré-aquecidos com health check e reinício automático
+
+    Cada worker atende uma requisição por vez; requisições concorrentes são
+    distribuídas entre os workers livres.
+    """
+
+    def __init__(self, workers=None, request_timeout=None, health_interval=None):
+        self.size = workers or int(os.environ.get("TAREFO_WORKERS", "2"))
+        self.request_timeout = request_timeout or float(os.environ.get("TAREFO_WORKER_TIMEOUT", "300"))
+        self.health_interval = health_interval or float(os.environ.get("TAREFO_HEALTH_INTERVAL", "30"))
+        self.workers = []
+        self.idle = queue.Queue()
+        # Requisições em andamento por id, para o método cancel
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._health_thread = None
+
+    def start(self):
+        """Inicia e aquece todos os workers"""
+        for index in range(self.size):
+            worker = WorkerProcess(index).start()
+            self.workers.append(worker)
+            self.idle.put(worker)
+
+        self._health_thread = threading.Thread(target=self._health_loop, daemon=True)
+        self._health_thread.start()
+        print(f"🚀 Supervisor iniciado com {self.size} workers")
+        return self
+
+    def _ensure_alive(self, worker):
+        """Reinicia o worker se o processo tiver terminado"""
+        if not worker.is_alive():
+            try:
+                worker.restart()
+            except Exception as e:
+                print(f"❌ Falha ao reiniciar worker {worker.index}: {e}")
+
+    def _health_loop(self):
+        """Verifica periodicamente os workers livres com ping"""
+        while not self._stop.wait(self.health_interval):
+            for _ in range(self.size):
+                try:
+                    worker = self.idle.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    if worker.is_alive():
+                        response = worker.call({"id": None, "method": "ping"}, timeout=10)
+                        if not response.get("ok"):
+                            raise RuntimeError(response.get("error"))
+                        worker.last_metrics = response["result"].get("metrics") or {}
+                except Exception as e:
+                    print(f"⚠️ Health check falhou no worker {worker.index}: {e}")
+                    if worker.is_alive():
+                        worker.process.kill()
+                self._ensure_alive(worker)
+                self.idle.put(worker)
+
+    def cancel(self, request_id):
+        """
+        Cancela uma requisição em andamento
+
+        O worker ocupado é encerrado (e reiniciado por dispatch), já que o
+        processamento da crew não pode ser interrompido por dentro.
+
+        Returns:
+            bool: True se a requisição estava em andamento
+        """
+        with self._inflight_lock:
+            worker = self._inflight.get(request_id)
+        if worker is None:
+            return False
+        print(f"🛑 Cancelando requisição {request_id} no worker {worker.index}")
+        worker.cancel()
+        return True
+
+    def dispatch(self, request, emit=None):
+        """Encaminha uma requisição para um worker livre"""
+        invalid = invalid_request(request)
+        if invalid is not None:
+            return invalid
+        if request.get("method") == "cancel":
+            request_id = (request.get("params") or {}).get("request_id")
+            return {"id": request.get("id"), "ok": True, "result": {"cancelled": self.cancel(request_id)}}
+        if request.get("method") == "ping":
+            return {
+                "id": request.get("id"),
+                "ok": True,
+                "result": {
+                    "workers": [
+                        {"index": w.index, "alive": w.is_alive(), "restarts": w.restarts}
+                        for w in self.workers
+                    ]
+                },
+            }
+        if request.get("method") == "shutdown":
+            return {"id": request.get("id"), "ok": True, "result": {"pid": os.getpid()}}
+        if request.get("method") == "metrics":
+            return {"id": request.get("id"), "ok": True, "result": metrics.render_prometheus(self.metrics_snapshot())}
+
+        request_id = request.get("id")
+        worker = self.idle.get()
+        try:
+            self._ensure_alive(worker)
+            if request_id is not None:
+                with self._inflight_lock:
+                    self._inflight[request_id] = worker
+            return worker.call(request, timeout=self.request_timeout, on_event=emit)
+        except Exception as e:
+            print(f"❌ Worker {worker.index} falhou: {e}")
+            if worker.is_alive():
+                worker.process.kill()
+            self._ensure_alive(worker)
+            return {"id": request_id, "ok": False, "error": str(e)}
+        finally:
+            if request_id is not None:
+                with self._inflight_lock:
+                    self._inflight.pop(request_id, None)
+            self.idle.put(worker)
+
+    def metrics_snapshot(self):
+        """
+        Junta as métricas dos workers com o label worker
+
+        Cada worker envia suas métricas no ping do health check, então os valores
+        de um worker ocupado refletem o último health check.
+        """
+        return metrics.merge_snapshots(
+            [({"worker": str(w.index)}, w.last_metrics) for w in self.workers]
+        )
+
+    def stop(self):
+        """Encerra o health check e todos os workers"""
+        self._stop.set()
+        for worker in self.workers:
+            worker.stop()
+
+    def serve_stdio(self, protocol_out=None):
+        """Atende requisições concorrentes via stdin/stdout"""
+        protocol_out = protocol_out or sys.stdout
+        sys.stdout = sys.stderr
+        write_lock = threading.Lock()
+
+        def emit(frame):
+            with write_lock:
+                protocol_out.write(encode_frame(frame))
+                protocol_out.flush()
+
+        def respond(request):
+            response = self.dispatch(request, emit)
+            with write_lock:
+                protocol_out.write(encode_frame(response))
+                protocol_out.flush()
+
+        ready = {"id": None, "ok": True, "result": {"ready": True, "workers": self.size}}
+        protocol_out.write(encode_frame(ready))
+        protocol_out.flush()
+
+        for line in sys.stdin:
+            try:
+                request = decode_frame(line)
+            except ValueError as e:
+                with write_lock:
+                    protocol_out.write(encode_frame({"id": None, "ok": False, "error": f"JSON inválido: {e}"}))
+                    protocol_out.flush()
+                continue
+            if request is None:
+                continue
+            invalid = invalid_request(request)
+            if invalid is not None:
+                with write_lock:
+                    protocol_out.write(encode_frame(invalid))
+                    protocol_out.flush()
+                continue
+            if request.get("method") == "shutdown":
+                respond(request)
+                break
+            threading.Thread(target=respond, args=(request,), daemon=True).start()
+
+
+# Variáveis que ativam a exportação de métricas (apenas no processo principal)
+METRICS_EXPORT_VARS = ("TAREFO_METRICS_PORT", "TAREFO_METRICS_FILE")
+
+
+def start_metrics_exporters(provider):
+    """
+    Inicia os exportadores de métricas configurados por variáveis de ambiente
+
+    TAREFO_METRICS_PORT expõe http://127.0.0.1:<porta>/metrics e
+    TAREFO_METRICS_FILE grava o arquivo a cada TAREFO_METRICS_INTERVAL segundos.
+    """
+    port = os.environ.get("TAREFO_METRICS_PORT")
+    if port:
+        try:
+            metrics.start_http_server(int(port), provider)
+        except Exception as e:
+            print(f"⚠️ Não foi possível iniciar o endpoint de métricas: {e}")
+
+    path = os.environ.get("TAREFO_METRICS_FILE")
+    if path:
+        interval = float(os.environ.get("TAREFO_METRICS_INTERVAL", "15"))
+
+        def writer():
+            while True:
+                try:
+                    metrics.write_prometheus(path, provider())
+                except Exception as e:
+                    print(f"⚠️ Falha ao gravar métricas em {path}: {e}")
+                time.sleep(interval)
+
+        threading.Thread(target=writer, name="tarefo-metrics-file", daemon=True).start()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Worker persistente do TarefoAI")
+    parser.add_argument("--socket", help="Caminho do Unix socket (padrão: stdin/stdout)")
+    parser.add_argument("--supervise", action="store_true", help="Executa o supervisor de workers")
+    parser.add_argument("--workers", type=int, default=None, help="Número de workers do supervisor")
+    args = parser.parse_args(argv)
+
+    # stdout transporta apenas o protocolo; logs e prints vão para stderr
+    protocol_out = sys.stdout
+    sys.stdout = sys.stderr
+
+    if args.supervise:
+        supervisor = WorkerSupervisor(workers=args.workers).start()
+        start_metrics_exporters(supervisor.metrics_snapshot)
+        try:
+            if args.socket:
+                serve_unix_socket(args.socket, supervisor.dispatch)
+            else:
+                supervisor.serve_stdio(protocol_out)
+        finally:
+            supervisor.stop()
+        return
+
+    start_metrics_exporters(metrics.snapshot)
+
+    if args.socket:
+        worker = Worker().warm_up()
+        lock = threading.Lock()
+
+        def dispatch(request, emit=None):
+            # Um processo worker executa uma requisição por vez
+            with lock:
+                return worker.handle_stream(request, emit)
+
+        serve_unix_socket(args.socket, dispatch)
+    else:
+        serve_stdio(protocol_out=protocol_out)
+
+
+if __name__ == "__main__":
+    main()